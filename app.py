@@ -1,15 +1,25 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 import os
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Importer les modules RAG
-from modules.document_processor import DocumentProcessor
 from modules.chunker import TextChunker
-from modules.indexer import FAISSIndexer
+from modules.indexer import FAISSIndexer, INDEX_TYPES, METRICS, QUANTIZATIONS, DEFAULT_INDEX_PARAMS, SEARCH_MODES
+from modules.indexing_pipeline import IndexingPipeline, IndexingCancelled
+from modules.indexing_job import IndexingJob
+from modules.index_manifest import IndexManifest
+from modules.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from modules.chunk_store import ChunkStore
+from modules.answer_cache import SemanticAnswerCache
+from modules.context_builder import ContextBuilder
+from modules.index_lock import IndexLock
+from modules.index_versions import IndexVersions
 
 # Charger les variables d'environnement (override=True pour forcer le rechargement)
 load_dotenv(override=True)
@@ -20,11 +30,15 @@ LLM_MODE = os.environ.get('LLM_MODE', 'openai').lower()  # 'openai' ou 'local'
 OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3.2:3b')
 OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
 
+# Les processus d'extraction et de découpage (forkserver, spawn) importent ce module sous le
+# nom '__mp_main__' : ils n'ont besoin ni des modèles, ni de l'index, ni de la migration
+MAIN_PROCESS = __name__ != '__mp_main__'
+
 # Importer conditionnellement les modules locaux
 LocalEmbedder = None
 LocalLLM = None
 
-if EMBEDDING_MODE == 'local' or LLM_MODE == 'local':
+if MAIN_PROCESS and (EMBEDDING_MODE == 'local' or LLM_MODE == 'local'):
     try:
         if EMBEDDING_MODE == 'local':
             from modules.local_embedder import LocalEmbedder
@@ -45,8 +59,50 @@ app = Flask(__name__)
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 DATA_FOLDER = 'data'
-INDEX_PATH = os.path.join(DATA_FOLDER, 'faiss_index.bin')
-METADATA_PATH = os.path.join(DATA_FOLDER, 'index_metadata.pkl')
+# Une version de l'index par dossier (index FAISS, store des chunks, manifeste)
+INDEXES_FOLDER = os.path.join(DATA_FOLDER, 'indexes')
+INDEX_VERSIONS_KEEP = int(os.environ.get('INDEX_VERSIONS_KEEP', 2))
+# Ancienne organisation (fichiers directement dans data/), migrée au démarrage
+LEGACY_INDEX_PATH = os.path.join(DATA_FOLDER, 'faiss_index.bin')
+LEGACY_STORE_PATH = os.path.join(DATA_FOLDER, 'chunk_store')
+LEGACY_METADATA_PATH = os.path.join(DATA_FOLDER, 'index_metadata.pkl')
+LEGACY_MANIFEST_PATH = os.path.join(DATA_FOLDER, 'index_manifest.json')
+JOBS_FOLDER = os.path.join(DATA_FOLDER, 'index_jobs')
+EMBEDDING_CACHE_FOLDER = os.path.join(DATA_FOLDER, 'embedding_cache')
+EMBEDDING_CACHE_MAX_MB = int(os.environ.get('EMBEDDING_CACHE_MAX_MB', 512))
+# Index memory-mappé pour la recherche et chargement dès le démarrage du processus
+FAISS_MMAP = os.environ.get('FAISS_MMAP', '1').lower() not in ('0', 'false', 'no')
+INDEX_WARMUP = os.environ.get('INDEX_WARMUP', '1').lower() not in ('0', 'false', 'no')
+# Recherche par défaut : 'dense' (embeddings), 'sparse' (BM25) ou 'hybrid' (fusion des deux, sur demande)
+RETRIEVAL_MODE = os.environ.get('RETRIEVAL_MODE', 'dense').lower()
+# Re-ranking local des candidats par un cross-encoder (nécessite sentence-transformers)
+RERANK = os.environ.get('RERANK', '0').lower() in ('1', 'true', 'yes')
+RERANK_MODEL = os.environ.get('RERANK_MODEL', 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1')
+RERANK_CANDIDATES = int(os.environ.get('RERANK_CANDIDATES', 20))
+RERANK_BUDGET_MS = float(os.environ.get('RERANK_BUDGET_MS', 1000))
+# Contexte documentaire : budget de tokens et seuil de similarité des chunks quasi identiques
+CONTEXT_MAX_TOKENS = int(os.environ.get('CONTEXT_MAX_TOKENS', 3000))
+CONTEXT_DUPLICATE_THRESHOLD = float(os.environ.get('CONTEXT_DUPLICATE_THRESHOLD', 0.8))
+# Recherche groupée : nombre maximal de questions par appel et générations LLM simultanées
+BATCH_MAX_QUESTIONS = int(os.environ.get('BATCH_MAX_QUESTIONS', 1000))
+BATCH_LLM_CONCURRENCY = int(os.environ.get('BATCH_LLM_CONCURRENCY', 4))
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 1024))
+QUERY_CACHE_TTL = float(os.environ.get('QUERY_CACHE_TTL', 3600))
+# Cache sémantique des réponses (0 = désactivé)
+ANSWER_CACHE_SIZE = int(os.environ.get('ANSWER_CACHE_SIZE', 1000))
+ANSWER_CACHE_THRESHOLD = float(os.environ.get('ANSWER_CACHE_THRESHOLD', 0.95))
+# Serveur : 'development' (serveur Flask en debug) ou 'production' (waitress multi-thread)
+SERVER_MODE = os.environ.get('SERVER_MODE', 'development').lower()
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+# Paramètres entiers de /api/index et leur valeur par défaut (tous strictement positifs)
+INDEXING_INT_PARAMS = {
+    'embedding_batch_size': 32,
+    'embedding_concurrency': 4,
+    'embedding_batch_tokens': 50000,
+    'extraction_workers': 1,
+    'window_size': 256,
+    'chunk_workers': 1,
+}
 ALLOWED_EXTENSIONS = {'pdf', 'txt', 'doc', 'docx', 'md'}
 MAX_FILE_SIZE = 256 * 1024 * 1024  # 256 MB
 
@@ -56,13 +112,35 @@ LLM_MODE = os.environ.get('LLM_MODE', 'openai').lower()  # 'openai' ou 'local'
 OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3.2:3b')
 OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
 
-print(f"🔧 Configuration:")
-print(f"  - Embeddings: {EMBEDDING_MODE}")
-print(f"  - LLM: {LLM_MODE}")
-if LLM_MODE == 'local':
-    print(f"  - Modèle Ollama: {OLLAMA_MODEL}")
-else:
-    print(f"  - Modèle OpenAI: {OPENAI_MODEL}")
+# Prompt système par défaut de l'assistant (remplaçable depuis l'interface)
+DEFAULT_SYSTEM_PROMPT = """Tu es un testeur certifié ISTQB (International Software Testing Qualifications Board) avec une expertise approfondie en assurance qualité logicielle. 
+
+        Ton rôle est d'assister dans toutes les activités de test selon le processus ISTQB :
+
+        1. **Analyse des tests** : Identifier les conditions de test à partir des exigences et spécifications
+        2. **Conception des tests** : Créer des cas de test détaillés, des scénarios et des données de test
+        3. **Implémentation des tests** : Préparer les scripts de test et l'environnement de test
+        4. **Exécution des tests** : Définir les procédures d'exécution et les critères de validation
+
+        Tu bases tes réponses sur les documents fournis et tu appliques les bonnes pratiques ISTQB. Tu peux :
+        - Analyser des spécifications pour identifier les cas de test
+        - Créer des cas de test détaillés avec préconditions, étapes et résultats attendus
+        - Proposer des stratégies de test adaptées
+        - Identifier les risques et prioriser les tests
+        - Rédiger des rapports de test professionnels
+
+        Si l'information n'est pas dans les documents, tu le dis clairement et tu proposes une approche basée sur les standards ISTQB."""
+
+if MAIN_PROCESS:
+    print(f"🔧 Configuration:")
+    print(f"  - Embeddings: {EMBEDDING_MODE}")
+    print(f"  - LLM: {LLM_MODE}")
+    if LLM_MODE == 'local':
+        print(f"  - Modèle Ollama: {OLLAMA_MODEL}")
+    else:
+        print(f"  - Modèle OpenAI: {OPENAI_MODEL}")
+    if RERANK:
+        print(f"  - Re-ranking: {RERANK_MODEL} ({RERANK_CANDIDATES} candidats, budget {RERANK_BUDGET_MS:.0f} ms)")
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
@@ -71,13 +149,42 @@ app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(DATA_FOLDER, exist_ok=True)
 
+index_versions = IndexVersions(INDEXES_FOLDER, keep=INDEX_VERSIONS_KEEP)
+
+# Migrer un index de l'ancienne organisation vers une version
+if MAIN_PROCESS and index_versions.current() is None and os.path.exists(LEGACY_INDEX_PATH):
+    try:
+        # Métadonnées d'un ancien index (pickle) : conversion en store de chunks
+        if os.path.exists(LEGACY_METADATA_PATH) and not ChunkStore.exists(LEGACY_STORE_PATH):
+            print("📦 Migration de index_metadata.pkl vers le store de chunks...")
+            ChunkStore.migrate_pickle(LEGACY_METADATA_PATH, LEGACY_STORE_PATH)
+        if ChunkStore.exists(LEGACY_STORE_PATH):
+            version = index_versions.adopt(LEGACY_INDEX_PATH, LEGACY_STORE_PATH, LEGACY_MANIFEST_PATH)
+            print(f"✅ Index migré vers la version {version}")
+    except Exception as e:
+        print(f"❌ Erreur lors de la migration de l'index: {e}")
+
 # Instances globales
 indexer = None
 local_embedder = None
 local_llm = None
+reranker = None
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_FOLDER, max_size_mb=EMBEDDING_CACHE_MAX_MB)
+query_cache = QueryEmbeddingCache(max_size=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+answer_cache = SemanticAnswerCache(threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_SIZE)
+# Tokens du contexte mesurés avec l'encodeur tiktoken du chunker
+context_builder = None
+if MAIN_PROCESS:
+    context_builder = ContextBuilder(TextChunker().encoding, max_tokens=CONTEXT_MAX_TOKENS,
+                                     duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD)
+# Chargement de l'index partagé par les threads, et indexation exclusive entre threads et workers
+indexer_lock = threading.Lock()
+index_lock = IndexLock(os.path.join(DATA_FOLDER, 'index.lock'))
+# Indexations en cours dans ce processus (id -> IndexingJob)
+indexing_jobs = {}
 
 # Initialiser les modèles locaux si nécessaire
-if EMBEDDING_MODE == 'local' and LocalEmbedder:
+if MAIN_PROCESS and EMBEDDING_MODE == 'local' and LocalEmbedder:
     try:
         print("📥 Chargement de Sentence Transformers...")
         local_embedder = LocalEmbedder(model_name="paraphrase-multilingual-MiniLM-L12-v2")
@@ -86,7 +193,7 @@ if EMBEDDING_MODE == 'local' and LocalEmbedder:
         print(f"❌ Erreur lors du chargement de Sentence Transformers: {e}")
         EMBEDDING_MODE = 'openai'
 
-if LLM_MODE == 'local' and LocalLLM:
+if MAIN_PROCESS and LLM_MODE == 'local' and LocalLLM:
     try:
         print("📥 Initialisation d'Ollama...")
         local_llm = LocalLLM(model=OLLAMA_MODEL)
@@ -95,6 +202,16 @@ if LLM_MODE == 'local' and LocalLLM:
         print(f"❌ Erreur lors de l'initialisation d'Ollama: {e}")
         LLM_MODE = 'openai'
 
+if MAIN_PROCESS and RERANK:
+    try:
+        from modules.reranker import CrossEncoderReranker
+        print("📥 Chargement du cross-encoder...")
+        reranker = CrossEncoderReranker(model_name=RERANK_MODEL, budget_ms=RERANK_BUDGET_MS)
+        print("✅ Cross-encoder chargé")
+    except Exception as e:
+        print(f"❌ Erreur lors du chargement du cross-encoder: {e}")
+        print("💡 Pour le re-ranking, installez : pip install sentence-transformers torch")
+
 def allowed_file(filename):
     """Vérifie si l'extension du fichier est autorisée"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -117,24 +234,471 @@ def get_uploaded_files():
                 })
     return sorted(files_list, key=lambda x: x['date'], reverse=True)
 
+def build_indexer(embedding_model='text-embedding-3-small', local_batch_size=32,
+                  max_concurrency=4, max_batch_tokens=50000, index_type='flat', index_params=None,
+                  metric='l2', embedding_dimensions=None):
+    """Crée un indexer vide selon le mode d'embedding configuré"""
+    if EMBEDDING_MODE == 'local':
+        return FAISSIndexer(mode='local', local_embedder=local_embedder, embedding_cache=embedding_cache,
+                            local_batch_size=local_batch_size, index_type=index_type,
+                            index_params=index_params, metric=metric, query_cache=query_cache)
+    return FAISSIndexer(api_key=os.environ.get('OPENAI_API_KEY'), model=embedding_model, mode='openai',
+                        embedding_cache=embedding_cache, max_concurrency=max_concurrency,
+                        max_batch_tokens=max_batch_tokens, base_url=os.environ.get('OPENAI_BASE_URL'),
+                        index_type=index_type, index_params=index_params, metric=metric,
+                        query_cache=query_cache, embedding_dimensions=embedding_dimensions)
+
+def resident_memory_mb():
+    """Mémoire résidente du processus en Mo (None si indisponible sur ce système)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def load_search_indexer():
+    """Charge la version publiée de l'index pour la recherche (memory-mappée si FAISS_MMAP)"""
+    if EMBEDDING_MODE == 'local':
+        if not local_embedder:
+            raise ValueError('Embedder local non initialisé')
+        loaded = FAISSIndexer(mode='local', local_embedder=local_embedder, query_cache=query_cache)
+    else:
+        api_key = os.environ.get('OPENAI_API_KEY')
+        loaded = FAISSIndexer(api_key=api_key, mode='openai', query_cache=query_cache)
+    
+    version = index_versions.current()
+    if version is None:
+        raise FileNotFoundError("Aucun index publié")
+    paths = index_versions.paths(version)
+    
+    rss_before = resident_memory_mb()
+    loaded.load_index(paths['index'], paths['metadata'], mmap=FAISS_MMAP)
+    rss_after = resident_memory_mb()
+    loaded.load_stats['version'] = version
+    if rss_after is not None:
+        loaded.load_stats['rss_mb'] = round(rss_after, 1)
+        loaded.load_stats['rss_delta_mb'] = round(rss_after - rss_before, 1)
+    return loaded
+
+def get_search_indexer():
+    """
+    Retourne l'index partagé pour la recherche, chargé à la première demande et
+    rechargé quand une nouvelle version est publiée (par exemple par un autre worker)
+    
+    Le chargement se fait sous verrou : les threads qui arrivent pendant ce temps
+    attendent puis utilisent le même index au lieu d'en charger chacun une copie.
+    Les recherches déjà lancées terminent sur la version qu'elles ont obtenue.
+    
+    Returns:
+        Indexer prêt pour la recherche (None si aucun index n'est publié)
+    """
+    global indexer
+    
+    current = indexer
+    if current is not None and current.index is not None \
+            and current.load_stats.get('version') == index_versions.current():
+        return current
+    
+    with indexer_lock:
+        version = index_versions.current()
+        if indexer is not None and indexer.index is not None and indexer.load_stats.get('version') == version:
+            return indexer
+        if version is None:
+            indexer = None
+        else:
+            indexer = load_search_indexer()
+        return indexer
+
+def warm_up_index():
+    """Charge et préchauffe l'index au démarrage pour que la première requête ne paie pas le chargement"""
+    try:
+        if reranker is not None:
+            print(f"✅ Cross-encoder préchauffé en {reranker.warm_up() * 1000:.0f} ms")
+        
+        loaded = get_search_indexer()
+        if loaded is None:
+            return
+        loaded.load_stats['warm_up_seconds'] = round(loaded.warm_up(), 4)
+        stats = loaded.load_stats
+        rss = f", mémoire résidente {stats['rss_mb']} Mo (+{stats['rss_delta_mb']} Mo)" if 'rss_mb' in stats else ''
+        print(f"✅ Index FAISS chargé en {stats['seconds'] * 1000:.1f} ms "
+              f"({'memory-mappé' if stats['mmap'] else 'en mémoire'}, {loaded.index.ntotal} vecteurs, "
+              f"{stats['index_file_mb']} Mo sur disque), préchauffage {stats['warm_up_seconds'] * 1000:.1f} ms{rss}")
+    except Exception as e:
+        print(f"Erreur lors du chargement de l'index: {str(e)}")
+
 def delete_indexes():
-    """Supprime les fichiers d'index FAISS et métadonnées"""
+    """
+    Supprime toutes les versions de l'index (et les fichiers d'un index de l'ancienne organisation)
+    
+    L'index est d'abord dépublié : les nouvelles recherches ne le voient plus, celles
+    en cours terminent sur leurs fichiers memory-mappés.
+    """
     global indexer
-    deleted = []
     
-    if os.path.exists(INDEX_PATH):
-        os.remove(INDEX_PATH)
+    # Réinitialiser l'indexer global
+    with indexer_lock:
+        deleted = [f'version {version}' for version in index_versions.clear()]
+        indexer = None
+    answer_cache.invalidate()
+    
+    if os.path.exists(LEGACY_INDEX_PATH):
+        os.remove(LEGACY_INDEX_PATH)
         deleted.append('faiss_index.bin')
     
-    if os.path.exists(METADATA_PATH):
-        os.remove(METADATA_PATH)
+    if ChunkStore.delete(LEGACY_STORE_PATH):
+        deleted.append('chunk_store')
+    
+    if os.path.exists(LEGACY_METADATA_PATH):
+        os.remove(LEGACY_METADATA_PATH)
         deleted.append('index_metadata.pkl')
     
-    # Réinitialiser l'indexer global
-    indexer = None
+    if os.path.exists(LEGACY_MANIFEST_PATH):
+        os.remove(LEGACY_MANIFEST_PATH)
     
     return deleted
 
+def parse_search_params(data):
+    """Lit les paramètres d'une requête de recherche (mêmes valeurs par défaut que l'interface)"""
+    return {
+        'question': data.get('question', ''),
+        'conversation_history': data.get('conversation_history', []),
+        'top_k': data.get('top_k', 5),
+        'temperature': data.get('temperature', 0.7),
+        'max_tokens': data.get('max_tokens', 500),
+        'system_prompt': data.get('system_prompt', ''),
+        'nprobe': data.get('nprobe'),
+        'ef_search': data.get('ef_search'),
+        'min_score': data.get('min_score'),
+        'retrieval_mode': data.get('retrieval_mode', RETRIEVAL_MODE),
+        'rerank': bool(data.get('rerank', RERANK)),
+        'context_max_tokens': data.get('context_max_tokens', CONTEXT_MAX_TOKENS),
+        'sources': data.get('sources'),
+        'exclude_sources': data.get('exclude_sources') or []
+    }
+
+def check_search_request(params, require_llm=True):
+    """
+    Vérifie qu'une recherche peut être lancée (question fournie, paramètres valides, LLM configuré)
+    et convertit le budget de contexte en entier et le score minimal en nombre
+    
+    Args:
+        require_llm: Vérifier aussi la configuration du LLM (réponse à générer)
+        
+    Returns:
+        (message, code HTTP) en cas d'erreur, sinon None
+    """
+    if not params['question']:
+        return 'Question non fournie', 400
+    if params['retrieval_mode'] not in SEARCH_MODES:
+        return f"Mode de recherche inconnu: {params['retrieval_mode']}", 400
+    try:
+        params['context_max_tokens'] = int(params['context_max_tokens'])
+    except (TypeError, ValueError):
+        return "'context_max_tokens' doit être un nombre entier de tokens", 400
+    if params['context_max_tokens'] < 1:
+        return "'context_max_tokens' doit être positif", 400
+    if params['min_score'] is not None:
+        if isinstance(params['min_score'], bool):
+            return "'min_score' doit être un nombre", 400
+        try:
+            params['min_score'] = float(params['min_score'])
+        except (TypeError, ValueError):
+            return "'min_score' doit être un nombre", 400
+    for key in ('sources', 'exclude_sources'):
+        value = params[key]
+        if value is not None and (not isinstance(value, list) or not all(isinstance(name, str) for name in value)):
+            return f"'{key}' doit être une liste de noms de fichiers", 400
+    
+    if not require_llm:
+        return None
+    if LLM_MODE == 'local' and not local_llm:
+        return 'LLM local non initialisé', 500
+    if LLM_MODE != 'local' and not os.environ.get('OPENAI_API_KEY'):
+        return 'Clé API OpenAI non configurée', 500
+    return None
+
+def check_index_search(search_indexer, params):
+    """
+    Vérifie que les paramètres de recherche s'appliquent à l'index chargé
+    (un score minimal n'a de sens qu'avec la métrique 'ip')
+    
+    Returns:
+        (message, code HTTP) en cas d'erreur, sinon None
+    """
+    if params['min_score'] is not None and search_indexer.metric != 'ip':
+        return (f"'min_score' nécessite un index créé avec metric: \"ip\" "
+                f"(index actuel: {search_indexer.metric})"), 400
+    return None
+
+def current_llm_model():
+    """Nom du modèle qui génère les réponses"""
+    return OLLAMA_MODEL if LLM_MODE == 'local' else OPENAI_MODEL
+
+def lookup_answer_cache(search_indexer, params):
+    """
+    Cherche la réponse d'une question similaire dans le cache sémantique
+    (uniquement en début de conversation : ensuite la réponse dépend aussi de l'historique)
+    
+    Returns:
+        (clé pour enregistrer la réponse, ou None si le cache ne s'applique pas,
+         réponse JSON en cache ou None)
+    """
+    if not answer_cache.enabled or len(params['conversation_history']) > 1:
+        return None, None
+    
+    cache_request = {
+        'vector': search_indexer.generate_query_embedding(params['question']),
+        'index_version': search_indexer.index_version,
+        'context': SemanticAnswerCache.context_key(
+            llm_mode=LLM_MODE,
+            llm_model=current_llm_model(),
+            system_prompt=params['system_prompt'],
+            top_k=params['top_k'],
+            temperature=params['temperature'],
+            max_tokens=params['max_tokens'],
+            nprobe=params['nprobe'],
+            ef_search=params['ef_search'],
+            min_score=params['min_score'],
+            retrieval_mode=params['retrieval_mode'],
+            rerank_model=RERANK_MODEL if params['rerank'] and reranker is not None else None,
+            context_max_tokens=params['context_max_tokens'],
+            sources=sorted(params['sources']) if params['sources'] is not None else None,
+            exclude_sources=sorted(params['exclude_sources'])
+        )
+    }
+    cached = answer_cache.lookup(cache_request['vector'], cache_request['index_version'],
+                                 cache_request['context'])
+    if not cached:
+        return cache_request, None
+    
+    return cache_request, {
+        **cached['response'],
+        'success': True,
+        'embedding_mode': EMBEDDING_MODE,
+        'tokens': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        'cached': {
+            'question': cached['question'],
+            'similarity': round(cached['similarity'], 4)
+        }
+    }
+
+def store_answer_cache(cache_request, question, answer, search_results):
+    """Enregistre une réponse générée dans le cache sémantique"""
+    if cache_request is None:
+        return
+    answer_cache.add(cache_request['vector'], question, {
+        'answer': answer,
+        'sources': search_results,
+        'llm_mode': LLM_MODE,
+        'llm_model': current_llm_model()
+    }, cache_request['index_version'], cache_request['context'])
+
+def retrieve_sources(search_indexer, params, timings):
+    """
+    Recherche les chunks pertinents pour la question, puis les reclasse avec le
+    cross-encoder si le re-ranking est demandé (candidats en surnombre, top_k conservés)
+    
+    Args:
+        timings: Dict complété avec la durée de chaque étape (retrieval_ms, rerank_ms)
+        
+    Returns:
+        (résultats, informations sur le re-ranking ou None s'il n'est pas appliqué)
+    """
+    search_results, rerank_infos = retrieve_sources_batch(search_indexer, params, [params['question']], timings)
+    return search_results[0], rerank_infos[0]
+
+def retrieve_sources_batch(search_indexer, params, questions, timings):
+    """
+    Recherche les chunks pertinents de plusieurs questions (embeddings et recherche
+    FAISS groupés), puis reclasse ceux de chaque question si le re-ranking est demandé
+    
+    Args:
+        questions: Questions, recherchées avec les mêmes paramètres
+        timings: Dict complété avec la durée de chaque étape (retrieval_ms, rerank_ms cumulé)
+        
+    Returns:
+        (résultats de chaque question, informations sur chaque re-ranking), dans l'ordre des questions
+    """
+    rerank = params['rerank'] and reranker is not None
+    fetch_k = max(params['top_k'], RERANK_CANDIDATES) if rerank else params['top_k']
+    
+    start_time = time.time()
+    search_results = search_indexer.search_batch(questions, top_k=fetch_k, nprobe=params['nprobe'],
+                                                 ef_search=params['ef_search'], min_score=params['min_score'],
+                                                 mode=params['retrieval_mode'], sources=params['sources'],
+                                                 exclude_sources=params['exclude_sources'])
+    timings['retrieval_ms'] = round((time.time() - start_time) * 1000, 1)
+    
+    rerank_infos = [None] * len(questions)
+    if not rerank:
+        return search_results, rerank_infos
+    for i, question in enumerate(questions):
+        if search_results[i]:
+            search_results[i], rerank_infos[i] = reranker.rerank(question, search_results[i], params['top_k'])
+            timings['rerank_ms'] = round(timings.get('rerank_ms', 0) + rerank_infos[i]['ms'], 1)
+    return search_results, rerank_infos
+
+def no_result_error(params):
+    """Message d'erreur quand aucun chunk ne correspond à la question"""
+    error = 'Aucun résultat trouvé'
+    if params['min_score'] is not None:
+        error += f" (score minimal: {params['min_score']})"
+    if params['sources'] is not None or params['exclude_sources']:
+        error += " dans les documents sélectionnés"
+    return error
+
+def build_context(search_results, params):
+    """
+    Construit le contexte documentaire transmis au LLM dans le budget de tokens
+    (doublons écartés, chunks voisins fusionnés)
+    
+    Returns:
+        (contexte, statistiques dont les tokens économisés)
+    """
+    return context_builder.build(search_results, params['context_max_tokens'])
+
+def build_llm_input(params, context):
+    """
+    Prépare l'entrée du LLM avec le contexte documentaire et l'historique de conversation
+    
+    Returns:
+        Prompt complet (mode local) ou liste de messages (mode OpenAI)
+    """
+    # Utiliser le prompt système personnalisé s'il est fourni, sinon utiliser le prompt par défaut
+    system_prompt = params['system_prompt'] or DEFAULT_SYSTEM_PROMPT
+    conversation_history = params['conversation_history']
+    
+    if LLM_MODE == 'local':
+        # Construire le prompt avec l'historique de conversation
+        conversation_context = ""
+        if len(conversation_history) > 1:  # S'il y a de l'historique (plus que la question actuelle)
+            conversation_context = "\n\nHistorique de la conversation :\n"
+            for i, msg in enumerate(conversation_history[:-1]):  # Exclure la dernière question
+                role = "Utilisateur" if msg['role'] == 'user' else "Assistant"
+                conversation_context += f"{role}: {msg['content']}\n"
+        
+        prompt = f"""{system_prompt}
+
+            Contexte documentaire :
+            {context}
+            {conversation_context}
+
+            Question : {params['question']}
+
+            Réponds en tant que testeur ISTQB certifié, en te basant sur le contexte fourni et l'historique de conversation."""
+        return prompt
+    
+    # Construire les messages avec l'historique
+    messages = [
+        {
+            "role": "system",
+            "content": system_prompt
+        }
+    ]
+    
+    # Ajouter le contexte documentaire comme premier message utilisateur
+    messages.append({
+        "role": "user",
+        "content": f"Contexte documentaire disponible :\n{context}"
+    })
+    
+    messages.append({
+        "role": "assistant",
+        "content": "J'ai bien pris connaissance du contexte documentaire. Je suis prêt à répondre à vos questions en tant que testeur ISTQB certifié."
+    })
+    
+    # Ajouter l'historique de conversation (limiter aux 10 derniers échanges pour ne pas dépasser les tokens)
+    recent_history = conversation_history[-20:] if len(conversation_history) > 20 else conversation_history
+    messages.extend(recent_history)
+    return messages
+
+def generate_answer(params, llm_input):
+    """
+    Génère la réponse complète du LLM (Ollama ou OpenAI)
+    
+    Returns:
+        (réponse, tokens consommés)
+    """
+    if LLM_MODE == 'local':
+        answer = local_llm.generate_simple(
+            prompt=llm_input,
+            temperature=params['temperature']
+        )
+        # Estimation approximative des tokens pour Ollama (1 token ≈ 4 caractères)
+        return answer, estimate_tokens(llm_input, answer)
+    
+    response = openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=llm_input,
+        temperature=params['temperature'],
+        max_tokens=params['max_tokens']
+    )
+    # Récupérer les tokens utilisés depuis OpenAI
+    return response.choices[0].message.content, {
+        'prompt_tokens': response.usage.prompt_tokens,
+        'completion_tokens': response.usage.completion_tokens,
+        'total_tokens': response.usage.total_tokens
+    }
+
+def openai_client():
+    """Client OpenAI pour la génération des réponses"""
+    from openai import OpenAI
+    return OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+
+def estimate_tokens(llm_input, answer):
+    """Estimation approximative des tokens quand le LLM ne les fournit pas (1 token ≈ 4 caractères)"""
+    if isinstance(llm_input, str):
+        prompt_length = len(llm_input)
+    else:
+        prompt_length = sum(len(message['content']) for message in llm_input)
+    prompt_tokens = prompt_length // 4
+    completion_tokens = len(answer) // 4
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens
+    }
+
+def stream_answer(params, llm_input, usage):
+    """
+    Génère la réponse fragment par fragment
+    
+    Args:
+        params: Paramètres de la recherche (température, max_tokens)
+        llm_input: Entrée préparée par build_llm_input
+        usage: Dictionnaire complété avec les tokens consommés quand le LLM les fournit (OpenAI)
+        
+    Returns:
+        Itérateur sur les fragments de texte générés
+    """
+    if LLM_MODE == 'local':
+        yield from local_llm.stream_simple(llm_input, temperature=params['temperature'])
+        return
+    
+    stream = openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=llm_input,
+        temperature=params['temperature'],
+        max_tokens=params['max_tokens'],
+        stream=True,
+        stream_options={'include_usage': True}
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+        # Le dernier fragment ne contient que les tokens consommés
+        if chunk.usage:
+            usage.update({
+                'prompt_tokens': chunk.usage.prompt_tokens,
+                'completion_tokens': chunk.usage.completion_tokens,
+                'total_tokens': chunk.usage.total_tokens
+            })
+
+def sse_event(event, data):
+    """Formate un événement Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.route('/')
 def index():
     """
@@ -144,7 +708,7 @@ def index():
     """
     files = get_uploaded_files()
     has_documents = len(files) > 0
-    has_index = os.path.exists(INDEX_PATH) and os.path.exists(METADATA_PATH)
+    has_index = index_versions.current() is not None
     return render_template('index.html', 
                          has_documents=has_documents, 
                          has_index=has_index,
@@ -162,7 +726,7 @@ def prompt_library():
     """
     files = get_uploaded_files()
     has_documents = len(files) > 0
-    has_index = os.path.exists(INDEX_PATH) and os.path.exists(METADATA_PATH)
+    has_index = index_versions.current() is not None
     return render_template('prompt_library.html', 
                          has_documents=has_documents, 
                          has_index=has_index,
@@ -179,7 +743,7 @@ def upload():
     et affiche la liste des documents déjà uploadés.
     """
     files = get_uploaded_files()
-    has_index = os.path.exists(INDEX_PATH) and os.path.exists(METADATA_PATH)
+    has_index = index_versions.current() is not None
     return render_template('upload.html', 
                          files=files, 
                          has_documents=len(files) > 0, 
@@ -197,7 +761,7 @@ def indexation():
     de l'index vectoriel FAISS pour la recherche.
     """
     files = get_uploaded_files()
-    index_exists = os.path.exists(INDEX_PATH) and os.path.exists(METADATA_PATH)
+    index_exists = index_versions.current() is not None
     
     index_stats = None
     if index_exists and indexer and indexer.index is not None:
@@ -222,14 +786,17 @@ def search():
     aux questions en se basant sur les documents indexés.
     """
     files = get_uploaded_files()
-    has_index = os.path.exists(INDEX_PATH) and os.path.exists(METADATA_PATH)
+    has_index = index_versions.current() is not None
     return render_template('search.html', 
                          has_documents=len(files) > 0, 
                          has_index=has_index,
+                         documents=sorted(file['name'] for file in files),
                          llm_mode=LLM_MODE,
                          embedding_mode=EMBEDDING_MODE,
                          ollama_model=OLLAMA_MODEL if LLM_MODE == 'local' else None,
-                         openai_model=OPENAI_MODEL if LLM_MODE == 'openai' else None)
+                         openai_model=OPENAI_MODEL if LLM_MODE == 'openai' else None,
+                         rerank_available=reranker is not None,
+                         rerank_default=RERANK)
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
@@ -286,7 +853,14 @@ def delete_file(filename):
     """
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
     
-    if os.path.exists(filepath):
+    # Une indexation en cours lit les fichiers et publierait une version après la suppression
+    if not index_lock.acquire():
+        return jsonify({'error': 'Une indexation est en cours'}), 409
+    
+    try:
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'Fichier non trouvé'}), 404
+        
         os.remove(filepath)
         
         # Si c'était le dernier fichier, supprimer aussi les index
@@ -301,8 +875,8 @@ def delete_file(filename):
                 })
         
         return jsonify({'success': True, 'message': f'Fichier {filename} supprimé'})
-    else:
-        return jsonify({'error': 'Fichier non trouvé'}), 404
+    finally:
+        index_lock.release()
 
 @app.route('/api/delete-all', methods=['DELETE'])
 def delete_all_files():
@@ -311,6 +885,9 @@ def delete_all_files():
     Supprime tous les documents uploadés et les index FAISS associés.
     Réinitialise complètement le système.
     """
+    if not index_lock.acquire():
+        return jsonify({'error': 'Une indexation est en cours'}), 409
+    
     try:
         deleted_count = 0
         if os.path.exists(app.config['UPLOAD_FOLDER']):
@@ -335,6 +912,8 @@ def delete_all_files():
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        index_lock.release()
 
 @app.route('/api/delete-index', methods=['DELETE'])
 def delete_index_only():
@@ -343,6 +922,9 @@ def delete_index_only():
     Supprime les fichiers d'index sans toucher aux documents uploadés.
     Utile pour ré-indexer avec un mode d'embedding différent.
     """
+    if not index_lock.acquire():
+        return jsonify({'success': False, 'error': 'Une indexation est en cours'}), 409
+    
     try:
         deleted_indexes = delete_indexes()
         
@@ -359,6 +941,8 @@ def delete_index_only():
             }), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        index_lock.release()
 
 
 
@@ -368,76 +952,310 @@ def create_index():
     API POST : Création de l'index FAISS.
     Extrait le texte, découpe en chunks, génère les embeddings
     (OpenAI ou local) et crée l'index vectoriel pour la recherche.
+    En mode incrémental, seuls les fichiers nouveaux ou modifiés sont
+    traités et les vecteurs des fichiers supprimés sont retirés de l'index.
+    L'indexation s'exécute en arrière-plan : la réponse contient l'id de la
+    tâche à suivre avec /api/index/jobs/<job_id> (ou le résultat complet
+    si la configuration contient "wait": true).
     """
-    global indexer, local_embedder
+    config = request.get_json() or {}
+    
+    index_type = config.get('index_type', 'flat')
+    metric = config.get('metric', 'l2')
+    if index_type not in INDEX_TYPES:
+        return jsonify({'success': False, 'error': f"Type d'index inconnu: {index_type}"}), 400
+    if metric not in METRICS:
+        return jsonify({'success': False, 'error': f"Métrique inconnue: {metric}"}), 400
+    quantization = config.get('quantization') or 'none'
+    if quantization not in QUANTIZATIONS:
+        return jsonify({'success': False, 'error': f"Compression inconnue: {quantization}"}), 400
+    if index_type == 'ivf_pq' and quantization in ('fp16', 'sq8'):
+        return jsonify({'success': False, 'error': "Un index ivf_pq est déjà compressé par quantification par produit"}), 400
+    # Convertis avant de lancer la tâche : une valeur invalide est refusée ici plutôt
+    # que de faire échouer l'indexation en arrière-plan
+    for key, default in INDEXING_INT_PARAMS.items():
+        try:
+            config[key] = int(config.get(key, default))
+        except (TypeError, ValueError):
+            config[key] = 0
+        if config[key] < 1:
+            return jsonify({'success': False, 'error': f"'{key}' doit être un entier positif"}), 400
+    if config.get('embedding_dimensions'):
+        try:
+            config['embedding_dimensions'] = int(config['embedding_dimensions'])
+        except (TypeError, ValueError):
+            config['embedding_dimensions'] = 0
+        if config['embedding_dimensions'] < 1:
+            return jsonify({'success': False, 'error': "'embedding_dimensions' doit être un entier positif"}), 400
+    if config.get('extraction_timeout') is not None:
+        try:
+            config['extraction_timeout'] = float(config['extraction_timeout'])
+        except (TypeError, ValueError):
+            config['extraction_timeout'] = 0
+        if not config['extraction_timeout'] > 0:
+            return jsonify({'success': False, 'error': "'extraction_timeout' doit être une durée positive en secondes"}), 400
+    if config.get('embedding_dimensions') and (
+            EMBEDDING_MODE == 'local'
+            or not config.get('embedding_model', 'text-embedding-3-small').startswith('text-embedding-3')):
+        return jsonify({'success': False,
+                        'error': "'embedding_dimensions' n'est disponible qu'avec les embeddings OpenAI text-embedding-3"}), 400
+    
+    if EMBEDDING_MODE == 'local':
+        if not local_embedder:
+            return jsonify({'success': False, 'error': 'Embedder local non initialisé'}), 500
+    elif not os.environ.get('OPENAI_API_KEY'):
+        return jsonify({'success': False, 'error': 'Clé API OpenAI non configurée'}), 500
+    
+    # Une seule indexation à la fois : les recherches continuent sur l'index courant
+    if not index_lock.acquire():
+        return jsonify({'success': False, 'error': 'Une indexation est déjà en cours'}), 409
     
     try:
-        # Récupérer la configuration
-        config = request.get_json()
-        chunk_size = config.get('chunk_size', 500)
-        chunk_overlap = config.get('chunk_overlap', 50)
-        embedding_model = config.get('embedding_model', 'text-embedding-3-small')
-        
-        start_time = time.time()
-        
-        # 1. Traiter les documents
-        print("Étape 1: Extraction du texte...")
-        processor = DocumentProcessor()
-        documents = processor.process_directory(UPLOAD_FOLDER)
-        
-        successful_docs = [doc for doc in documents if doc.get('success')]
-        if not successful_docs:
-            return jsonify({'success': False, 'error': 'Aucun document valide à indexer'}), 400
-        
-        # 2. Chunking
-        print("Étape 2: Découpage en chunks...")
-        chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-        chunks = chunker.chunk_documents(successful_docs)
-        
-        if not chunks:
-            return jsonify({'success': False, 'error': 'Aucun chunk généré'}), 400
+        IndexingJob.prune(JOBS_FOLDER)
+        job = IndexingJob(JOBS_FOLDER)
+    except Exception as e:
+        index_lock.release()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    if config.get('wait'):
+        run_indexing_job(job, config)
+        if job.status == 'succeeded':
+            return jsonify({**job.result, 'job_id': job.id})
+        return jsonify({'success': False, 'error': job.error, 'job_id': job.id}), 500
+    
+    indexing_jobs[job.id] = job
+    threading.Thread(target=run_indexing_job, args=(job, config), daemon=True).start()
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status}), 202
+
+def run_indexing_job(job, config):
+    """Exécute une indexation et enregistre son issue dans la tâche, puis libère le verrou d'indexation"""
+    try:
+        job.finish('succeeded', result=run_indexing(job, config))
+    except IndexingCancelled:
+        print(f"Indexation {job.id} annulée")
+        job.finish('cancelled', error='Indexation annulée')
+    except Exception as e:
+        print(f"Erreur lors de l'indexation: {str(e)}")
+        job.finish('failed', error=str(e))
+    finally:
+        indexing_jobs.pop(job.id, None)
+        index_lock.release()
+
+def run_indexing(job, config):
+    """
+    Construit ou met à jour l'index puis remplace l'index de recherche
+    
+    Args:
+        job: Tâche qui reçoit l'avancement et transmet les demandes d'annulation
+        config: Configuration de l'indexation (voir /api/index)
         
-        # 3. Créer l'index FAISS (mode hybride)
-        print(f"Étape 3: Création de l'index FAISS (mode {EMBEDDING_MODE})...")
+    Returns:
+        Résultat de l'indexation
+    """
+    global indexer
+    
+    # Récupérer la configuration
+    chunk_size = config.get('chunk_size', 500)
+    chunk_overlap = config.get('chunk_overlap', 50)
+    embedding_model = config.get('embedding_model', 'text-embedding-3-small')
+    incremental = config.get('incremental', True)
+    # Paramètres numériques déjà convertis et vérifiés par create_index
+    embedding_batch_size = config['embedding_batch_size']
+    embedding_concurrency = config['embedding_concurrency']
+    embedding_batch_tokens = config['embedding_batch_tokens']
+    extraction_workers = config['extraction_workers']
+    extraction_timeout = config.get('extraction_timeout')
+    window_size = config['window_size']
+    chunk_workers = config['chunk_workers']
+    index_type = config.get('index_type', 'flat')
+    metric = config.get('metric', 'l2')
+    embedding_dimensions = config.get('embedding_dimensions') or None
+    index_params = {
+        key: config[key] for key in DEFAULT_INDEX_PARAMS
+        if config.get(key) is not None
+    }
+    
+    start_time = time.time()
+    
+    model_name = "local (Sentence Transformers)" if EMBEDDING_MODE == 'local' else embedding_model
+    
+    # Configuration qui doit être identique pour réutiliser l'index existant
+    index_config = {
+        'chunk_size': chunk_size,
+        'chunk_overlap': chunk_overlap,
+        'embedding_mode': EMBEDDING_MODE,
+        'embedding_model': model_name,
+        'chunker_version': TextChunker.VERSION,
+        'index_type': index_type,
+        'metric': metric,
+        # nprobe et ef_search ne sont que des valeurs par défaut de recherche
+        'index_params': {key: value for key, value in index_params.items()
+                         if key not in ('nprobe', 'ef_search')}
+    }
+    if embedding_dimensions:
+        index_config['embedding_dimensions'] = embedding_dimensions
+    
+    upload_paths = {
+        f['name']: os.path.join(UPLOAD_FOLDER, f['name'])
+        for f in get_uploaded_files()
+    }
+    
+    # Les versions abandonnées (indexation interrompue par un arrêt du serveur) sont supprimées
+    index_versions.gc()
+    
+    # Partir de la version publiée : elle n'est pas modifiée, la nouvelle version est écrite à côté
+    current_paths = index_versions.current_paths()
+    manifest = IndexManifest(current_paths['manifest'] if current_paths else None)
+    new_indexer = None
+    if incremental and current_paths and manifest.load() and manifest.matches(index_config):
+        new_indexer = build_indexer(embedding_model, embedding_batch_size,
+                                    embedding_concurrency, embedding_batch_tokens,
+                                    index_type, index_params, metric, embedding_dimensions)
+        new_indexer.load_index(current_paths['index'], current_paths['metadata'])
+        delta = manifest.diff(upload_paths)
+        # Index sans suppression possible (HNSW) : reconstruire si des fichiers ont changé
+        if (delta['changed'] or delta['deleted']) and not new_indexer.supports_removal():
+            new_indexer = None
+    
+    if new_indexer is not None:
+        indexing_mode = 'incremental'
+        to_process = delta['added'] + delta['changed']
         
-        if EMBEDDING_MODE == 'local':
-            # Mode local
-            if not local_embedder:
-                return jsonify({'success': False, 'error': 'Embedder local non initialisé'}), 500
-            indexer = FAISSIndexer(mode='local', local_embedder=local_embedder)
-            model_name = "local (Sentence Transformers)"
+        # Retirer les vecteurs des fichiers modifiés ou supprimés
+        removed_vectors = 0
+        for filename in delta['changed'] + delta['deleted']:
+            if job.cancel_requested():
+                raise IndexingCancelled()
+            removed_vectors += new_indexer.remove_vectors(manifest.remove_file(filename))
+        job.update(vectors_removed=removed_vectors)
+    else:
+        indexing_mode = 'full'
+        delta = {'added': sorted(upload_paths), 'changed': [], 'deleted': [], 'unchanged': [], 'hashes': {}}
+        to_process = delta['added']
+        removed_vectors = 0
+        manifest.reset(index_config)
+        new_indexer = build_indexer(embedding_model, embedding_batch_size,
+                                    embedding_concurrency, embedding_batch_tokens,
+                                    index_type, index_params, metric, embedding_dimensions)
+    
+    # 1-3. Extraction, chunking et embeddings en flux, par fenêtres de chunks
+    print(f"Étapes 1-3: Extraction, découpage et indexation ({len(to_process)} fichier(s), "
+          f"mode {indexing_mode}, embeddings {EMBEDDING_MODE})...")
+    if indexing_mode == 'full':
+        new_indexer.reset_index()
+    job.update(stage='indexing', files_total=len(to_process))
+    
+    chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap, workers=chunk_workers)
+    pipeline = IndexingPipeline(new_indexer, chunker, window_size=window_size,
+                                extraction_workers=extraction_workers,
+                                extraction_timeout=extraction_timeout,
+                                progress_callback=lambda p: job.update(
+                                    files_extracted=p.documents_processed,
+                                    files_failed=len(p.failed_files),
+                                    chunks_produced=p.chunks_produced,
+                                    vectors_embedded=p.chunks_indexed),
+                                should_cancel=job.cancel_requested)
+    vector_ids_by_file = pipeline.run([upload_paths[name] for name in to_process])
+    
+    if indexing_mode == 'full' and pipeline.documents_processed == 0:
+        raise ValueError('Aucun document valide à indexer')
+    
+    if indexing_mode == 'full' and pipeline.chunks_indexed == 0:
+        raise ValueError('Aucun chunk généré')
+    
+    # Dernière possibilité d'annuler : l'index courant n'a pas encore été remplacé
+    if job.cancel_requested():
+        raise IndexingCancelled()
+    
+    # Mettre à jour le manifeste avec les ids des vecteurs de chaque fichier
+    # (un fichier dont l'extraction s'est arrêtée en cours de route sera retraité)
+    failed_filenames = {failure['filename'] for failure in pipeline.failed_files}
+    for filename, vector_ids in vector_ids_by_file.items():
+        file_hash = delta['hashes'].get(filename) or IndexManifest.file_hash(upload_paths[filename])
+        manifest.set_file(filename, upload_paths[filename], file_hash, vector_ids,
+                          complete=filename not in failed_filenames)
+    
+    # 4. Sauvegarder l'index dans une nouvelle version, puis la publier d'un bloc
+    print("Étape 4: Sauvegarde de l'index...")
+    job.update(stage='saving')
+    version = index_versions.create()
+    version_paths = index_versions.paths(version)
+    new_indexer.save_index(version_paths['index'], version_paths['metadata'])
+    manifest.path = version_paths['manifest']
+    manifest.save()
+    index_versions.publish(version)
+    # Servir les recherches depuis l'index memory-mappé plutôt que la copie en mémoire
+    with indexer_lock:
+        if FAISS_MMAP:
+            indexer = load_search_indexer()
         else:
-            # Mode OpenAI
-            api_key = os.environ.get('OPENAI_API_KEY')
-            if not api_key:
-                return jsonify({'success': False, 'error': 'Clé API OpenAI non configurée'}), 500
-            indexer = FAISSIndexer(api_key=api_key, model=embedding_model, mode='openai')
-            model_name = embedding_model
-        
-        index_result = indexer.create_index(chunks)
-        
-        if not index_result.get('success'):
-            return jsonify({'success': False, 'error': index_result.get('error', 'Erreur inconnue')}), 500
-        
-        # 4. Sauvegarder l'index
-        print("Étape 4: Sauvegarde de l'index...")
-        indexer.save_index(INDEX_PATH, METADATA_PATH)
-        
-        elapsed_time = round(time.time() - start_time, 2)
-        
-        return jsonify({
-            'success': True,
-            'documents_processed': len(successful_docs),
-            'total_chunks': len(chunks),
-            'total_vectors': index_result['total_chunks'],
-            'model': model_name,
-            'mode': EMBEDDING_MODE,
-            'elapsed_time': elapsed_time
-        })
-        
-    except Exception as e:
-        print(f"Erreur lors de l'indexation: {str(e)}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+            new_indexer.load_stats['version'] = version
+            indexer = new_indexer
+    answer_cache.invalidate()
+    # Les recherches en cours sur une ancienne version gardent ses fichiers ouverts
+    index_versions.gc()
+    
+    elapsed_time = round(time.time() - start_time, 2)
+    
+    return {
+        'success': True,
+        'indexing_mode': indexing_mode,
+        'documents_processed': pipeline.documents_processed,
+        'total_chunks': pipeline.chunks_indexed,
+        'total_vectors': new_indexer.index.ntotal,
+        'files_added': len(delta['added']),
+        'files_updated': len(delta['changed']),
+        'files_removed': len(delta['deleted']),
+        'files_unchanged': len(delta['unchanged']),
+        'failed_files': pipeline.failed_files,
+        'vectors_removed': removed_vectors,
+        'embedding_cache': new_indexer.cache_stats,
+        'embedding': new_indexer.get_embedding_stats(),
+        'model': model_name,
+        'mode': EMBEDDING_MODE,
+        'index_type': index_type,
+        'metric': metric,
+        'storage': new_indexer.get_storage_stats(),
+        'version': version,
+        'elapsed_time': elapsed_time
+    }
+
+@app.route('/api/index/jobs', methods=['GET'])
+def list_index_jobs():
+    """
+    API GET : Dernières tâches d'indexation.
+    Permet notamment de reprendre le suivi d'une indexation en cours
+    après un rechargement de la page.
+    """
+    return jsonify({'jobs': IndexingJob.list_jobs(JOBS_FOLDER)})
+
+@app.route('/api/index/jobs/<job_id>', methods=['GET'])
+def get_index_job(job_id):
+    """
+    API GET : Avancement d'une tâche d'indexation.
+    Retourne l'étape en cours, les compteurs (fichiers extraits, chunks
+    produits, vecteurs embeddés), le débit, le temps restant estimé et,
+    une fois la tâche terminée, son résultat ou son erreur.
+    """
+    job = indexing_jobs.get(job_id)
+    state = job.snapshot() if job else IndexingJob.read(JOBS_FOLDER, job_id)
+    if state is None:
+        return jsonify({'success': False, 'error': 'Tâche inconnue'}), 404
+    return jsonify(state)
+
+@app.route('/api/index/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_index_job(job_id):
+    """
+    API POST : Annulation d'une tâche d'indexation.
+    L'indexation s'arrête au prochain document ou à la prochaine fenêtre
+    de chunks ; l'index de recherche courant n'est pas modifié.
+    """
+    job = indexing_jobs.get(job_id)
+    if job:
+        job.cancel()
+    elif not IndexingJob.request_cancel(JOBS_FOLDER, job_id):
+        return jsonify({'success': False, 'error': 'Aucune indexation en cours avec cet id'}), 404
+    return jsonify({'success': True, 'job_id': job_id})
 
 @app.route('/api/index-stats', methods=['GET'])
 def get_index_stats():
@@ -446,24 +1264,16 @@ def get_index_stats():
     Retourne le nombre de vecteurs, chunks, sources indexées
     et le modèle d'embedding utilisé.
     """
-    global indexer, local_embedder
-    
     try:
-        if os.path.exists(INDEX_PATH) and os.path.exists(METADATA_PATH):
-            if indexer is None or indexer.index is None:
-                # Charger l'index selon le mode
-                if EMBEDDING_MODE == 'local':
-                    if not local_embedder:
-                        return jsonify({'indexed': False, 'error': 'Embedder local non initialisé'})
-                    indexer = FAISSIndexer(mode='local', local_embedder=local_embedder)
-                else:
-                    api_key = os.environ.get('OPENAI_API_KEY')
-                    indexer = FAISSIndexer(api_key=api_key, mode='openai')
-                
-                indexer.load_index(INDEX_PATH, METADATA_PATH)
-            
-            stats = indexer.get_stats()
+        stats_indexer = get_search_indexer()
+        if stats_indexer is not None:
+            stats = stats_indexer.get_stats()
             stats['embedding_mode'] = EMBEDDING_MODE
+            stats['query_cache'] = query_cache.get_stats()
+            stats['answer_cache'] = answer_cache.get_stats()
+            if reranker is not None:
+                stats['reranker'] = {'model': reranker.model_name, 'budget_ms': reranker.budget_ms,
+                                     'candidates': RERANK_CANDIDATES, **reranker.stats}
             return jsonify(stats)
         else:
             return jsonify({'indexed': False})
@@ -480,189 +1290,258 @@ def search_documents():
     avec l'assistant testeur ISTQB (OpenAI ou Ollama).
     Conserve l'historique de conversation pour un dialogue continu.
     """
-    global indexer, local_embedder, local_llm
-    
+    start_time = time.time()
     try:
-        # Récupérer les paramètres
-        data = request.get_json()
-        question = data.get('question', '')
-        conversation_history = data.get('conversation_history', [])
-        top_k = data.get('top_k', 5)
-        temperature = data.get('temperature', 0.7)
-        max_tokens = data.get('max_tokens', 500)
-        custom_system_prompt = data.get('system_prompt', '')
+        params = parse_search_params(request.get_json())
+        error = check_search_request(params)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
         
-        if not question:
-            return jsonify({'success': False, 'error': 'Question non fournie'}), 400
+        # Index partagé entre les requêtes (chargé si nécessaire)
+        search_indexer = get_search_indexer()
+        if search_indexer is None:
+            return jsonify({'success': False, 'error': 'Index non disponible. Veuillez d\'abord indexer des documents.'}), 400
+        error = check_index_search(search_indexer, params)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
         
-        # Vérifier que l'index est chargé
-        if indexer is None or indexer.index is None:
-            if os.path.exists(INDEX_PATH) and os.path.exists(METADATA_PATH):
-                # Charger selon le mode d'embedding
-                if EMBEDDING_MODE == 'local':
-                    if not local_embedder:
-                        return jsonify({'success': False, 'error': 'Embedder local non initialisé'}), 500
-                    indexer = FAISSIndexer(mode='local', local_embedder=local_embedder)
-                else:
-                    api_key = os.environ.get('OPENAI_API_KEY')
-                    indexer = FAISSIndexer(api_key=api_key, mode='openai')
-                
-                indexer.load_index(INDEX_PATH, METADATA_PATH)
-            else:
-                return jsonify({'success': False, 'error': 'Index non disponible. Veuillez d\'abord indexer des documents.'}), 400
-        
-        # 1. Rechercher les chunks pertinents
-        search_results = indexer.search(question, top_k=top_k)
+        # 0. Réutiliser la réponse d'une question similaire
+        cache_request, cached = lookup_answer_cache(search_indexer, params)
+        if cached:
+            return jsonify(cached)
         
+        # 1. Rechercher les chunks pertinents (et les reclasser)
+        timings = {}
+        search_results, rerank_info = retrieve_sources(search_indexer, params, timings)
         if not search_results:
-            return jsonify({'success': False, 'error': 'Aucun résultat trouvé'}), 404
+            return jsonify({'success': False, 'error': no_result_error(params)}), 404
         
-        # 2. Construire le contexte
-        context = "\n\n".join([
-            f"[Document: {result['source']}]\n{result['text']}"
-            for result in search_results
-        ])
+        # 2-3. Construire le contexte et générer la réponse selon le mode LLM
+        generation_start = time.time()
+        context, context_stats = build_context(search_results, params)
+        answer, tokens = generate_answer(params, build_llm_input(params, context))
         
-        # 3. Générer la réponse selon le mode LLM
-        # Utiliser le prompt système personnalisé s'il est fourni, sinon utiliser le prompt par défaut
-        if custom_system_prompt:
-            system_prompt = custom_system_prompt
-        else:
-            system_prompt = """Tu es un testeur certifié ISTQB (International Software Testing Qualifications Board) avec une expertise approfondie en assurance qualité logicielle. 
-
-        Ton rôle est d'assister dans toutes les activités de test selon le processus ISTQB :
-
-        1. **Analyse des tests** : Identifier les conditions de test à partir des exigences et spécifications
-        2. **Conception des tests** : Créer des cas de test détaillés, des scénarios et des données de test
-        3. **Implémentation des tests** : Préparer les scripts de test et l'environnement de test
-        4. **Exécution des tests** : Définir les procédures d'exécution et les critères de validation
-
-        Tu bases tes réponses sur les documents fournis et tu appliques les bonnes pratiques ISTQB. Tu peux :
-        - Analyser des spécifications pour identifier les cas de test
-        - Créer des cas de test détaillés avec préconditions, étapes et résultats attendus
-        - Proposer des stratégies de test adaptées
-        - Identifier les risques et prioriser les tests
-        - Rédiger des rapports de test professionnels
-
-        Si l'information n'est pas dans les documents, tu le dis clairement et tu proposes une approche basée sur les standards ISTQB."""
-
-        if LLM_MODE == 'local':
-            # Mode local avec Ollama
-            if not local_llm:
-                return jsonify({'success': False, 'error': 'LLM local non initialisé'}), 500
-            
-            # Construire le prompt avec l'historique de conversation
-            conversation_context = ""
-            if len(conversation_history) > 1:  # S'il y a de l'historique (plus que la question actuelle)
-                conversation_context = "\n\nHistorique de la conversation :\n"
-                for i, msg in enumerate(conversation_history[:-1]):  # Exclure la dernière question
-                    role = "Utilisateur" if msg['role'] == 'user' else "Assistant"
-                    conversation_context += f"{role}: {msg['content']}\n"
-            
-            prompt = f"""{system_prompt}
-
-            Contexte documentaire :
-            {context}
-            {conversation_context}
-
-            Question : {question}
-
-            Réponds en tant que testeur ISTQB certifié, en te basant sur le contexte fourni et l'historique de conversation."""
-            
-            answer = local_llm.generate_simple(
-                prompt=prompt,
-                temperature=temperature
-            )
-            llm_model = OLLAMA_MODEL
-            
-            # Estimation approximative des tokens pour Ollama (1 token ≈ 4 caractères)
-            prompt_tokens = len(prompt) // 4
-            completion_tokens = len(answer) // 4
-            total_tokens = prompt_tokens + completion_tokens
-        else:
-            # Mode OpenAI avec historique de conversation
-            from openai import OpenAI
-            api_key = os.environ.get('OPENAI_API_KEY')
-            if not api_key:
-                return jsonify({'success': False, 'error': 'Clé API OpenAI non configurée'}), 500
-            
-            client = OpenAI(api_key=api_key)
-            
-            # Construire les messages avec l'historique
-            messages = [
-                {
-                    "role": "system",
-                    "content": system_prompt
-                }
-            ]
-            
-            # Ajouter le contexte documentaire comme premier message utilisateur
-            messages.append({
-                "role": "user",
-                "content": f"Contexte documentaire disponible :\n{context}"
-            })
-            
-            messages.append({
-                "role": "assistant",
-                "content": "J'ai bien pris connaissance du contexte documentaire. Je suis prêt à répondre à vos questions en tant que testeur ISTQB certifié."
-            })
-            
-            # Ajouter l'historique de conversation (limiter aux 10 derniers échanges pour ne pas dépasser les tokens)
-            recent_history = conversation_history[-20:] if len(conversation_history) > 20 else conversation_history
-            messages.extend(recent_history)
-            
-            response = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            
-            answer = response.choices[0].message.content
-            llm_model = OPENAI_MODEL
-            
-            # Récupérer les tokens utilisés depuis OpenAI
-            prompt_tokens = response.usage.prompt_tokens
-            completion_tokens = response.usage.completion_tokens
-            total_tokens = response.usage.total_tokens
+        timings['generation_ms'] = round((time.time() - generation_start) * 1000, 1)
+        store_answer_cache(cache_request, params['question'], answer, search_results)
         
+        timings['total_ms'] = round((time.time() - start_time) * 1000, 1)
         return jsonify({
             'success': True,
             'answer': answer,
             'sources': search_results,
             'llm_mode': LLM_MODE,
-            'llm_model': llm_model,
+            'llm_model': current_llm_model(),
             'embedding_mode': EMBEDDING_MODE,
-            'tokens': {
-                'prompt_tokens': prompt_tokens,
-                'completion_tokens': completion_tokens,
-                'total_tokens': total_tokens
-            }
+            'tokens': tokens,
+            'cached': False,
+            'rerank': rerank_info,
+            'context': context_stats,
+            'timings': timings
         })
         
     except Exception as e:
         print(f"Erreur lors de la recherche: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-
-if __name__ == '__main__':
-    # Charger l'index au démarrage si il existe
-    if os.path.exists(INDEX_PATH) and os.path.exists(METADATA_PATH):
+@app.route('/api/search/batch', methods=['POST'])
+def search_documents_batch():
+    """
+    API POST : Recherche groupée de plusieurs questions (suites de régression).
+    Mêmes paramètres que /api/search, avec 'questions' (liste) au lieu de
+    'question'. Les embeddings des questions sont générés en un seul appel
+    et l'index FAISS est interrogé une seule fois avec la matrice des
+    questions. Avec 'generate': true, les réponses du LLM sont générées en
+    parallèle ('max_concurrency' générations simultanées au plus).
+    Les résultats sont renvoyés dans l'ordre des questions.
+    """
+    start_time = time.time()
+    try:
+        data = request.get_json() or {}
+        questions = data.get('questions')
+        if not isinstance(questions, list) or not questions \
+                or not all(isinstance(question, str) and question.strip() for question in questions):
+            return jsonify({'success': False, 'error': "'questions' doit être une liste de questions non vides"}), 400
+        if len(questions) > BATCH_MAX_QUESTIONS:
+            return jsonify({'success': False,
+                            'error': f"Trop de questions ({len(questions)}, maximum {BATCH_MAX_QUESTIONS})"}), 400
         try:
-            if EMBEDDING_MODE == 'local':
-                if local_embedder:
-                    indexer = FAISSIndexer(mode='local', local_embedder=local_embedder)
-                    indexer.load_index(INDEX_PATH, METADATA_PATH)
-                    print(f"Index FAISS chargé avec succès (mode {EMBEDDING_MODE})!")
-            else:
-                api_key = os.environ.get('OPENAI_API_KEY')
-                if api_key:
-                    indexer = FAISSIndexer(api_key=api_key, mode='openai')
-                    indexer.load_index(INDEX_PATH, METADATA_PATH)
-                    print(f"Index FAISS chargé avec succès (mode {EMBEDDING_MODE})!")
-        except Exception as e:
-            print(f"Erreur lors du chargement de l'index: {str(e)}")
+            max_concurrency = int(data.get('max_concurrency', BATCH_LLM_CONCURRENCY))
+        except (TypeError, ValueError):
+            max_concurrency = 0
+        if max_concurrency < 1:
+            return jsonify({'success': False, 'error': "'max_concurrency' doit être un entier positif"}), 400
+        
+        generate = bool(data.get('generate', False))
+        max_concurrency = min(max_concurrency, BATCH_LLM_CONCURRENCY)
+        params = parse_search_params({**data, 'question': questions[0]})
+        error = check_search_request(params, require_llm=generate)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
+        
+        search_indexer = get_search_indexer()
+        if search_indexer is None:
+            return jsonify({'success': False, 'error': 'Index non disponible. Veuillez d\'abord indexer des documents.'}), 400
+        error = check_index_search(search_indexer, params)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
+        
+        # 1. Rechercher les chunks de toutes les questions (et les reclasser)
+        timings = {}
+        search_results, rerank_infos = retrieve_sources_batch(search_indexer, params, questions, timings)
+        results = []
+        for question, sources, rerank_info in zip(questions, search_results, rerank_infos):
+            result = {'question': question, 'sources': sources, 'rerank': rerank_info}
+            if not sources:
+                result['error'] = no_result_error(params)
+            results.append(result)
+        
+        # 2-3. Générer les réponses, au plus max_concurrency à la fois
+        if generate:
+            def answer(result):
+                # Chaque question est traitée comme le début d'une conversation
+                question_params = {**params, 'question': result['question'],
+                                   'conversation_history': [{'role': 'user', 'content': result['question']}]}
+                try:
+                    cache_request, cached = lookup_answer_cache(search_indexer, question_params)
+                    if cached:
+                        result.update(answer=cached['answer'], tokens=cached['tokens'], cached=cached['cached'])
+                        return
+                    context, result['context'] = build_context(result['sources'], question_params)
+                    result['answer'], result['tokens'] = generate_answer(
+                        question_params, build_llm_input(question_params, context))
+                    result['cached'] = False
+                    store_answer_cache(cache_request, result['question'], result['answer'], result['sources'])
+                except Exception as e:
+                    print(f"Erreur lors de la génération ({result['question'][:50]}): {str(e)}")
+                    result['error'] = str(e)
+            
+            generation_start = time.time()
+            with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='batch-llm') as executor:
+                list(executor.map(answer, [result for result in results if result['sources']]))
+            timings['generation_ms'] = round((time.time() - generation_start) * 1000, 1)
+        
+        timings['total_ms'] = round((time.time() - start_time) * 1000, 1)
+        return jsonify({
+            'success': True,
+            'results': results,
+            'count': len(results),
+            'generated': generate,
+            'llm_mode': LLM_MODE if generate else None,
+            'llm_model': current_llm_model() if generate else None,
+            'embedding_mode': EMBEDDING_MODE,
+            'timings': timings
+        })
+        
+    except Exception as e:
+        print(f"Erreur lors de la recherche groupée: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/search/stream', methods=['POST'])
+def search_documents_stream():
+    """
+    API POST : Recherche RAG avec réponse en streaming (Server-Sent Events).
+    Mêmes paramètres que /api/search. Les sources sont envoyées dès la fin
+    de la recherche (événement 'sources'), puis la réponse fragment par
+    fragment au fil de la génération (événements 'token'), et enfin les
+    tokens consommés et les durées mesurées (événement 'done', avec le
+    délai avant le premier token). Une erreur pendant la génération est
+    signalée par un événement 'error'.
+    """
+    start_time = time.time()
+    try:
+        params = parse_search_params(request.get_json())
+        error = check_search_request(params)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
+        
+        # Index partagé entre les requêtes (chargé si nécessaire)
+        search_indexer = get_search_indexer()
+        if search_indexer is None:
+            return jsonify({'success': False, 'error': 'Index non disponible. Veuillez d\'abord indexer des documents.'}), 400
+        error = check_index_search(search_indexer, params)
+        if error:
+            return jsonify({'success': False, 'error': error[0]}), error[1]
+        cache_request, cached = lookup_answer_cache(search_indexer, params)
+        timings = {}
+        if cached:
+            search_results, rerank_info = cached['sources'], None
+            timings['retrieval_ms'] = round((time.time() - start_time) * 1000, 1)
+        else:
+            search_results, rerank_info = retrieve_sources(search_indexer, params, timings)
+        if not search_results:
+            return jsonify({'success': False, 'error': no_result_error(params)}), 404
+        context, context_stats = (None, None) if cached else build_context(search_results, params)
+    except Exception as e:
+        print(f"Erreur lors de la recherche: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def generate():
+        yield sse_event('sources', {
+            'sources': search_results,
+            'llm_mode': cached['llm_mode'] if cached else LLM_MODE,
+            'llm_model': cached['llm_model'] if cached else current_llm_model(),
+            'embedding_mode': EMBEDDING_MODE,
+            'rerank': rerank_info,
+            'context': context_stats
+        })
+        
+        if cached:
+            yield sse_event('token', {'text': cached['answer']})
+            first_token_ms = round((time.time() - start_time) * 1000, 1)
+            tokens = cached['tokens']
+        else:
+            parts = []
+            first_token_ms = None
+            usage = {}
+            try:
+                llm_input = build_llm_input(params, context)
+                for text in stream_answer(params, llm_input, usage):
+                    if first_token_ms is None:
+                        first_token_ms = round((time.time() - start_time) * 1000, 1)
+                    parts.append(text)
+                    yield sse_event('token', {'text': text})
+            except Exception as e:
+                print(f"Erreur lors de la génération: {str(e)}")
+                yield sse_event('error', {'error': str(e)})
+                return
+            
+            answer = ''.join(parts)
+            tokens = usage or estimate_tokens(llm_input, answer)
+            store_answer_cache(cache_request, params['question'], answer, search_results)
+        
+        total_ms = round((time.time() - start_time) * 1000, 1)
+        if first_token_ms is not None:
+            rerank_ms = f", re-ranking {timings['rerank_ms']:.0f} ms" if 'rerank_ms' in timings else ''
+            print(f"⏱️ Premier token en {first_token_ms:.0f} ms (recherche {timings['retrieval_ms']:.0f} ms"
+                  f"{rerank_ms}, réponse complète en {total_ms:.0f} ms)")
+        yield sse_event('done', {
+            'tokens': tokens,
+            'cached': cached['cached'] if cached else False,
+            'timings': {
+                **timings,
+                'first_token_ms': first_token_ms,
+                'total_ms': total_ms
+            }
+        })
     
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# Charger l'index au démarrage du processus (et non à la première requête) ;
+# sous gunicorn, chaque worker le charge après le fork (post_worker_init)
+if MAIN_PROCESS and INDEX_WARMUP and not os.environ.get('GUNICORN_PRELOAD'):
+    warm_up_index()
+
+
+if __name__ == '__main__':
     # Compatible avec tous les OS
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    if SERVER_MODE == 'production':
+        # Serveur multi-thread : les recherches continuent pendant une indexation,
+        # les modèles et l'index sont partagés par tous les threads du processus
+        from waitress import serve
+        print(f"🚀 Serveur de production (waitress, {WEB_THREADS} threads) sur le port {port}")
+        serve(app, host='0.0.0.0', port=port, threads=WEB_THREADS)
+    else:
+        app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,97 @@
+"""
+Benchmark du chargement des métadonnées : ancien pickle contre ChunkStore
+Mesure le temps de chargement et la mémoire résidente (Linux) pour différentes tailles de corpus
+
+Usage :
+    python benchmarks/chunk_store_benchmark.py [--sizes 10000 100000 500000] [--text-size 2000]
+"""
+
+import os
+import sys
+import json
+import pickle
+import random
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.chunk_store import ChunkStore
+
+
+# Exécuté dans un processus séparé pour mesurer une mémoire de départ propre
+LOAD_SCRIPT = """
+import sys, time, json, pickle, random, resource
+sys.path.insert(0, {root!r})
+from modules.chunk_store import ChunkStore
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+
+before = rss_mb()
+start = time.perf_counter()
+if {kind!r} == 'pickle':
+    with open({path!r}, 'rb') as f:
+        data = pickle.load(f)
+    chunks = data['chunks']
+    get = lambda i: chunks[i]
+    count = len(chunks)
+else:
+    store = ChunkStore({path!r})
+    store.load()
+    get = store.get
+    count = len(store)
+load_time = time.perf_counter() - start
+
+# Une requête lit top_k chunks
+start = time.perf_counter()
+for i in random.Random(0).sample(range(count), 5):
+    get(i)
+read_time = time.perf_counter() - start
+print(json.dumps({{'load': load_time, 'read': read_time, 'rss': rss_mb() - before}}))
+"""
+
+
+def make_chunks(count, text_size):
+    rng = random.Random(0)
+    words = "test logiciel exigence couverture risque défaut revue analyse conception".split()
+    for i in range(count):
+        text = " ".join(rng.choice(words) for _ in range(text_size // 8))[:text_size]
+        yield {'text': text, 'source': f"document_{i // 500}.pdf", 'chunk_id': i % 500,
+               'tokens': len(text) // 4, 'vector_id': i}
+
+
+def measure(kind, path):
+    script = LOAD_SCRIPT.format(root=ROOT, kind=kind, path=path)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chargement des métadonnées : pickle contre ChunkStore")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--text-size', type=int, default=2000, help="Taille des textes en caractères")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'format':<8} {'chargement':>11} {'lecture top 5':>14} {'RSS':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            chunks = list(make_chunks(size, args.text_size))
+            pickle_path = os.path.join(tmp, f'metadata_{size}.pkl')
+            with open(pickle_path, 'wb') as f:
+                pickle.dump({'chunks': chunks, 'metadata': [], 'next_id': size}, f)
+            store_path = os.path.join(tmp, f'store_{size}')
+            ChunkStore.from_pickle(pickle_path, store_path).save()
+            del chunks
+
+            for kind, path in (('pickle', pickle_path), ('store', store_path)):
+                result = measure(kind, path)
+                print(f"{size:>8} {kind:<8} {result['load'] * 1000:>9.1f}ms "
+                      f"{result['read'] * 1000:>12.2f}ms {result['rss']:>8.1f}Mo")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark du chunking : moteur 'legacy' contre moteur 'single_pass'
+Vérifie que les deux moteurs produisent les mêmes chunks et mesure le gain
+
+L'équivalence est aussi contrôlée sur des textes multi-scripts (accents, ligatures
+de PDF, emoji, CJK) dont les caractères sont coupés par les tokens BPE.
+
+Usage :
+    python benchmarks/chunker_benchmark.py [fichiers...] [--chunk-size 500] [--chunk-overlap 50]
+
+Sans fichier, les documents du dossier uploads/ sont utilisés
+(ou un texte synthétique si le dossier est vide).
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.chunker import TextChunker
+from modules.document_processor import DocumentProcessor
+
+
+def load_documents(paths):
+    """Charge les documents à découper (fichiers fournis, uploads/ ou texte synthétique)"""
+    processor = DocumentProcessor()
+    if paths:
+        documents = processor.process_files(paths)
+    else:
+        documents = processor.process_directory('uploads')
+    documents = [doc for doc in documents if doc.get('success') and doc.get('text')]
+
+    if not documents:
+        random.seed(0)
+        words = ("le test logiciel vérifie que le système répond aux exigences. "
+                 "ISTQB définit les techniques de conception! pourquoi? couverture").split()
+        paragraphs = [" ".join(random.choice(words) for _ in range(random.choice([20, 80, 400])))
+                      for _ in range(3000)]
+        documents = [{'success': True, 'filename': 'synthetique.txt', 'text': "\n\n".join(paragraphs)}]
+    return documents
+
+
+# Mots de contrôle : caractères multi-octets que les tokens BPE peuvent couper
+CONTROL_WORDS = ("le test logiciel vérifie été à où œuvre naïve straße ﬁchier ﬂux ﬁn "
+                 "日本語 テスト 测试 😀 🚀 👍🏽 ISTQB ISTQBü. 4.2.nd b!. x? é.").split()
+
+# (chunk_size, chunk_overlap) : petites tailles pour multiplier les découpes par phrases
+# et les chevauchements commençant au milieu d'un caractère
+CONTROL_SETTINGS = [(5, 10), (30, 25), (80, 60)]
+
+
+def control_documents(count=100):
+    """Documents synthétiques multi-scripts pour le contrôle d'équivalence"""
+    rng = random.Random(1)
+    documents = []
+    for i in range(count):
+        paragraphs = [rng.choice([" ", "", "\n"]).join(rng.choice(CONTROL_WORDS)
+                                                        for _ in range(rng.choice([1, 3, 10, 40, 120])))
+                      for _ in range(rng.randint(1, 30))]
+        separator = rng.choice(["\n\n", "\n\n\n", "\n", "\n\n  "])
+        documents.append({'success': True, 'filename': f'controle_{i}.txt', 'text': separator.join(paragraphs)})
+    return documents
+
+
+def count_mismatches(documents, settings):
+    """Nombre de découpages (document, paramètres) qui diffèrent entre les deux moteurs"""
+    mismatches = 0
+    for chunk_size, chunk_overlap in settings:
+        legacy = TextChunker(chunk_size, chunk_overlap, engine='legacy')
+        single_pass = TextChunker(chunk_size, chunk_overlap)
+        for doc in documents:
+            if legacy.chunk_documents([doc]) != single_pass.chunk_documents([doc]):
+                mismatches += 1
+    return mismatches
+
+
+def run(chunker, documents):
+    start = time.perf_counter()
+    chunks = chunker.chunk_documents(documents)
+    return chunks, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des moteurs de chunking")
+    parser.add_argument('files', nargs='*', help="Fichiers à découper")
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--chunk-overlap', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    documents = load_documents(args.files)
+    characters = sum(len(doc['text']) for doc in documents)
+    print(f"{len(documents)} document(s), {characters:,} caractères")
+
+    results = {}
+    for engine in TextChunker.ENGINES:
+        chunker = TextChunker(args.chunk_size, args.chunk_overlap, engine=engine)
+        run(chunker, documents[:1])  # échauffement (tables de l'encodeur)
+        timings = []
+        for _ in range(args.repeat):
+            chunks, elapsed = run(chunker, documents)
+            timings.append(elapsed)
+        results[engine] = (chunks, min(timings))
+        print(f"  {engine:<12} {min(timings):8.3f} s  {len(chunks)} chunks  "
+              f"{characters / min(timings) / 1e6:.2f} M caractères/s")
+
+    legacy_chunks, legacy_time = results['legacy']
+    single_chunks, single_time = results['single_pass']
+    same_boundaries = [c['text'] for c in legacy_chunks] == [c['text'] for c in single_chunks]
+    same_tokens = [c['tokens'] for c in legacy_chunks] == [c['tokens'] for c in single_chunks]
+    print(f"Accélération : x{legacy_time / single_time:.2f}")
+    print(f"Chunks identiques : {'oui' if same_boundaries else 'NON'} "
+          f"(comptes de tokens identiques : {'oui' if same_tokens else 'NON'})")
+
+    controls = control_documents()
+    settings = CONTROL_SETTINGS + [(args.chunk_size, args.chunk_overlap)]
+    mismatches = count_mismatches(controls, settings)
+    print(f"Contrôle multi-scripts (accents, ligatures, emoji, CJK) : "
+          f"{mismatches}/{len(controls) * len(settings)} découpage(s) différent(s)")
+    return 0 if same_boundaries and same_tokens and not mismatches else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
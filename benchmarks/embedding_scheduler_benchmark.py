@@ -0,0 +1,203 @@
+"""
+Banc d'essai du planificateur d'embeddings face aux limites de débit (réponses 429)
+Lance un serveur bouchon local compatible avec /v1/embeddings, limité à --rate requêtes
+par seconde, et vérifie que EmbeddingScheduler respecte Retry-After (ou son backoff)
+sans perdre ni mélanger de vecteurs
+
+Usage :
+    python benchmarks/embedding_scheduler_benchmark.py [--texts 2000] [--rate 8] [--concurrency 4]
+    python benchmarks/embedding_scheduler_benchmark.py --serve [--port 8099]
+
+Avec --serve, seul le bouchon est démarré : pointer OPENAI_BASE_URL sur l'URL affichée
+(avec une OPENAI_API_KEY quelconque) pour observer une indexation limitée en débit.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from openai import OpenAI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.embedding_scheduler import EmbeddingScheduler
+
+
+# En-têtes envoyés avec les réponses 429 ('none' : le planificateur applique son backoff)
+HEADER_MODES = ['retry-after', 'retry-after-ms', 'none']
+
+
+def stub_vector(text: str, dimension: int) -> list:
+    """Vecteur déterministe d'un texte (pour vérifier l'ordre des réponses)"""
+    digest = hashlib.sha256(text.encode('utf-8')).digest()
+    return [digest[i % len(digest)] / 255 for i in range(dimension)]
+
+
+class RateLimitedStub(ThreadingHTTPServer):
+    """Serveur bouchon /v1/embeddings limité par un seau à jetons (rate requêtes/s, rafale burst)"""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, rate: float = 20, burst: int = 5, header: str = 'retry-after',
+                 latency: float = 0.02, dimension: int = 64):
+        super().__init__(('127.0.0.1', port), _StubHandler)
+        self.rate = rate
+        self.burst = burst
+        self.header = header
+        self.latency = latency
+        self.dimension = dimension
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.log = []  # (instant d'arrivée, délai annoncé ; 0 si la requête est acceptée)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def admit(self) -> float:
+        """Retourne 0 si la requête est acceptée, sinon le délai avant le prochain jeton"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                delay = 0.0
+            else:
+                delay = (1 - self._tokens) / self.rate
+            self.log.append((now, delay))
+            return delay
+
+    def start(self) -> str:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.url
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.rstrip('/').endswith('/embeddings'):
+            self._send_json(404, {'error': {'message': 'not found', 'type': 'invalid_request_error'}})
+            return
+
+        server = self.server
+        delay = server.admit()
+        if delay:
+            headers = {}
+            if server.header == 'retry-after':
+                headers['retry-after'] = f"{delay:.3f}"
+            elif server.header == 'retry-after-ms':
+                headers['retry-after-ms'] = str(int(delay * 1000) + 1)
+            self._send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'requests',
+                                            'code': 'rate_limit_exceeded'}}, headers)
+            return
+
+        time.sleep(server.latency)
+        inputs = body['input'] if isinstance(body['input'], list) else [body['input']]
+        dimension = body.get('dimensions', server.dimension)
+        # Réponses dans le désordre : le planificateur doit se fier à 'index'
+        data = [{'object': 'embedding', 'index': i, 'embedding': stub_vector(text, dimension)}
+                for i, text in reversed(list(enumerate(inputs)))]
+        self._send_json(200, {'object': 'list', 'data': data, 'model': body.get('model'),
+                              'usage': {'prompt_tokens': 0, 'total_tokens': 0}})
+
+
+def early_retries(log) -> int:
+    """Requêtes arrivées avant la fin d'une pause annoncée par un 429 précédent"""
+    count = 0
+    paused_until = 0.0
+    for arrival, delay in log:
+        if arrival < paused_until:
+            count += 1
+        if delay:
+            paused_until = max(paused_until, arrival + delay)
+    return count
+
+
+def run(args, header: str) -> bool:
+    stub = RateLimitedStub(rate=args.rate, burst=args.burst, header=header,
+                           latency=args.latency, dimension=args.dimension)
+    url = stub.start()
+    try:
+        texts = [f"chunk {i} : le système doit répondre à l'exigence REQ-{i % 977:03d}" for i in range(args.texts)]
+        # Approximation suffisante : le bouchon ne compte pas les tokens
+        scheduler = EmbeddingScheduler(OpenAI(api_key='bouchon', base_url=url), 'text-embedding-3-small',
+                                       count_tokens=lambda text: len(text.split()),
+                                       max_concurrency=args.concurrency, max_batch_tokens=args.batch_tokens,
+                                       base_delay=args.base_delay, max_delay=args.max_delay)
+        out = np.zeros((len(texts), args.dimension), dtype='float32')
+        start = time.perf_counter()
+        scheduler.embed(texts, out)
+        elapsed = time.perf_counter() - start
+    finally:
+        stub.shutdown()
+        stub.server_close()
+
+    expected = np.array([stub_vector(text, args.dimension) for text in texts], dtype='float32')
+    identical = np.array_equal(out, expected)
+    accepted = sum(1 for _, delay in stub.log if not delay)
+    rejected = len(stub.log) - accepted
+    # Sans en-tête, le bouchon n'annonce aucune pause au client
+    early = early_retries(stub.log) if header != 'none' else '-'
+    print(f"  {header:<15} {elapsed:7.2f} s  {accepted:4d} acceptées  {rejected:4d} refusées (429)  "
+          f"{early:>4} avant la fin d'une pause  "
+          f"{accepted / elapsed:6.1f} req/s  relances {scheduler.stats['retries']}  "
+          f"vecteurs {'identiques' if identical else 'DIFFÉRENTS'}")
+    return identical and scheduler.stats['rate_limited'] == rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planificateur d'embeddings contre un bouchon limité en débit")
+    parser.add_argument('--texts', type=int, default=2000, help="Nombre de textes à embedder")
+    parser.add_argument('--batch-tokens', type=int, default=1000, help="Budget de tokens par requête")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=8, help="Requêtes acceptées par seconde")
+    parser.add_argument('--burst', type=int, default=2, help="Rafale acceptée avant limitation")
+    parser.add_argument('--latency', type=float, default=0.02, help="Durée d'une réponse acceptée (s)")
+    parser.add_argument('--dimension', type=int, default=64)
+    parser.add_argument('--base-delay', type=float, default=0.1, help="Délai initial du backoff (s)")
+    parser.add_argument('--max-delay', type=float, default=5.0)
+    parser.add_argument('--headers', nargs='+', choices=HEADER_MODES, default=HEADER_MODES,
+                        help="En-têtes des réponses 429 à tester")
+    parser.add_argument('--serve', action='store_true', help="Démarrer seulement le bouchon")
+    parser.add_argument('--port', type=int, default=8099, help="Port du bouchon avec --serve")
+    args = parser.parse_args()
+
+    if args.serve:
+        stub = RateLimitedStub(port=args.port, rate=args.rate, burst=args.burst, header=args.headers[0],
+                               latency=args.latency, dimension=args.dimension)
+        print(f"Bouchon OpenAI ({args.rate:g} req/s, en-tête {args.headers[0]}) : OPENAI_BASE_URL={stub.url}", flush=True)
+        try:
+            stub.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    print(f"{args.texts} textes, {args.concurrency} requêtes simultanées, "
+          f"limite {args.rate:g} req/s (rafale {args.burst})")
+    ok = all([run(args, header) for header in args.headers])
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Benchmark des types d'index FAISS : rappel@k et latence contre la recherche exacte
+Aide à choisir un type d'index, sa compression et ses paramètres (nlist, nprobe, efSearch...)
+
+Usage :
+    python benchmarks/index_benchmark.py [--index data/indexes/<version>/faiss_index.bin] [--n 100000] [--dim 384]
+
+Avec --index, les vecteurs d'un index 'flat' existant sont utilisés ;
+sinon un jeu de vecteurs synthétiques (groupés en clusters) est généré.
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.indexer import build_faiss_index
+
+
+# (type d'index, paramètres de construction, paramètre de recherche, valeurs testées)
+CONFIGURATIONS = [
+    ('flat', {'quantization': 'fp16'}, None, [None]),
+    ('flat', {'quantization': 'sq8'}, None, [None]),
+    ('flat', {'quantization': 'pq'}, None, [None]),
+    ('ivf_flat', {}, 'nprobe', [1, 4, 8, 16, 64]),
+    ('ivf_flat', {'quantization': 'sq8'}, 'nprobe', [8, 16, 64]),
+    ('ivf_pq', {}, 'nprobe', [1, 4, 8, 16, 64]),
+    ('hnsw', {'hnsw_m': 32}, 'ef_search', [16, 32, 64, 128, 256]),
+    ('hnsw', {'hnsw_m': 32, 'quantization': 'sq8'}, 'ef_search', [64, 128]),
+]
+
+
+def load_vectors(index_path):
+    """Récupère les vecteurs d'un index 'flat' sauvegardé par l'application"""
+    index = faiss.read_index(index_path)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if not isinstance(index, faiss.IndexFlat):
+        raise ValueError("Seuls les index 'flat' permettent de relire les vecteurs")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def synthetic_vectors(n, dim, clusters=200, seed=0):
+    """Vecteurs groupés en clusters, plus proches d'embeddings réels qu'un bruit uniforme"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype('float32')
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.3 * rng.normal(size=(n, dim)).astype('float32')
+
+
+def search_params(index, name, value):
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if name == 'nprobe' and isinstance(base, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=value)
+    if name == 'ef_search' and isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=value)
+    return None
+
+
+def timed_search(index, queries, k, params=None):
+    """Recherche requête par requête (comme /api/search) et renvoie la latence moyenne en ms"""
+    labels = np.empty((len(queries), k), dtype='int64')
+    start = time.perf_counter()
+    for i in range(len(queries)):
+        if params is not None:
+            _, labels[i:i + 1] = index.search(queries[i:i + 1], k, params=params)
+        else:
+            _, labels[i:i + 1] = index.search(queries[i:i + 1], k)
+    return labels, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def recall_at_k(labels, ground_truth):
+    hits = sum(len(set(found) & set(expected)) for found, expected in zip(labels, ground_truth))
+    return hits / ground_truth.size
+
+
+def build(index_type, dim, vectors, params, metric):
+    start = time.perf_counter()
+    index = build_faiss_index(index_type, dim, params, vectors, metric=metric)
+    index.add_with_ids(vectors, np.arange(len(vectors), dtype='int64'))
+    return index, time.perf_counter() - start
+
+
+def index_size_mb(index):
+    return faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rappel@k et latence des types d'index FAISS")
+    parser.add_argument('--index', help="Index 'flat' existant (ex: data/indexes/<version>/faiss_index.bin)")
+    parser.add_argument('--n', type=int, default=100000, help="Nombre de vecteurs synthétiques")
+    parser.add_argument('--dim', type=int, default=384, help="Dimension des vecteurs synthétiques")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--metric', choices=['l2', 'ip'], default='l2')
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.index) if args.index else synthetic_vectors(args.n, args.dim)
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    n, dim = vectors.shape
+
+    # Requêtes : vecteurs de la base légèrement bruités
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(n, min(args.queries, n), replace=False)]
+    queries = queries + 0.05 * queries.std() * rng.normal(size=queries.shape).astype('float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    if args.metric == 'ip':
+        faiss.normalize_L2(vectors)
+        faiss.normalize_L2(queries)
+    k = min(args.k, n)
+
+    print(f"{n} vecteurs de dimension {dim}, {len(queries)} requêtes, k={k}, métrique {args.metric}\n")
+    print(f"{'index':<14} {'paramètre':<16} {'rappel@' + str(k):>9} {'ms/requête':>11} "
+          f"{'construction':>13} {'taille':>10}")
+
+    flat, build_time = build('flat', dim, vectors, {}, args.metric)
+    ground_truth, latency = timed_search(flat, queries, k)
+    print(f"{'flat':<14} {'-':<16} {1.0:>9.3f} {latency:>11.3f} {build_time:>12.1f}s "
+          f"{index_size_mb(flat):>8.1f}Mo")
+
+    for index_type, params, knob, values in CONFIGURATIONS:
+        index, build_time = build(index_type, dim, vectors, params, args.metric)
+        size = index_size_mb(index)
+        name = index_type + (f"+{params['quantization']}" if 'quantization' in params else '')
+        for value in values:
+            labels, latency = timed_search(index, queries, k, search_params(index, knob, value))
+            label = f'{knob}={value}' if knob else '-'
+            print(f"{name:<14} {label:<16} {recall_at_k(labels, ground_truth):>9.3f} "
+                  f"{latency:>11.3f} {build_time:>12.1f}s {size:>8.1f}Mo")
+
+
+if __name__ == '__main__':
+    main()
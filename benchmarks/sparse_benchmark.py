@@ -0,0 +1,78 @@
+"""
+Benchmark de l'index BM25 : construction et latence des requêtes lexicales
+Vérifie que le classement BM25 ajouté à une recherche hybride reste de l'ordre de la milliseconde
+
+Usage :
+    python benchmarks/sparse_benchmark.py [--store data/indexes/<version>/chunk_store] [--n 100000]
+
+Avec --store, les chunks d'un index existant sont utilisés ;
+sinon un corpus synthétique (fréquences de termes suivant une loi de Zipf) est généré.
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.chunk_store import ChunkStore
+from modules.sparse_index import BM25Index, tokenize
+
+
+def synthetic_texts(n: int, words_per_chunk: int = 120, vocabulary: int = 50000):
+    rng = np.random.default_rng(0)
+    words = [f"terme{i}" for i in range(vocabulary)]
+    for _ in range(n):
+        codes = (rng.zipf(1.3, size=words_per_chunk) - 1) % vocabulary
+        yield " ".join(words[code] for code in codes)
+
+
+def store_texts(path: str):
+    store = ChunkStore(path)
+    store.load()
+    return [store.get(position)['text'] for position in range(len(store))], store.vector_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construction et latence de l'index BM25")
+    parser.add_argument('--store', help="Store de chunks existant (ex: data/indexes/<version>/chunk_store)")
+    parser.add_argument('--n', type=int, default=100000, help="Nombre de chunks synthétiques")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=50, help="Candidats par requête (HYBRID_CANDIDATES)")
+    args = parser.parse_args()
+
+    if args.store:
+        texts, vector_ids = store_texts(args.store)
+    else:
+        texts, vector_ids = list(synthetic_texts(args.n)), np.arange(args.n)
+
+    start = time.perf_counter()
+    index = BM25Index()
+    index.add(texts, vector_ids)
+    len(index)
+    build_time = time.perf_counter() - start
+    stats = index.get_stats()
+    print(f"{stats['chunks']} chunks, {stats['terms']} termes, {stats['postings']} postings, "
+          f"construction {build_time:.1f}s\n")
+
+    # Requêtes : quelques termes tirés des chunks (mélange de termes rares et fréquents)
+    rng = np.random.default_rng(1)
+    queries = []
+    for position in rng.choice(len(texts), args.queries):
+        terms = tokenize(texts[position])
+        if terms:
+            queries.append(" ".join(rng.choice(terms, min(4, len(terms)), replace=False)))
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, args.k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"{len(queries)} requêtes, k={args.k} : moyenne {np.mean(latencies):.2f} ms, "
+          f"p95 {np.percentile(latencies, 95):.2f} ms, max {np.max(latencies):.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
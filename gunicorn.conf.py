@@ -0,0 +1,33 @@
+"""
+Configuration Gunicorn pour la production (Linux/macOS)
+Lancement : gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Plusieurs workers multi-thread : une indexation ou une génération longue
+# n'empêche pas les autres requêtes d'être servies
+workers = int(os.environ.get('WEB_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+
+# Indexation et génération locale peuvent dépasser le délai par défaut (30 s)
+timeout = int(os.environ.get('WEB_TIMEOUT', 600))
+
+# Charger l'application une seule fois dans le processus maître : les modèles locaux
+# (Sentence Transformers, ~500 Mo) sont partagés par les workers en copy-on-write
+preload_app = True
+
+# FAISS utilise OpenMP, dont les threads ne survivent pas au fork : l'index n'est
+# pas préchauffé dans le maître mais dans chaque worker (memory-map : pages partagées).
+# app.py recharge .env avec override=True : le signal passe par une variable propre
+# à gunicorn, qu'un INDEX_WARMUP défini dans .env ne peut pas écraser
+os.environ['GUNICORN_PRELOAD'] = '1'
+
+
+def post_worker_init(worker):
+    import app
+    if app.INDEX_WARMUP:
+        app.warm_up_index()
@@ -0,0 +1,141 @@
+"""
+Module de cache sémantique des réponses
+Réutilise la réponse d'une question proche déjà posée, tant que l'index documentaire n'a pas changé
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+import faiss
+
+
+class SemanticAnswerCache:
+    """Classe pour retrouver les réponses de questions similaires via un petit index FAISS"""
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000):
+        """
+        Initialize le cache
+
+        Args:
+            threshold: Similarité cosinus minimale entre deux questions pour réutiliser une réponse
+            max_entries: Nombre maximal de réponses conservées (0 = cache désactivé)
+        """
+        self.threshold = threshold
+        self.max_entries = max(0, max_entries)
+        self.index_version = None
+        self.dimension = None
+        self._index = None
+        self._entries = OrderedDict()  # id -> entrée, de la plus ancienne à la plus récente
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def context_key(**params) -> str:
+        """Clé des paramètres qui influencent la réponse (prompt système, modèle, top_k...)"""
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def invalidate(self):
+        """Vide le cache (l'index documentaire a été reconstruit ou supprimé)"""
+        with self._lock:
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._clear(None, None)
+
+    def _clear(self, index_version, dimension):
+        self.index_version = index_version
+        self.dimension = dimension
+        self._index = faiss.IndexIDMap(faiss.IndexFlatIP(dimension)) if dimension else None
+        self._entries.clear()
+
+    def _prepare(self, vector: np.ndarray, index_version: str) -> np.ndarray:
+        """Normalise le vecteur et vide le cache si l'index documentaire a changé"""
+        query = np.array([vector], dtype='float32')
+        faiss.normalize_L2(query)
+        if index_version != self.index_version or query.shape[1] != self.dimension:
+            if self._entries:
+                self.stats['invalidations'] += 1
+            self._clear(index_version, query.shape[1])
+        return query
+
+    def lookup(self, vector: np.ndarray, index_version: str, context: str) -> Optional[Dict]:
+        """
+        Cherche une réponse à une question similaire
+
+        Args:
+            vector: Embedding de la question
+            index_version: Version de l'index documentaire courant
+            context: Clé des paramètres de génération (voir context_key)
+
+        Returns:
+            Entrée trouvée (question, réponse, similarité) ou None
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            query = self._prepare(vector, index_version)
+            if self._index.ntotal:
+                similarities, ids = self._index.search(query, min(8, self._index.ntotal))
+                for similarity, entry_id in zip(similarities[0], ids[0]):
+                    # Résultats triés par similarité décroissante
+                    if entry_id < 0 or similarity < self.threshold:
+                        break
+                    entry = self._entries.get(int(entry_id))
+                    if entry is not None and entry['context'] == context:
+                        self.stats['hits'] += 1
+                        return {**entry, 'similarity': float(similarity)}
+            self.stats['misses'] += 1
+            return None
+
+    def add(self, vector: np.ndarray, question: str, response: Dict, index_version: str, context: str):
+        """
+        Enregistre la réponse à une question
+
+        Args:
+            vector: Embedding de la question
+            question: Texte de la question
+            response: Données de la réponse à renvoyer telles quelles (réponse, sources...)
+            index_version: Version de l'index documentaire utilisé
+            context: Clé des paramètres de génération (voir context_key)
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            query = self._prepare(vector, index_version)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(query, np.array([entry_id], dtype='int64'))
+            self._entries[entry_id] = {
+                'question': question,
+                'response': response,
+                'context': context,
+                'created': time.time()
+            }
+
+            # Évincer les réponses les plus anciennes
+            if len(self._entries) > self.max_entries:
+                evicted = []
+                while len(self._entries) > self.max_entries:
+                    evicted.append(self._entries.popitem(last=False)[0])
+                self._index.remove_ids(np.array(evicted, dtype='int64'))
+
+    def get_stats(self) -> Dict:
+        """Retourne la taille du cache et son taux de succès"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else None
+            }
@@ -0,0 +1,318 @@
+"""
+Module de stockage des chunks indexés
+Textes dans un blob unique et métadonnées en colonnes numpy, memory-mappés
+et lus à la demande : le chargement ne dépend pas de la taille du corpus
+"""
+
+import os
+import json
+import pickle
+import shutil
+from typing import List, Dict, Optional
+import numpy as np
+
+
+class ChunkStore:
+    """Classe pour stocker les chunks sur disque et les lire par position ou par id de vecteur"""
+
+    FORMAT_VERSION = 1
+
+    HEADER_FILE = 'store.json'
+    TEXTS_FILE = 'texts.bin'
+
+    # Colonnes de taille fixe (une valeur par chunk, -1 = page inconnue)
+    COLUMNS = {
+        'vector_id': 'int64',
+        'source': 'int32',
+        'chunk_id': 'int32',
+        'tokens': 'int32',
+        'page_start': 'int32',
+        'page_end': 'int32'
+    }
+
+    def __init__(self, path: str = None):
+        """
+        Initialize le store (vide tant que load() n'est pas appelé)
+
+        Args:
+            path: Dossier du store (peut n'être fourni qu'à save())
+        """
+        self.path = path
+        self.info = {}
+        self.sources = []
+        # Données sur disque (memory-mappées)
+        self._offsets = np.zeros(1, dtype='int64')
+        self._columns = {name: np.zeros(0, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self._texts = np.zeros(0, dtype='uint8')
+        # Lignes groupées par source : celles de la source c sont source_rows[source_ptr[c]:source_ptr[c + 1]]
+        self._source_codes = {}
+        self._source_ptr = np.zeros(1, dtype='int64')
+        self._source_rows = np.zeros(0, dtype='int64')
+        # Positions des lignes sur disque conservées (None = toutes) et chunks ajoutés depuis
+        self._kept = None
+        self._new = []
+        self._vector_ids = None
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Vérifie qu'un store complet est présent dans le dossier"""
+        return os.path.exists(os.path.join(path, cls.HEADER_FILE))
+
+    def load(self):
+        """Ouvre le store sans lire les textes ni copier les colonnes en mémoire"""
+        with open(os.path.join(self.path, self.HEADER_FILE), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get('format') != self.FORMAT_VERSION:
+            raise ValueError(f"Format de store non supporté: {header.get('format')}")
+
+        self.info = header.get('info', {})
+        self.sources = header['sources']
+        self._offsets = np.load(os.path.join(self.path, 'offsets.npy'), mmap_mode='r')
+        self._columns = {
+            name: np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+            for name in self.COLUMNS
+        }
+        texts_path = os.path.join(self.path, self.TEXTS_FILE)
+        if os.path.getsize(texts_path):
+            self._texts = np.memmap(texts_path, dtype='uint8', mode='r')
+        else:
+            self._texts = np.zeros(0, dtype='uint8')
+        self._source_codes = {name: code for code, name in enumerate(self.sources)}
+        if os.path.exists(os.path.join(self.path, 'source_rows.npy')):
+            self._source_ptr = np.load(os.path.join(self.path, 'source_ptr.npy'), mmap_mode='r')
+            self._source_rows = np.load(os.path.join(self.path, 'source_rows.npy'), mmap_mode='r')
+        else:
+            # Store écrit avant le regroupement par source
+            self._source_ptr, self._source_rows = self._group_by_source(self._columns['source'], len(self.sources))
+        self._kept = None
+        self._new = []
+        self._vector_ids = None
+
+    def __len__(self) -> int:
+        return self._base_count() + len(self._new)
+
+    def _base_count(self) -> int:
+        return len(self._offsets) - 1 if self._kept is None else len(self._kept)
+
+    def _base_row(self, position: int) -> int:
+        return position if self._kept is None else int(self._kept[position])
+
+    @property
+    def vector_ids(self) -> np.ndarray:
+        """Ids des vecteurs, dans l'ordre des positions (croissants)"""
+        if self._vector_ids is None:
+            base = self._columns['vector_id']
+            if self._kept is None and not self._new:
+                # Store tel que chargé : la colonne memory-mappée suffit
+                return base
+            if self._kept is not None:
+                base = base[self._kept]
+            new = np.array([chunk['vector_id'] for chunk in self._new], dtype='int64')
+            self._vector_ids = np.concatenate([base, new])
+        return self._vector_ids
+
+    def position(self, vector_id: int) -> Optional[int]:
+        """Position du chunk associé à un id de vecteur (None si absent)"""
+        vector_ids = self.vector_ids
+        position = int(np.searchsorted(vector_ids, vector_id))
+        if position < len(vector_ids) and vector_ids[position] == vector_id:
+            return position
+        return None
+
+    def get(self, position: int) -> Dict:
+        """Lit un chunk (texte et métadonnées) à partir de sa position"""
+        base_count = self._base_count()
+        if position >= base_count:
+            return self._new[position - base_count]
+
+        row = self._base_row(position)
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        chunk = {
+            'text': self._texts[start:end].tobytes().decode('utf-8'),
+            'source': self.sources[int(self._columns['source'][row])],
+            'chunk_id': int(self._columns['chunk_id'][row]),
+            'tokens': int(self._columns['tokens'][row]),
+            'vector_id': int(self._columns['vector_id'][row])
+        }
+        if self._columns['page_start'][row] >= 0:
+            chunk['page_start'] = int(self._columns['page_start'][row])
+            chunk['page_end'] = int(self._columns['page_end'][row])
+        return chunk
+
+    def append(self, chunk: Dict):
+        """Ajoute un chunk (conservé en mémoire jusqu'à save())"""
+        entry = {
+            'text': chunk['text'],
+            'source': chunk.get('source', 'unknown'),
+            'chunk_id': chunk.get('chunk_id', len(self)),
+            'tokens': chunk.get('tokens', 0),
+            'vector_id': int(chunk['vector_id'])
+        }
+        if 'page_start' in chunk:
+            entry['page_start'] = chunk['page_start']
+            entry['page_end'] = chunk['page_end']
+        self._new.append(entry)
+        self._vector_ids = None
+
+    def remove(self, vector_ids) -> int:
+        """Retire les chunks associés à des ids de vecteurs et retourne leur nombre"""
+        mask = np.isin(self.vector_ids, np.asarray(list(vector_ids), dtype='int64'))
+        removed = int(mask.sum())
+        if removed:
+            base_count = self._base_count()
+            base_positions = np.flatnonzero(~mask[:base_count])
+            self._kept = (base_positions if self._kept is None else self._kept[base_positions]).astype('int64')
+            self._new = [chunk for chunk, drop in zip(self._new, mask[base_count:]) if not drop]
+            self._vector_ids = None
+        return removed
+
+    @staticmethod
+    def _group_by_source(source_codes: np.ndarray, source_count: int):
+        """Lignes triées par source (ordre des lignes conservé dans chaque source) et bornes de chaque source"""
+        rows = np.argsort(source_codes, kind='stable').astype('int64')
+        ptr = np.concatenate([[0], np.cumsum(np.bincount(source_codes, minlength=source_count))]).astype('int64')
+        return ptr, rows
+
+    def source_vector_ids(self, names: List[str]) -> np.ndarray:
+        """
+        Ids des vecteurs des chunks issus de certaines sources
+
+        Les lignes sur disque sont lues dans le regroupement par source calculé à
+        l'écriture du store : le coût dépend du nombre de chunks des sources demandées.
+
+        Args:
+            names: Noms des sources
+
+        Returns:
+            Ids des vecteurs, croissants
+        """
+        names = set(names)
+        codes = [self._source_codes[name] for name in names if name in self._source_codes]
+        rows = [self._source_rows[self._source_ptr[code]:self._source_ptr[code + 1]] for code in codes]
+        vector_ids = self._columns['vector_id'][np.concatenate(rows)] if rows else np.zeros(0, dtype='int64')
+        if self._kept is not None:
+            # Lignes retirées depuis le chargement
+            vector_ids = vector_ids[np.isin(vector_ids, self.vector_ids[:self._base_count()])]
+        new = [chunk['vector_id'] for chunk in self._new if chunk['source'] in names]
+        return np.sort(np.concatenate([vector_ids, np.array(new, dtype='int64')]))
+
+    def source_names(self) -> List[str]:
+        """Noms des sources présentes dans le store"""
+        codes = self._columns['source'] if self._kept is None else self._columns['source'][self._kept]
+        names = {self.sources[int(code)] for code in np.unique(codes)}
+        names.update(chunk['source'] for chunk in self._new)
+        return sorted(names)
+
+    def save(self, path: str = None, info: Dict = None):
+        """
+        Écrit le store sur disque puis le recharge en memory-map
+
+        Chaque fichier est écrit sous un nom temporaire puis renommé : un autre
+        processus qui lit l'ancien store conserve une vue cohérente.
+
+        Args:
+            path: Dossier de destination (défaut: dossier du store)
+            info: Informations libres enregistrées dans l'en-tête (modèle, dimension...)
+        """
+        if path is not None:
+            self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        if info is not None:
+            self.info = info
+
+        base_rows = np.arange(len(self._offsets) - 1) if self._kept is None else self._kept
+        new_texts = [chunk['text'].encode('utf-8') for chunk in self._new]
+
+        # Blob de textes : lignes conservées puis nouveaux chunks
+        texts_tmp = os.path.join(self.path, self.TEXTS_FILE + '.tmp')
+        with open(texts_tmp, 'wb') as f:
+            if self._kept is None and len(self._texts):
+                f.write(memoryview(self._texts))
+            else:
+                for row in base_rows:
+                    f.write(memoryview(self._texts[self._offsets[row]:self._offsets[row + 1]]))
+            for data in new_texts:
+                f.write(data)
+
+        lengths = np.concatenate([
+            np.diff(self._offsets)[base_rows],
+            np.array([len(data) for data in new_texts], dtype='int64')
+        ])
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype('int64')
+
+        # Table des sources compactée (les sources retirées disparaissent)
+        names = [self.sources[int(code)] for code in self._columns['source'][base_rows]]
+        names += [chunk['source'] for chunk in self._new]
+        sources, source_codes = np.unique(np.array(names, dtype=object), return_inverse=True) \
+            if names else (np.array([], dtype=object), np.zeros(0, dtype='int64'))
+
+        columns = {'source': source_codes}
+        for name in ('vector_id', 'chunk_id', 'tokens', 'page_start', 'page_end'):
+            columns[name] = np.concatenate([
+                self._columns[name][base_rows],
+                np.array([chunk.get(name, -1) for chunk in self._new], dtype=self.COLUMNS[name])
+            ])
+
+        arrays = {'offsets': offsets}
+        arrays.update({name: columns[name].astype(self.COLUMNS[name]) for name in self.COLUMNS})
+        arrays['source_ptr'], arrays['source_rows'] = self._group_by_source(source_codes, len(sources))
+        for name, array in arrays.items():
+            tmp_path = os.path.join(self.path, f'{name}.npy.tmp')
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, os.path.join(self.path, f'{name}.npy'))
+        os.replace(texts_tmp, os.path.join(self.path, self.TEXTS_FILE))
+
+        # L'en-tête est écrit en dernier : il désigne un store complet
+        header_tmp = os.path.join(self.path, self.HEADER_FILE + '.tmp')
+        with open(header_tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': self.FORMAT_VERSION,
+                'count': int(len(offsets) - 1),
+                'sources': [str(name) for name in sources],
+                'info': self.info
+            }, f)
+        os.replace(header_tmp, os.path.join(self.path, self.HEADER_FILE))
+
+        self.load()
+
+    @classmethod
+    def from_pickle(cls, pickle_path: str, path: str = None) -> 'ChunkStore':
+        """
+        Charge les métadonnées d'un ancien index (index_metadata.pkl) dans un store en mémoire
+
+        Args:
+            pickle_path: Chemin du fichier pickle
+            path: Dossier du store (utilisé par save())
+
+        Returns:
+            Store contenant les chunks, avec les autres champs du pickle dans 'info'
+        """
+        with open(pickle_path, 'rb') as f:
+            data = pickle.load(f)
+
+        store = cls(path)
+        metadata = data.get('metadata', [])
+        for i, chunk in enumerate(data['chunks']):
+            # Anciens index sans ids explicites : l'id d'un vecteur est sa position
+            vector_id = metadata[i].get('vector_id', i) if i < len(metadata) else i
+            store.append({**chunk, 'vector_id': vector_id})
+        store.info = {key: value for key, value in data.items() if key not in ('chunks', 'metadata')}
+        store.info.setdefault('next_id', len(store))
+        return store
+
+    @classmethod
+    def migrate_pickle(cls, pickle_path: str, path: str) -> 'ChunkStore':
+        """Convertit un fichier index_metadata.pkl en store sur disque puis le supprime"""
+        store = cls.from_pickle(pickle_path, path)
+        store.save()
+        os.remove(pickle_path)
+        return store
+
+    @staticmethod
+    def delete(path: str) -> bool:
+        """Supprime le dossier d'un store"""
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            return True
+        return False
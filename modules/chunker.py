@@ -3,14 +3,215 @@ Module de chunking de documents
 Découpe les documents en chunks optimisés pour le RAG
 """
 
-from typing import List, Dict
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_left
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+import numpy as np
 import tiktoken
+from .document_processor import worker_context
+
+
+# Séparateurs de phrases : équivalent de replace('! ', '!|')...split('|')
+SENTENCE_SEPARATOR = re.compile(r'\||(?<=[.!?]) ')
+
+
+class _TokenizedText:
+    """Texte encodé une seule fois, avec la position (en octets) de chaque token"""
+    
+    # Longueur en octets de chaque token, calculée une fois par encodage
+    _byte_lengths = {}
+    
+    def __init__(self, chunker: 'TextChunker', text: str):
+        self.chunker = chunker
+        self.text = text
+        self.data = text.encode('utf-8')
+        tokens = chunker.encoding.encode(text)
+        lengths = self._token_byte_lengths(chunker.encoding)[np.asarray(tokens, dtype=np.int64)]
+        # starts[i] = début du token i ; starts[-1] = fin du texte
+        self.starts = [0] + np.cumsum(lengths).tolist()
+        self.is_ascii = len(self.data) == len(text)
+        self._cursor = (0, 0)
+    
+    @classmethod
+    def _token_byte_lengths(cls, encoding) -> np.ndarray:
+        if encoding.name not in cls._byte_lengths:
+            lengths = np.zeros(encoding.max_token_value + 1, dtype=np.int64)
+            for token in range(encoding.max_token_value + 1):
+                try:
+                    lengths[token] = len(encoding.decode_single_token_bytes(token))
+                except KeyError:
+                    pass
+            cls._byte_lengths[encoding.name] = lengths
+        return cls._byte_lengths[encoding.name]
+    
+    def byte_offset(self, char_pos: int) -> int:
+        """Convertit une position en caractères en position en octets"""
+        if self.is_ascii:
+            return char_pos
+        # Curseur : les positions demandées sont en général proches les unes des autres
+        last_char, last_byte = self._cursor
+        if char_pos >= last_char:
+            byte_pos = last_byte + len(self.text[last_char:char_pos].encode('utf-8'))
+        else:
+            byte_pos = last_byte - len(self.text[char_pos:last_char].encode('utf-8'))
+        self._cursor = (char_pos, byte_pos)
+        return byte_pos
+    
+    def char_offset(self, byte_pos: int) -> int:
+        """Convertit une position en octets (début de caractère) en position en caractères"""
+        if self.is_ascii:
+            return byte_pos
+        last_char, last_byte = self._cursor
+        if byte_pos >= last_byte:
+            char_pos = last_char + len(self.data[last_byte:byte_pos].decode('utf-8'))
+        else:
+            char_pos = last_char - len(self.data[byte_pos:last_byte].decode('utf-8'))
+        self._cursor = (char_pos, byte_pos)
+        return char_pos
+    
+    def span(self, char_start: int, char_end: int) -> tuple:
+        """Position (texte encodé, début, fin) en octets d'un extrait du texte"""
+        return self, self.byte_offset(char_start), self.byte_offset(char_end)
+    
+    def decode(self, start: int, end: int) -> str:
+        """Texte entre deux positions en octets (comme encoding.decode sur des tokens)"""
+        return self.data[start:end].decode('utf-8', errors='replace')
+    
+    def _fragment(self, start: int, end: int) -> int:
+        """Nombre de tokens d'un fragment de texte ré-encodé"""
+        if start >= end:
+            return 0
+        return self.chunker._count_fragment(self.decode(start, end))
+    
+    def _is_pretoken_start(self, byte_pos: int, start: int) -> bool:
+        """
+        Vrai si un pré-token commence toujours en byte_pos, quel que soit le début du texte
+        
+        Dans les expressions régulières des encodages tiktoken, un espace qui suit un
+        caractère non blanc, ou un saut de ligne qui suit une lettre ou un chiffre,
+        ouvre toujours un nouveau pré-token : le BPE ne fusionne jamais de part et
+        d'autre, et l'extrait commençant en start s'encode comme le document.
+        """
+        previous = self.data[byte_pos - 1]
+        if previous < 0x80:
+            if self.data[byte_pos] == 0x20:
+                return previous > 0x20
+            return chr(previous).isalnum()
+        
+        char_start = byte_pos - 1
+        while char_start > start and 0x80 <= self.data[char_start] < 0xC0:
+            char_start -= 1
+        if 0x80 <= self.data[char_start] < 0xC0:
+            return False
+        previous = self.data[char_start:byte_pos].decode('utf-8', errors='replace')
+        if self.data[byte_pos] == 0x20:
+            return not previous.isspace()
+        return previous.isalnum()
+    
+    def _pretoken_bounds(self, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """
+        Premier et dernier début de pré-token strictement entre deux positions en octets
+        
+        Returns:
+            Indices des tokens du document qui commencent à ces positions
+            (None si l'extrait tient dans un seul pré-token)
+        """
+        first = last = None
+        for separator in (b' ', b'\n'):
+            position = self.data.find(separator, start + 1, end)
+            while position >= 0 and not self._is_pretoken_start(position, start):
+                position = self.data.find(separator, position + 1, end)
+            if position < 0:
+                continue
+            if first is None or position < first:
+                first = position
+            position = self.data.rfind(separator, position, end)
+            while not self._is_pretoken_start(position, start):
+                position = self.data.rfind(separator, first, position)
+            if last is None or position > last:
+                last = position
+        if first is None:
+            return None
+        
+        lo = bisect_left(self.starts, first)
+        hi = bisect_left(self.starts, last, lo)
+        if self.starts[lo] != first or self.starts[hi] != last:
+            return None
+        return lo, hi
+    
+    def count(self, start: int, end: int) -> int:
+        """Nombre de tokens entre deux positions en octets, sans ré-encodage"""
+        if start >= end:
+            return 0
+        bounds = self._pretoken_bounds(start, end)
+        if bounds is None:
+            return self._fragment(start, end)
+        
+        # Seuls le premier et le dernier pré-token sont ré-encodés (fragments courts, en cache) :
+        # le BPE d'un pré-token coupé (ou d'un caractère multi-octets coupé) peut différer
+        lo, hi = bounds
+        return self._fragment(start, self.starts[lo]) + (hi - lo) + self._fragment(self.starts[hi], end)
+    
+    def _fragment_tail(self, start: int, end: int, n: int) -> int:
+        """Début en octets des n derniers tokens d'un fragment ré-encodé"""
+        tokens = self.chunker.encoding.encode(self.decode(start, end))
+        if n >= len(tokens):
+            return start
+        lengths = self._token_byte_lengths(self.chunker.encoding)[np.asarray(tokens[-n:], dtype=np.int64)]
+        byte_pos = end - int(lengths.sum())
+        
+        # Fragment commençant au milieu d'un caractère : chaque octet de continuation
+        # est décodé en un caractère de remplacement (3 octets)
+        partial = start
+        while partial < end and 0x80 <= self.data[partial] < 0xC0:
+            partial += 1
+        if byte_pos < partial:
+            return start
+        return byte_pos
+    
+    def tail(self, start: int, end: int, n: int) -> Tuple[int, int]:
+        """
+        Début des n derniers tokens entre deux positions en octets
+        
+        Returns:
+            Position en octets et nombre de tokens du texte décodé correspondant
+            (une coupure au milieu d'un caractère produit des caractères de remplacement)
+        """
+        tokens = self.count(start, end)
+        if tokens <= n:
+            return start, tokens
+        
+        bounds = self._pretoken_bounds(start, end)
+        if bounds is None:
+            byte_pos = self._fragment_tail(start, end, n)
+        else:
+            lo, hi = bounds
+            tail_tokens = self._fragment(self.starts[hi], end)
+            if n <= tail_tokens:
+                byte_pos = self._fragment_tail(self.starts[hi], end, n)
+            elif n - tail_tokens <= hi - lo:
+                byte_pos = self.starts[hi - (n - tail_tokens)]
+            else:
+                byte_pos = self._fragment_tail(start, self.starts[lo], n - tail_tokens - (hi - lo))
+        return byte_pos, self.count(byte_pos, end)
 
 
 class TextChunker:
     """Classe pour découper du texte en chunks avec chevauchement"""
     
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50, model: str = "gpt-3.5-turbo"):
+    # À incrémenter quand les chunks produits changent (invalide les index incrémentaux)
+    VERSION = 3
+    
+    # Moteurs de découpage disponibles
+    ENGINES = ('single_pass', 'legacy')
+    
+    FRAGMENT_CACHE_SIZE = 100000
+    FRAGMENT_MAX_LENGTH = 256
+    
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50, model: str = "gpt-3.5-turbo",
+                 engine: str = "single_pass", workers: int = 1):
         """
         Initialize le chunker
         
@@ -18,15 +219,41 @@ class TextChunker:
             chunk_size: Nombre de tokens par chunk
             chunk_overlap: Nombre de tokens de chevauchement entre chunks
             model: Modèle OpenAI pour le comptage des tokens
+            engine: 'single_pass' (chaque document est encodé une seule fois)
+                    ou 'legacy' (un encodage par paragraphe, phrase et chevauchement)
+            workers: Nombre de documents découpés en parallèle (1 = séquentiel)
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Moteur de chunking inconnu: {engine}")
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.model = model
         self.encoding = tiktoken.encoding_for_model(model)
+        self.engine = engine
+        self.workers = max(1, workers)
+        self._fragment_cache = {}
     
     def count_tokens(self, text: str) -> int:
         """Compte le nombre de tokens dans un texte"""
         return len(self.encoding.encode(text))
     
+    def _count_fragment(self, text: str) -> int:
+        """Compte les tokens d'un court fragment de texte (avec cache)"""
+        if len(text) > self.FRAGMENT_MAX_LENGTH:
+            return self.count_tokens(text)
+        count = self._fragment_cache.get(text)
+        if count is None:
+            if len(self._fragment_cache) >= self.FRAGMENT_CACHE_SIZE:
+                self._fragment_cache.clear()
+            count = self._fragment_cache[text] = self.count_tokens(text)
+        return count
+    
+    def _junction(self, left: str, right: str) -> int:
+        """Tokens ajoutés par le séparateur '\\n\\n' entre deux textes (fusions BPE comprises)"""
+        left, right = left[-8:], right[:8]
+        return (self._count_fragment(left + "\n\n" + right)
+                - self._count_fragment(left) - self._count_fragment(right))
+    
     def chunk_text(self, text: str, source: str = "") -> List[Dict]:
         """
         Découpe un texte en chunks
@@ -44,54 +271,145 @@ class TextChunker:
             return []
         
         # Diviser en paragraphes
-        paragraphs = text.split('\n\n')
+        return list(self._chunk_paragraphs(self._split_paragraphs(text, None), source))
+    
+    def chunk_pages(self, pages: Iterable[Tuple[int, str]], source: str = "") -> List[Dict]:
+        """
+        Découpe un document page par page en chunks
         
-        chunks = []
+        Chaque chunk indique les pages qu'il couvre ('page_start' et 'page_end').
+        
+        Args:
+            pages: Itérable de tuples (numéro de page, texte de la page)
+            source: Nom du fichier source
+            
+        Returns:
+            Liste de dictionnaires contenant les chunks et métadonnées
+        """
+        return list(self.iter_page_chunks(pages, source))
+    
+    def iter_page_chunks(self, pages: Iterable[Tuple[int, str]], source: str = "") -> Iterator[Dict]:
+        """
+        Découpe un document page par page et produit chaque chunk dès qu'il est complet
+        
+        Les pages sont consommées au fur et à mesure (par exemple depuis
+        DocumentProcessor.iter_pdf_pages) : seules les pages du chunk en cours
+        sont gardées en mémoire.
+        
+        Args:
+            pages: Itérable de tuples (numéro de page, texte de la page)
+            source: Nom du fichier source
+            
+        Yields:
+            Chunks avec texte et métadonnées
+        """
+        paragraphs = (
+            paragraph
+            for page_number, page_text in pages
+            for paragraph in self._split_paragraphs(page_text, page_number)
+        )
+        return self._chunk_paragraphs(paragraphs, source)
+    
+    def _split_paragraphs(self, text: str, page: Optional[int]) -> Iterator[Tuple[str, Optional[int], Optional[tuple]]]:
+        """
+        Découpe un texte en paragraphes
+        
+        Yields:
+            Tuples (paragraphe, numéro de page, position) où la position est
+            (texte encodé, début, fin) avec le moteur 'single_pass', sinon None
+        """
+        if self.engine == 'legacy':
+            for paragraph in text.split('\n\n'):
+                yield paragraph, page, None
+            return
+        
+        # Un seul encodage pour tout le texte
+        tokenized = _TokenizedText(self, text)
+        position = 0
+        for paragraph in text.split('\n\n'):
+            start = position + len(paragraph) - len(paragraph.lstrip())
+            yield paragraph, page, tokenized.span(start, start + len(paragraph.strip()))
+            position += len(paragraph) + 2
+    
+    def _make_chunk(self, text: str, source: str, tokens: int, chunk_id: int, pages: List[int]) -> Dict:
+        """Construit le dictionnaire d'un chunk (avec la plage de pages si connue)"""
+        chunk = {
+            'text': text.strip(),
+            'source': source,
+            'tokens': tokens,
+            'chunk_id': chunk_id
+        }
+        if pages:
+            chunk['page_start'] = min(pages)
+            chunk['page_end'] = max(pages)
+        return chunk
+    
+    def _count(self, text: str, span: Optional[tuple]) -> int:
+        """Compte les tokens d'un texte, à partir de l'encodage du document si disponible"""
+        if span is None:
+            return self.count_tokens(text)
+        tokenized, start, end = span
+        return tokenized.count(start, end)
+    
+    def _chunk_paragraphs(self, paragraphs: Iterable[Tuple[str, Optional[int], Optional[tuple]]],
+                          source: str) -> Iterator[Dict]:
+        """Découpe une suite de paragraphes (avec leur numéro de page éventuel) en chunks"""
+        chunk_count = 0
         current_chunk = ""
         current_tokens = 0
+        current_pages = []
+        current_spans = []
         
-        for paragraph in paragraphs:
+        for paragraph, page, span in paragraphs:
             paragraph = paragraph.strip()
             if not paragraph:
                 continue
             
-            paragraph_tokens = self.count_tokens(paragraph)
+            paragraph_tokens = self._count(paragraph, span)
+            paragraph_pages = [page] if page is not None else []
             
             # Si le paragraphe seul dépasse la taille max, on le découpe par phrases
             if paragraph_tokens > self.chunk_size:
                 # Sauvegarder le chunk actuel s'il existe
                 if current_chunk:
-                    chunks.append({
-                        'text': current_chunk.strip(),
-                        'source': source,
-                        'tokens': current_tokens,
-                        'chunk_id': len(chunks)
-                    })
+                    yield self._make_chunk(current_chunk, source, current_tokens, chunk_count, current_pages)
+                    chunk_count += 1
                     current_chunk = ""
                     current_tokens = 0
+                    current_pages = []
+                    current_spans = []
                 
                 # Découper le long paragraphe
-                sentence_chunks = self._chunk_long_text(paragraph, source, len(chunks))
-                chunks.extend(sentence_chunks)
+                sentence_chunks = self._chunk_long_text(paragraph, source, chunk_count, paragraph_pages, span)
+                yield from sentence_chunks
+                chunk_count += len(sentence_chunks)
             
             # Si ajouter ce paragraphe dépasse la taille, sauvegarder le chunk actuel
             elif current_tokens + paragraph_tokens > self.chunk_size:
                 if current_chunk:
-                    chunks.append({
-                        'text': current_chunk.strip(),
-                        'source': source,
-                        'tokens': current_tokens,
-                        'chunk_id': len(chunks)
-                    })
+                    yield self._make_chunk(current_chunk, source, current_tokens, chunk_count, current_pages)
+                    chunk_count += 1
                 
                 # Commencer un nouveau chunk avec chevauchement
                 if self.chunk_overlap > 0 and current_chunk:
-                    overlap_text = self._get_overlap(current_chunk)
-                    current_chunk = overlap_text + "\n\n" + paragraph
-                    current_tokens = self.count_tokens(current_chunk)
+                    if span is None:
+                        overlap_text = self._get_overlap(current_chunk)
+                        current_chunk = overlap_text + "\n\n" + paragraph
+                        current_tokens = self.count_tokens(current_chunk)
+                    else:
+                        current_spans, overlap_tokens = self._get_overlap_spans(current_spans)
+                        overlap_text = "\n\n".join(t.decode(a, b) for t, a, b in current_spans)
+                        current_chunk = overlap_text + "\n\n" + paragraph
+                        current_tokens = (overlap_tokens + self._junction(overlap_text, paragraph)
+                                          + paragraph_tokens)
+                        current_spans.append(span)
+                    # Le chevauchement provient de la fin du chunk précédent
+                    current_pages = current_pages[-1:] + paragraph_pages
                 else:
                     current_chunk = paragraph
                     current_tokens = paragraph_tokens
+                    current_pages = paragraph_pages
+                    current_spans = [span] if span else []
             else:
                 # Ajouter le paragraphe au chunk actuel
                 if current_chunk:
@@ -99,41 +417,32 @@ class TextChunker:
                 else:
                     current_chunk = paragraph
                 current_tokens += paragraph_tokens
+                current_pages = current_pages + paragraph_pages
+                if span:
+                    current_spans.append(span)
         
         # Ajouter le dernier chunk
         if current_chunk:
-            chunks.append({
-                'text': current_chunk.strip(),
-                'source': source,
-                'tokens': current_tokens,
-                'chunk_id': len(chunks)
-            })
-        
-        return chunks
+            yield self._make_chunk(current_chunk, source, current_tokens, chunk_count, current_pages)
     
-    def _chunk_long_text(self, text: str, source: str, start_id: int) -> List[Dict]:
+    def _chunk_long_text(self, text: str, source: str, start_id: int, pages: List[int] = None,
+                         span: Optional[tuple] = None) -> List[Dict]:
         """Découpe un texte très long en chunks par phrases"""
-        sentences = text.replace('! ', '!|').replace('? ', '?|').replace('. ', '.|').split('|')
-        
         chunks = []
         current_chunk = ""
         current_tokens = 0
         
-        for sentence in sentences:
+        for sentence, sentence_span in self._split_sentences(text, span):
             sentence = sentence.strip()
             if not sentence:
                 continue
             
-            sentence_tokens = self.count_tokens(sentence)
+            sentence_tokens = self._count(sentence, sentence_span)
             
             if current_tokens + sentence_tokens > self.chunk_size:
                 if current_chunk:
-                    chunks.append({
-                        'text': current_chunk.strip(),
-                        'source': source,
-                        'tokens': current_tokens,
-                        'chunk_id': start_id + len(chunks)
-                    })
+                    chunks.append(self._make_chunk(current_chunk, source, current_tokens,
+                                                   start_id + len(chunks), pages))
                 
                 current_chunk = sentence
                 current_tokens = sentence_tokens
@@ -145,15 +454,70 @@ class TextChunker:
                 current_tokens += sentence_tokens
         
         if current_chunk:
-            chunks.append({
-                'text': current_chunk.strip(),
-                'source': source,
-                'tokens': current_tokens,
-                'chunk_id': start_id + len(chunks)
-            })
+            chunks.append(self._make_chunk(current_chunk, source, current_tokens,
+                                           start_id + len(chunks), pages))
         
         return chunks
     
+    def _split_sentences(self, text: str, span: Optional[tuple]) -> Iterator[Tuple[str, Optional[tuple]]]:
+        """Découpe un paragraphe en phrases (avec leur position si le paragraphe en a une)"""
+        if span is None:
+            for sentence in text.replace('! ', '!|').replace('? ', '?|').replace('. ', '.|').split('|'):
+                yield sentence, None
+            return
+        
+        tokenized, offset, _ = span
+        offset = tokenized.char_offset(offset)
+        position = 0
+        separators = [(m.start(), m.end()) for m in SENTENCE_SEPARATOR.finditer(text)]
+        for sep_start, sep_end in separators + [(len(text), len(text))]:
+            sentence = text[position:sep_start]
+            start = offset + position + len(sentence) - len(sentence.lstrip())
+            yield sentence, tokenized.span(start, start + len(sentence.strip()))
+            position = sep_end
+    
+    def _get_overlap_spans(self, spans: List[tuple]) -> Tuple[List[tuple], int]:
+        """
+        Récupère les derniers tokens d'un chunk sans le ré-encoder
+        
+        Args:
+            spans: Positions (texte encodé, début, fin) des morceaux du chunk,
+                   séparés par '\\n\\n'
+            
+        Returns:
+            Positions des morceaux formant le chevauchement et leur nombre de tokens
+        """
+        remaining = self.chunk_overlap
+        overlap = []
+        total = 0
+        
+        for i in range(len(spans) - 1, -1, -1):
+            tokenized, start, end = spans[i]
+            tokens = tokenized.count(start, end)
+            if i < len(spans) - 1:
+                # Séparateur avec le morceau suivant
+                next_tokenized, next_start, next_end = overlap[0]
+                # 36 octets : au moins 8 caractères entiers de part et d'autre
+                separator = self._junction(tokenized.decode(max(start, end - 36), end),
+                                           next_tokenized.decode(next_start, min(next_end, next_start + 36)))
+                if separator >= remaining:
+                    # Chevauchement commençant dans le séparateur : seuls ses derniers tokens
+                    # comptent (les blancs en tête sont retirés du chunk)
+                    total += remaining
+                    break
+                remaining -= separator
+                total += separator
+            if tokens >= remaining:
+                tail_start, tail_tokens = tokenized.tail(start, end, remaining)
+                overlap.insert(0, (tokenized, tail_start, end))
+                total += tail_tokens
+                break
+            overlap.insert(0, spans[i])
+            remaining -= tokens
+            total += tokens
+        
+        return overlap, total
+    
     def _get_overlap(self, text: str) -> str:
         """Récupère les derniers tokens pour le chevauchement"""
         tokens = self.encoding.encode(text)
@@ -174,11 +538,82 @@ class TextChunker:
         Returns:
             Liste de tous les chunks
         """
-        all_chunks = []
+        return list(self.iter_chunks(documents))
+    
+    def iter_chunks(self, documents: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Découpe des documents en chunks au fil de l'eau
         
-        for doc in documents:
-            if doc.get('success') and doc.get('text'):
-                chunks = self.chunk_text(doc['text'], doc.get('filename', 'unknown'))
-                all_chunks.extend(chunks)
+        Chaque document n'est lu qu'au moment où ses chunks sont demandés,
+        ce qui permet de ne garder en mémoire qu'un document à la fois ; un
+        document fourni page par page ('pages', voir DocumentProcessor.process_file)
+        est découpé au fil de ses pages.
+        Avec plusieurs workers, les documents sont découpés en parallèle dans
+        des processus (au plus 2 documents par worker en avance) et les chunks
+        restent dans l'ordre des documents.
         
-        return all_chunks
+        Args:
+            documents: Itérable de documents avec 'filename' et 'text' ou 'pages'
+            
+        Yields:
+            Chunks avec texte et métadonnées
+        """
+        if self.workers == 1:
+            for doc in documents:
+                yield from self._iter_document_chunks(doc)
+            return
+        
+        # Chaque processus crée son chunker (et son encodeur) une seule fois ; pas de fork
+        # depuis le thread d'indexation (voir worker_context)
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context(),
+                                 initializer=_init_chunk_worker,
+                                 initargs=(self.chunk_size, self.chunk_overlap, self.model, self.engine)) as executor:
+            pending = deque()
+            for doc in documents:
+                if not self._has_content(doc):
+                    continue
+                if doc.get('pages') is not None:
+                    # Un itérateur de pages ne peut pas être envoyé à un autre processus
+                    doc = dict(doc, pages=list(doc['pages']))
+                pending.append(executor.submit(_chunk_document_worker, doc))
+                if len(pending) >= self.workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    
+    @staticmethod
+    def _has_content(doc: Dict) -> bool:
+        return bool(doc.get('success') and (doc.get('text') or doc.get('pages') is not None))
+    
+    def _iter_document_chunks(self, doc: Dict) -> Iterator[Dict]:
+        """Découpe un document extrait (les chunk_id sont numérotés par document)"""
+        if not self._has_content(doc):
+            return iter(())
+        source = doc.get('filename', 'unknown')
+        if doc.get('pages') is not None:
+            return self.iter_page_chunks(doc['pages'], source)
+        if doc.get('page_offsets'):
+            return self.iter_page_chunks(self._iter_document_pages(doc), source)
+        return iter(self.chunk_text(doc['text'], source))
+    
+    @staticmethod
+    def _iter_document_pages(doc: Dict) -> Iterator[Tuple[int, str]]:
+        """Découpe le texte d'un document paginé selon ses offsets de pages"""
+        text = doc['text']
+        offsets = doc['page_offsets']
+        for i, start in enumerate(offsets):
+            end = offsets[i + 1] if i + 1 < len(offsets) else len(text)
+            yield i + 1, text[start:end]
+
+
+# Chunker propre à chaque processus du pool (créé par l'initializer)
+_worker_chunker = None
+
+
+def _init_chunk_worker(chunk_size: int, chunk_overlap: int, model: str, engine: str):
+    global _worker_chunker
+    _worker_chunker = TextChunker(chunk_size, chunk_overlap, model, engine)
+
+
+def _chunk_document_worker(doc: Dict) -> List[Dict]:
+    return list(_worker_chunker._iter_document_chunks(doc))
@@ -0,0 +1,194 @@
+"""
+Module de construction du contexte documentaire
+Assemble les chunks retrouvés dans un budget de tokens : chunks quasi identiques
+écartés, chunks voisins d'un même document fusionnés sans leur chevauchement
+"""
+
+import re
+import zlib
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Nombre premier de Mersenne (2^61 - 1) pour les permutations MinHash
+MINHASH_PRIME = (1 << 61) - 1
+
+
+def format_pages(result: Dict) -> str:
+    """Formate la plage de pages d'un résultat de recherche (vide si inconnue)"""
+    if 'page_start' not in result:
+        return ''
+    if result['page_start'] == result['page_end']:
+        return f", p. {result['page_start']}"
+    return f", p. {result['page_start']}-{result['page_end']}"
+
+
+def format_passage(result: Dict) -> str:
+    """Formate un passage du contexte avec sa source"""
+    return f"[Document: {result['source']}{format_pages(result)}]\n{result['text']}"
+
+
+def merge_overlapping(first: str, second: str, min_overlap: int = 20) -> str:
+    """
+    Concatène deux chunks consécutifs en retirant le chevauchement du chunker
+    (le début du second répète la fin du premier)
+
+    Args:
+        first: Texte du premier chunk
+        second: Texte du chunk suivant
+        min_overlap: Longueur minimale en caractères d'un chevauchement reconnu
+
+    Returns:
+        Texte fusionné (séparé par une ligne vide si aucun chevauchement n'est trouvé)
+    """
+    probe = second[:min_overlap]
+    if len(probe) == min_overlap:
+        position = first.find(probe)
+        while position >= 0:
+            if second.startswith(first[position:]):
+                return first + second[len(first) - position:]
+            position = first.find(probe, position + 1)
+    return first + "\n\n" + second
+
+
+class ContextBuilder:
+    """Classe pour assembler le contexte transmis au LLM dans un budget de tokens"""
+
+    def __init__(self, encoding, max_tokens: int = 3000, duplicate_threshold: float = 0.8,
+                 shingle_size: int = 5, num_perm: int = 64):
+        """
+        Initialize le constructeur de contexte
+
+        Args:
+            encoding: Encodeur tiktoken utilisé pour mesurer les tokens (celui du chunker)
+            max_tokens: Budget de tokens du contexte
+            duplicate_threshold: Similarité de Jaccard (estimée par MinHash) à partir de
+                                 laquelle un chunk est considéré comme un doublon
+            shingle_size: Nombre de mots par shingle comparé
+            num_perm: Nombre de permutations MinHash
+        """
+        self.encoding = encoding
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(0)
+        # Coefficients sur 32 bits : a * h + b (h = CRC32) ne dépasse pas 2^64
+        self._perm_a = rng.integers(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._perm_b = rng.integers(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+
+    def count_tokens(self, text: str) -> int:
+        """Compte le nombre de tokens dans un texte"""
+        return len(self.encoding.encode(text))
+
+    def _signature(self, text: str) -> np.ndarray:
+        """Signature MinHash des shingles de mots du texte"""
+        words = WORD_PATTERN.findall(text.lower())
+        size = min(self.shingle_size, max(1, len(words)))
+        shingles = {' '.join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((self._perm_a * hashes + self._perm_b) % MINHASH_PRIME).min(axis=1)
+
+    def _drop_duplicates(self, results: List[Dict]) -> Tuple[List[Dict], int]:
+        """Écarte les chunks quasi identiques à un chunk mieux classé"""
+        kept, signatures = [], []
+        for result in results:
+            signature = self._signature(result['text'])
+            if any(np.mean(signature == other) >= self.duplicate_threshold for other in signatures):
+                continue
+            kept.append(result)
+            signatures.append(signature)
+        return kept, len(results) - len(kept)
+
+    @staticmethod
+    def _merge_neighbours(results: List[Dict]) -> List[Dict]:
+        """
+        Regroupe les chunks consécutifs d'un même document en passages, placés au rang
+        de leur meilleur chunk (les chunk_id sont numérotés par document)
+        """
+        groups = {}
+        for rank, result in enumerate(results):
+            groups.setdefault(result['source'], []).append((result['chunk_id'], rank, result))
+
+        passages = []
+        for chunks in groups.values():
+            chunks.sort(key=lambda chunk: chunk[0])
+            run = [chunks[0]]
+            for chunk in chunks[1:]:
+                if chunk[0] == run[-1][0] + 1:
+                    run.append(chunk)
+                else:
+                    passages.append(run)
+                    run = [chunk]
+            passages.append(run)
+
+        merged = []
+        for run in sorted(passages, key=lambda run: min(rank for _, rank, _ in run)):
+            passage = {'source': run[0][2]['source'], 'text': run[0][2]['text'], 'chunks': len(run)}
+            for _, _, result in run[1:]:
+                passage['text'] = merge_overlapping(passage['text'], result['text'])
+            pages = [(result['page_start'], result['page_end']) for _, _, result in run if 'page_start' in result]
+            if pages:
+                passage['page_start'] = min(start for start, _ in pages)
+                passage['page_end'] = max(end for _, end in pages)
+            passage['results'] = [result for _, _, result in run]
+            merged.append(passage)
+        return merged
+
+    def build(self, results: List[Dict], max_tokens: int = None) -> Tuple[str, Dict]:
+        """
+        Construit le contexte à partir des résultats de recherche (du plus au moins pertinent)
+
+        Les passages sont ajoutés par ordre de pertinence tant qu'ils tiennent dans le
+        budget ; le premier est tronqué s'il le dépasse à lui seul. Chaque résultat
+        reçoit 'in_context' (True s'il figure dans le contexte).
+
+        Args:
+            results: Résultats de la recherche
+            max_tokens: Budget de tokens (défaut: budget du constructeur)
+
+        Returns:
+            (contexte, statistiques : tokens avant et après, doublons écartés,
+             chunks fusionnés, chunks hors budget)
+        """
+        max_tokens = self.max_tokens if max_tokens is None else max_tokens
+        for result in results:
+            result['in_context'] = False
+
+        unique, duplicates = self._drop_duplicates(results)
+        passages = self._merge_neighbours(unique)
+
+        parts, used_tokens, merged, over_budget = [], 0, 0, 0
+        separator_tokens = self.count_tokens("\n\n")
+        for passage in passages:
+            text = format_passage(passage)
+            tokens = self.count_tokens(text) + (separator_tokens if parts else 0)
+            if used_tokens + tokens > max_tokens:
+                if parts:
+                    over_budget += passage['chunks']
+                    continue
+                # Passage le plus pertinent plus long que le budget : tronqué
+                text = self.encoding.decode(self.encoding.encode(text)[:max_tokens])
+                tokens = self.count_tokens(text)
+            parts.append(text)
+            used_tokens += tokens
+            merged += passage['chunks'] - 1
+            for result in passage['results']:
+                result['in_context'] = True
+
+        context = "\n\n".join(parts)
+        raw_tokens = self.count_tokens("\n\n".join(format_passage(result) for result in results))
+        context_tokens = self.count_tokens(context)
+        return context, {
+            'budget': max_tokens,
+            'chunks_retrieved': len(results),
+            'chunks_used': sum(1 for result in results if result['in_context']),
+            'duplicates_dropped': duplicates,
+            'chunks_merged': merged,
+            'chunks_over_budget': over_budget,
+            'tokens_raw': raw_tokens,
+            'tokens_used': context_tokens,
+            'tokens_saved': raw_tokens - context_tokens
+        }
@@ -4,7 +4,12 @@ Supporte: PDF, TXT, DOC, DOCX, MD
 """
 
 import os
-from typing import List, Dict
+import time
+import itertools
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from typing import List, Dict, Iterator, Tuple
 import PyPDF2
 from docx import Document
 import markdown
@@ -16,15 +21,19 @@ class DocumentProcessor:
     def __init__(self):
         self.supported_extensions = ['.pdf', '.txt', '.doc', '.docx', '.md']
     
-    def process_file(self, filepath: str) -> Dict[str, any]:
+    def process_file(self, filepath: str, stream_pages: bool = False) -> Dict[str, any]:
         """
         Traite un fichier et extrait son contenu texte
         
         Args:
             filepath: Chemin vers le fichier
+            stream_pages: Pour un PDF, ne pas assembler le texte : le résultat contient
+                          'pages', un itérateur (numéro de page, texte) lu à la demande
+                          (la première page est extraite tout de suite pour détecter
+                          les fichiers illisibles ou chiffrés)
             
         Returns:
-            Dict contenant le texte, métadonnées et statut
+            Dict contenant le texte (ou les pages), métadonnées et statut
         """
         if not os.path.exists(filepath):
             return {'success': False, 'error': 'Fichier non trouvé'}
@@ -33,11 +42,14 @@ class DocumentProcessor:
         extension = os.path.splitext(filename)[1].lower()
         
         if extension not in self.supported_extensions:
-            return {'success': False, 'error': f'Extension {extension} non supportée'}
+            return {'success': False, 'filename': filename, 'error': f'Extension {extension} non supportée'}
         
+        page_offsets = None
         try:
+            if extension == '.pdf' and stream_pages:
+                return self._stream_pdf(filepath)
             if extension == '.pdf':
-                text = self._extract_pdf(filepath)
+                text, page_offsets = self._extract_pdf_with_offsets(filepath)
             elif extension == '.txt':
                 text = self._extract_txt(filepath)
             elif extension in ['.doc', '.docx']:
@@ -45,9 +57,9 @@ class DocumentProcessor:
             elif extension == '.md':
                 text = self._extract_markdown(filepath)
             else:
-                return {'success': False, 'error': 'Type de fichier non reconnu'}
+                return {'success': False, 'filename': filename, 'error': 'Type de fichier non reconnu'}
             
-            return {
+            result = {
                 'success': True,
                 'filename': filename,
                 'text': text,
@@ -55,17 +67,65 @@ class DocumentProcessor:
                 'word_count': len(text.split()),
                 'extension': extension
             }
+            if page_offsets is not None:
+                # Position du début de chaque page dans le texte (page n -> page_offsets[n - 1])
+                result['page_offsets'] = page_offsets
+                result['page_count'] = len(page_offsets)
+            return result
         except Exception as e:
-            return {'success': False, 'error': f'Erreur lors du traitement: {str(e)}'}
+            return {'success': False, 'filename': filename, 'error': f'Erreur lors du traitement: {str(e)}'}
+    
+    def iter_pdf_pages(self, filepath: str) -> Iterator[Tuple[int, str]]:
+        """
+        Extrait le texte d'un PDF page par page
+        
+        Args:
+            filepath: Chemin vers le PDF
+            
+        Yields:
+            Tuples (numéro de page à partir de 1, texte de la page)
+        """
+        with open(filepath, 'rb') as file:
+            yield from self._iter_reader_pages(PyPDF2.PdfReader(file))
+    
+    @staticmethod
+    def _iter_reader_pages(pdf_reader: PyPDF2.PdfReader) -> Iterator[Tuple[int, str]]:
+        for page_number, page in enumerate(pdf_reader.pages, start=1):
+            yield page_number, page.extract_text() or ""
+    
+    def _stream_pdf(self, filepath: str) -> Dict[str, any]:
+        """Ouvre un PDF dont les pages seront extraites au fil du découpage"""
+        pdf_reader = PyPDF2.PdfReader(filepath)
+        pages = self._iter_reader_pages(pdf_reader)
+        first_page = next(pages, None)
+        return {
+            'success': True,
+            'filename': os.path.basename(filepath),
+            'pages': itertools.chain([first_page], pages) if first_page else iter(()),
+            'page_count': len(pdf_reader.pages),
+            'extension': '.pdf'
+        }
     
     def _extract_pdf(self, filepath: str) -> str:
         """Extrait le texte d'un PDF"""
-        text = ""
-        with open(filepath, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text.strip()
+        return self._extract_pdf_with_offsets(filepath)[0]
+    
+    def _extract_pdf_with_offsets(self, filepath: str) -> Tuple[str, List[int]]:
+        """Extrait le texte d'un PDF et la position de début de chaque page"""
+        pages = [page_text for _, page_text in self.iter_pdf_pages(filepath)]
+        
+        offsets = []
+        position = 0
+        for page_text in pages:
+            offsets.append(position)
+            position += len(page_text) + 1
+        
+        # Un seul join (pas de concaténations successives), puis nettoyage comme avant
+        text = "\n".join(pages)
+        stripped = text.strip()
+        leading = len(text) - len(text.lstrip())
+        offsets = [min(max(0, offset - leading), len(stripped)) for offset in offsets]
+        return stripped, offsets
     
     def _extract_txt(self, filepath: str) -> str:
         """Extrait le texte d'un fichier TXT"""
@@ -109,26 +169,180 @@ class DocumentProcessor:
         # Pour simplifier, on garde le markdown brut
         return md_content
     
-    def process_directory(self, directory: str) -> List[Dict]:
+    def process_directory(self, directory: str, max_workers: int = 1, timeout: float = None) -> List[Dict]:
         """
         Traite tous les fichiers supportés dans un dossier
         
         Args:
             directory: Chemin vers le dossier
+            max_workers: Nombre de processus d'extraction (1 = séquentiel)
+            timeout: Durée maximale d'extraction par fichier en secondes
             
         Returns:
-            Liste des résultats de traitement
+            Liste des résultats de traitement (triés par nom de fichier)
         """
-        results = []
-        
         if not os.path.exists(directory):
-            return results
+            return []
+        
+        filepaths = [os.path.join(directory, filename) for filename in sorted(os.listdir(directory))]
+        return self.process_files([filepath for filepath in filepaths if os.path.isfile(filepath)],
+                                  max_workers=max_workers, timeout=timeout)
+    
+    def process_files(self, filepaths: List[str], max_workers: int = 1, timeout: float = None) -> List[Dict]:
+        """
+        Traite une liste de fichiers
         
-        for filename in os.listdir(directory):
-            filepath = os.path.join(directory, filename)
+        Args:
+            filepaths: Chemins des fichiers à traiter
+            max_workers: Nombre de processus d'extraction (1 = séquentiel)
+            timeout: Durée maximale d'extraction par fichier en secondes
             
-            if os.path.isfile(filepath):
-                result = self.process_file(filepath)
-                results.append(result)
+        Returns:
+            Liste des résultats de traitement, dans l'ordre des fichiers fournis
+        """
+        results = [None] * len(filepaths)
+        
+        for position, result in self.iter_process_files(filepaths, max_workers, timeout):
+            results[position] = result
         
         return results
+    
+    def iter_process_files(self, filepaths: List[str], max_workers: int = 1, timeout: float = None,
+                           stream_pages: bool = False) -> Iterator[Tuple[int, Dict]]:
+        """
+        Traite des fichiers et produit chaque résultat dès qu'il est disponible
+        
+        Avec plusieurs workers ou un timeout, les fichiers sont extraits dans des
+        processus séparés (PyPDF2 et python-docx monopolisent le GIL), réutilisés
+        d'un fichier à l'autre : un fichier trop long est interrompu, et son
+        processus remplacé, sans bloquer les autres.
+        
+        Args:
+            filepaths: Chemins des fichiers à traiter
+            max_workers: Nombre maximal de processus simultanés (None = nombre de CPU)
+            timeout: Durée maximale d'extraction par fichier en secondes
+            stream_pages: Produire les PDF page par page (voir process_file) ; sans effet
+                          quand l'extraction se fait dans des processus séparés
+            
+        Yields:
+            Tuples (position du fichier dans filepaths, résultat du traitement)
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        
+        if max_workers <= 1 and not timeout:
+            for position, filepath in enumerate(filepaths):
+                yield position, self.process_file(filepath, stream_pages)
+            return
+        
+        context = worker_context()
+        pending = deque(enumerate(filepaths))
+        # connexion -> processus, fichier en cours (position, chemin), échéance, prêt
+        workers = {}
+        
+        try:
+            while pending or any(worker['task'] for worker in workers.values()):
+                # Confier les fichiers en attente aux workers libres, puis à de nouveaux
+                # workers dans la limite de max_workers
+                for conn, worker in workers.items():
+                    if worker['task'] is None and pending:
+                        self._assign_file(conn, worker, pending.popleft(), timeout)
+                while pending and len(workers) < max_workers:
+                    parent_conn, child_conn = context.Pipe()
+                    process = context.Process(target=_process_files_worker, args=(child_conn,), daemon=True)
+                    process.start()
+                    child_conn.close()
+                    workers[parent_conn] = {'process': process, 'task': None, 'deadline': None, 'ready': False}
+                    self._assign_file(parent_conn, workers[parent_conn], pending.popleft(), timeout)
+                
+                deadlines = [worker['deadline'] for worker in workers.values() if worker['deadline'] is not None]
+                wait_timeout = max(0, min(deadlines) - time.time()) if deadlines else None
+                
+                ready = wait([conn for conn, worker in workers.items() if worker['task']], timeout=wait_timeout)
+                
+                for conn in ready:
+                    worker = workers[conn]
+                    position, filepath = worker['task']
+                    try:
+                        result = conn.recv()
+                    except (EOFError, OSError):
+                        workers.pop(conn)
+                        _stop_worker(conn, worker['process'])
+                        yield position, {
+                            'success': False,
+                            'filename': os.path.basename(filepath),
+                            'error': 'Le processus d\'extraction s\'est arrêté de manière inattendue'
+                        }
+                        continue
+                    if result is None:
+                        # Worker démarré : le délai du fichier court à partir de maintenant
+                        worker['ready'] = True
+                        worker['deadline'] = time.time() + timeout if timeout else None
+                        continue
+                    worker['task'] = worker['deadline'] = None
+                    yield position, result
+                
+                # Interrompre les extractions qui dépassent le délai (le worker est remplacé)
+                now = time.time()
+                for conn, worker in list(workers.items()):
+                    if worker['deadline'] is not None and now >= worker['deadline']:
+                        workers.pop(conn)
+                        _stop_worker(conn, worker['process'])
+                        position, filepath = worker['task']
+                        yield position, {
+                            'success': False,
+                            'filename': os.path.basename(filepath),
+                            'error': f'Délai d\'extraction dépassé ({timeout}s)'
+                        }
+        finally:
+            for conn, worker in workers.items():
+                _stop_worker(conn, worker['process'])
+    
+    @staticmethod
+    def _assign_file(conn, worker: Dict, task: Tuple[int, str], timeout: float):
+        """Envoie un fichier à extraire à un worker libre"""
+        conn.send(task[1])
+        worker['task'] = task
+        if worker['ready'] and timeout:
+            worker['deadline'] = time.time() + timeout
+
+
+def worker_context():
+    """
+    Contexte multiprocessing des processus d'extraction et de découpage (TextChunker)
+    
+    L'indexation tourne dans un thread du serveur : un fork copierait l'état des
+    autres threads (verrous détenus, clients HTTP, FAISS/OpenMP). Les workers
+    partent donc d'un serveur de fork démarré à part, qui ne précharge que ce
+    module ('spawn' là où forkserver n'existe pas, comme sous Windows). Chaque
+    worker ré-importe tout de même le script principal sous le nom '__mp_main__'
+    (app.py n'y charge alors ni modèles ni index) : ils sont réutilisés d'un
+    fichier à l'autre.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def _stop_worker(conn, process):
+    process.terminate()
+    process.join()
+    conn.close()
+
+
+def _process_files_worker(conn):
+    """Point d'entrée des processus d'extraction : traite les fichiers reçus jusqu'à None"""
+    processor = DocumentProcessor()
+    try:
+        conn.send(None)  # prêt
+        while True:
+            filepath = conn.recv()
+            if filepath is None:
+                break
+            conn.send(processor.process_file(filepath))
+    except EOFError:
+        pass
+    finally:
+        conn.close()
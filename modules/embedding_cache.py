@@ -0,0 +1,319 @@
+"""
+Module de cache des embeddings
+Conserve sur disque les vecteurs déjà calculés, indexés par (modèle, empreinte du texte),
+et en mémoire les vecteurs des questions récentes
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Tuple
+import numpy as np
+
+from .index_lock import fcntl  # None sous Windows (voir index_lock)
+
+
+class _VectorStore:
+    """
+    Stockage float32 memory-mappé des vecteurs d'un modèle, avec éviction LRU
+
+    Les fichiers peuvent être partagés par plusieurs processus (workers gunicorn) :
+    chaque accès se fait sous verrou fichier, et la table clé -> ligne est relue dès
+    qu'un autre processus l'a réécrite (compteur de générations dans le fichier de
+    verrou). Sans cela, une ligne réutilisée par un autre worker renverrait en silence
+    le vecteur d'un autre texte.
+
+    Les lectures se font sous verrou partagé et n'écrivent pas sur disque : les clés
+    lues sont mémorisées et replacées en fin d'ordre LRU à la prochaine écriture de ce
+    processus (sous verrou exclusif), avant toute éviction.
+    """
+
+    GROWTH_ROWS = 1024
+
+    def __init__(self, base_path: str, dimension: int, capacity: int):
+        self.vectors_path = base_path + '.f32'
+        self.keys_path = base_path + '.json'
+        self.lock_path = base_path + '.lock'
+        self.dimension = dimension
+        self.capacity = max(1, capacity)
+        self.slots = OrderedDict()  # clé -> ligne, du moins au plus récemment utilisé
+        self.touched = OrderedDict()  # clés lues depuis la dernière sauvegarde, dans l'ordre
+        self.free_slots = []
+        self.allocated = 0
+        self.vectors = None
+        self._generation = None  # génération de la table des clés chargée
+        self._lock_fd = None
+        self._lock_pid = None
+
+    @contextmanager
+    def locked(self, exclusive: bool = False):
+        """Verrou fichier partagé (lecture) ou exclusif (écriture) entre processus"""
+        if fcntl is None:
+            yield
+            return
+        # Un descripteur hérité d'un fork partagerait son verrou avec le processus parent
+        if self._lock_pid != os.getpid():
+            self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _read_generation(self) -> int:
+        if fcntl is None:
+            return 0
+        data = os.pread(self._lock_fd, 20, 0).strip()
+        return int(data) if data else 0
+
+    def refresh(self):
+        """Recharge la table des clés si elle a changé depuis la dernière lecture (sous verrou)"""
+        generation = self._read_generation()
+        if generation == self._generation:
+            return
+        self.slots = OrderedDict()
+        self.free_slots = []
+        self.allocated = 0
+        self.vectors = None
+        self._generation = generation
+        if os.path.exists(self.vectors_path) and os.path.exists(self.keys_path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.keys_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get('dimension') != self.dimension:
+            return
+
+        row_bytes = self.dimension * 4
+        self.allocated = os.path.getsize(self.vectors_path) // row_bytes
+        if self.allocated:
+            self.vectors = np.memmap(self.vectors_path, dtype='float32', mode='r+',
+                                     shape=(self.allocated, self.dimension))
+
+        for key, slot in data.get('keys', []):
+            if slot < self.allocated:
+                self.slots[key] = slot
+        used = set(self.slots.values())
+        self.free_slots = [slot for slot in range(self.allocated) if slot not in used]
+
+        # La capacité a pu être réduite depuis la dernière exécution
+        while len(self.slots) > self.capacity:
+            _, slot = self.slots.popitem(last=False)
+            self.free_slots.append(slot)
+
+    def _grow(self):
+        """Agrandit le fichier de vecteurs (sans dépasser la capacité)"""
+        new_allocated = min(self.capacity, max(self.allocated * 2, self.GROWTH_ROWS))
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(new_allocated * self.dimension * 4)
+        self.vectors = np.memmap(self.vectors_path, dtype='float32', mode='r+',
+                                 shape=(new_allocated, self.dimension))
+        self.free_slots.extend(range(self.allocated, new_allocated))
+        self.allocated = new_allocated
+
+    def get(self, key: str):
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+        self.slots.move_to_end(key)
+        # La table peut être rechargée avant la prochaine écriture : retenir l'accès
+        self.touched[key] = None
+        self.touched.move_to_end(key)
+        if len(self.touched) > self.capacity:
+            self.touched.popitem(last=False)
+        return self.vectors[slot]
+
+    def apply_touched(self):
+        """Replace les clés lues depuis la dernière sauvegarde en fin d'ordre LRU (sous verrou exclusif)"""
+        for key in self.touched:
+            if key in self.slots:
+                self.slots.move_to_end(key)
+        self.touched.clear()
+
+    def put(self, key: str, vector: np.ndarray):
+        slot = self.slots.get(key)
+        if slot is None:
+            if not self.free_slots and self.allocated < self.capacity:
+                self._grow()
+            if self.free_slots:
+                slot = self.free_slots.pop()
+            else:
+                # Cache plein : réutiliser la ligne la moins récemment utilisée
+                _, slot = self.slots.popitem(last=False)
+        self.slots[key] = slot
+        self.slots.move_to_end(key)
+        self.vectors[slot] = vector
+
+    def save(self):
+        if self.vectors is None:
+            return
+        self.vectors.flush()
+        tmp_path = self.keys_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dimension': self.dimension, 'keys': list(self.slots.items())}, f)
+        os.replace(tmp_path, self.keys_path)
+        if fcntl is not None:
+            self._generation = self._read_generation() + 1
+            os.pwrite(self._lock_fd, str(self._generation).encode().ljust(20), 0)
+
+
+class EmbeddingCache:
+    """Classe pour mettre en cache les embeddings sur disque"""
+
+    def __init__(self, cache_dir: str, max_size_mb: int = 512):
+        """
+        Initialize le cache
+
+        Args:
+            cache_dir: Dossier de stockage du cache
+            max_size_mb: Taille maximale des vecteurs stockés par modèle (Mo)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self._stores = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def text_key(model: str, text: str) -> str:
+        """Clé de cache : empreinte SHA-256 du modèle et du texte"""
+        return hashlib.sha256(f"{model}\n{text}".encode('utf-8')).hexdigest()
+
+    def _store(self, model: str, dimension: int) -> _VectorStore:
+        store_key = (model, dimension)
+        if store_key not in self._stores:
+            safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', model)
+            base_path = os.path.join(self.cache_dir, f"{safe_name}_{dimension}")
+            capacity = self.max_bytes // (dimension * 4)
+            self._stores[store_key] = _VectorStore(base_path, dimension, capacity)
+        return self._stores[store_key]
+
+    def get_many(self, model: str, dimension: int, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Récupère les embeddings présents dans le cache
+
+        Args:
+            model: Identifiant du modèle d'embedding
+            dimension: Dimension des vecteurs
+            texts: Textes à rechercher
+
+        Returns:
+            Tableau (len(texts), dimension) rempli pour les textes trouvés,
+            et indices des textes absents du cache
+        """
+        result = np.zeros((len(texts), dimension), dtype='float32')
+        missing = []
+
+        with self._lock:
+            store = self._store(model, dimension)
+            with store.locked():
+                store.refresh()
+                for i, text in enumerate(texts):
+                    vector = store.get(self.text_key(model, text))
+                    if vector is None:
+                        missing.append(i)
+                    else:
+                        result[i] = vector
+
+        return result, missing
+
+    def put_many(self, model: str, dimension: int, texts: List[str], vectors: np.ndarray):
+        """Ajoute des embeddings au cache et le sauvegarde sur disque"""
+        with self._lock:
+            store = self._store(model, dimension)
+            with store.locked(exclusive=True):
+                store.refresh()
+                store.apply_touched()
+                for text, vector in zip(texts, vectors):
+                    store.put(self.text_key(model, text), vector)
+                store.save()
+
+    def get_stats(self) -> dict:
+        """Retourne le nombre d'entrées par modèle"""
+        with self._lock:
+            return {
+                f"{model} ({dimension})": len(store.slots)
+                for (model, dimension), store in self._stores.items()
+            }
+
+
+class QueryEmbeddingCache:
+    """Classe pour garder en mémoire les embeddings des questions récentes (LRU avec expiration)"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        """
+        Initialize le cache
+
+        Args:
+            max_size: Nombre maximal de questions conservées (0 = cache désactivé)
+            ttl: Durée de validité d'une entrée en secondes (0 = sans expiration)
+        """
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clé -> (date d'ajout, vecteur)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalise une question (Unicode, casse et espaces) pour que les variantes partagent une entrée"""
+        return " ".join(unicodedata.normalize('NFKC', text).casefold().split())
+
+    def get(self, model: str, text: str):
+        """Retourne le vecteur mis en cache pour cette question (None si absent ou expiré)"""
+        key = (model, self.normalize(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, model: str, text: str, vector):
+        """Ajoute le vecteur d'une question en évinçant la moins récemment utilisée si besoin"""
+        if not self.max_size:
+            return
+        key = (model, self.normalize(text))
+        with self._lock:
+            self._entries[key] = (time.time(), np.array(vector, dtype='float32'))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Retourne la taille du cache et son taux de succès"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else None
+            }
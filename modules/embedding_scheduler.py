@@ -0,0 +1,185 @@
+"""
+Module de planification des requêtes d'embeddings OpenAI
+Envoie plusieurs requêtes en parallèle en respectant les limites de débit
+"""
+
+import time
+import random
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+import numpy as np
+import openai
+
+
+class EmbeddingScheduler:
+    """Classe pour paralléliser les appels à l'API d'embeddings OpenAI"""
+
+    # Limites de l'API d'embeddings OpenAI
+    MAX_INPUTS_PER_REQUEST = 2048
+    MAX_TOKENS_PER_INPUT = 8191
+
+    def __init__(self, client, model: str, count_tokens: Callable[[str], int],
+                 max_concurrency: int = 4, max_batch_tokens: int = 50000,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0,
+                 options: Dict = None):
+        """
+        Initialize le planificateur
+
+        Args:
+            client: Client OpenAI (les relances sont gérées ici, pas par le client)
+            model: Modèle d'embedding OpenAI
+            count_tokens: Fonction de comptage des tokens (TextChunker.count_tokens)
+            max_concurrency: Nombre maximal de requêtes simultanées
+            max_batch_tokens: Budget de tokens par requête
+            max_retries: Nombre maximal de relances par requête
+            base_delay: Délai initial du backoff exponentiel (secondes)
+            max_delay: Délai maximal entre deux tentatives (secondes)
+            options: Paramètres supplémentaires des requêtes (ex: {'dimensions': 256})
+        """
+        self.client = client.with_options(max_retries=0)
+        self.model = model
+        self.count_tokens = count_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.options = options or {}
+
+        # Pause partagée par tous les workers après une réponse 429
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+        # Requêtes simultanées autorisées : divisées par deux à chaque 429, puis un cran de plus
+        # après autant de succès que la limite courante. Sans cela, tous les workers repartent
+        # ensemble à la fin de la pause et se font de nouveau refuser.
+        self._limit = self.max_concurrency
+        self._inflight = 0
+        self._successes = 0
+        self._slots = threading.Condition(self._lock)
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'min_concurrency': self.max_concurrency}
+
+    def pack_batches(self, texts: List[str], max_inputs: int = None) -> List[List[int]]:
+        """
+        Regroupe les textes en batchs selon le budget de tokens
+
+        Args:
+            texts: Textes à embedder
+            max_inputs: Nombre maximal de textes par requête
+
+        Returns:
+            Liste de batchs (indices des textes, dans l'ordre d'origine)
+        """
+        max_inputs = min(max_inputs or self.MAX_INPUTS_PER_REQUEST, self.MAX_INPUTS_PER_REQUEST)
+        batches = []
+        current = []
+        current_tokens = 0
+
+        for i, text in enumerate(texts):
+            tokens = min(self.count_tokens(text), self.MAX_TOKENS_PER_INPUT)
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= max_inputs):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed(self, texts: List[str], out: np.ndarray, max_inputs: int = None):
+        """
+        Génère les embeddings en parallèle dans un tableau préalloué
+
+        Args:
+            texts: Textes à embedder
+            out: Tableau (len(texts), dimension) rempli dans l'ordre des textes
+            max_inputs: Nombre maximal de textes par requête
+        """
+        batches = self.pack_batches(texts, max_inputs)
+
+        def run(batch: List[int]):
+            vectors = self._request_with_retry([texts[i] for i in batch])
+            out[batch] = vectors
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # list() propage la première exception rencontrée
+            list(executor.map(run, batches))
+
+    def _request_with_retry(self, batch_texts: List[str]) -> np.ndarray:
+        """Envoie une requête en respectant Retry-After et un backoff exponentiel"""
+        attempt = 0
+        while True:
+            try:
+                with self._slot():
+                    # Après l'obtention de la place : une pause a pu commencer pendant l'attente
+                    self._wait_for_pause()
+                    with self._lock:
+                        self.stats['requests'] += 1
+                    response = self.client.embeddings.create(model=self.model, input=batch_texts, **self.options)
+                # L'API renvoie un index par entrée : ne pas supposer l'ordre
+                data = sorted(response.data, key=lambda item: item.index)
+                self._on_success()
+                return np.array([item.embedding for item in data], dtype='float32')
+            except (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                with self._lock:
+                    self.stats['retries'] += 1
+                    if isinstance(e, openai.RateLimitError):
+                        self.stats['rate_limited'] += 1
+                        # Ralentir tous les workers, pas seulement celui qui a reçu le 429
+                        self._pause_until = max(self._pause_until, time.time() + delay)
+                        self._limit = max(1, self._limit // 2)
+                        self._successes = 0
+                        self.stats['min_concurrency'] = min(self.stats['min_concurrency'], self._limit)
+                time.sleep(delay)
+                attempt += 1
+
+    @contextmanager
+    def _slot(self):
+        """Attend qu'une requête de plus soit autorisée (limite de concurrence courante)"""
+        with self._slots:
+            while self._inflight >= self._limit:
+                self._slots.wait()
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._slots:
+                self._inflight -= 1
+                self._slots.notify()
+
+    def _on_success(self):
+        with self._slots:
+            self._successes += 1
+            if self._limit < self.max_concurrency and self._successes >= self._limit:
+                self._limit += 1
+                self._successes = 0
+                self._slots.notify()
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Délai avant la prochaine tentative (Retry-After si fourni, sinon backoff)"""
+        response = getattr(error, 'response', None)
+        headers = response.headers if response is not None else {}
+
+        retry_after_ms = headers.get('retry-after-ms')
+        retry_after = headers.get('retry-after')
+        try:
+            if retry_after_ms is not None:
+                return min(float(retry_after_ms) / 1000, self.max_delay)
+            if retry_after is not None:
+                return min(float(retry_after), self.max_delay)
+        except ValueError:
+            pass
+
+        delay = min(self.base_delay * (2 ** attempt), self.max_delay)
+        return delay * (0.5 + random.random() / 2)
+
+    def _wait_for_pause(self):
+        delay = self._pause_until - time.time()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,61 @@
+"""
+Module de verrou d'indexation
+Empêche deux indexations simultanées, entre threads d'un même processus
+et entre les workers d'un serveur multi-processus
+"""
+
+import threading
+
+# Verrous fichier entre processus, aussi utilisés par le cache d'embeddings
+try:
+    import fcntl
+except ImportError:  # Windows : un seul processus (waitress), les verrous de thread suffisent
+    fcntl = None
+
+
+class IndexLock:
+    """Verrou non bloquant sur un fichier, partagé par tous les processus du serveur"""
+
+    def __init__(self, path: str):
+        """
+        Initialize le verrou
+
+        Args:
+            path: Fichier de verrou (créé si nécessaire)
+        """
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def acquire(self) -> bool:
+        """
+        Prend le verrou sans attendre
+
+        Returns:
+            True si le verrou est pris, False si une indexation est déjà en cours
+        """
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        if fcntl is None:
+            return True
+
+        try:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Verrou détenu par un autre processus
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._thread_lock.release()
+            return False
+        return True
+
+    def release(self):
+        """Libère le verrou (le verrou fichier est aussi libéré si le processus s'arrête)"""
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
@@ -0,0 +1,130 @@
+"""
+Module de manifeste d'indexation
+Mémorise l'empreinte de chaque fichier indexé et les ids de ses vecteurs
+pour permettre une ré-indexation incrémentale
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, List
+
+
+class IndexManifest:
+    """Classe pour suivre les fichiers indexés et détecter les changements"""
+
+    def __init__(self, path: str):
+        """
+        Initialize le manifeste
+
+        Args:
+            path: Chemin du fichier JSON du manifeste
+        """
+        self.path = path
+        self.config = {}
+        self.files = {}
+
+    @staticmethod
+    def file_hash(filepath: str, block_size: int = 1024 * 1024) -> str:
+        """Calcule l'empreinte SHA-256 d'un fichier par blocs"""
+        sha = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def load(self) -> bool:
+        """
+        Charge le manifeste depuis le disque
+
+        Returns:
+            True si un manifeste valide a été chargé
+        """
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.config = data.get('config', {})
+            self.files = data.get('files', {})
+            return True
+        except (OSError, ValueError):
+            self.config = {}
+            self.files = {}
+            return False
+
+    def save(self):
+        """Sauvegarde le manifeste (écriture dans un fichier temporaire puis renommage)"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'config': self.config, 'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, config: Dict):
+        """Vide le manifeste pour une indexation complète avec une nouvelle configuration"""
+        self.config = dict(config)
+        self.files = {}
+
+    def matches(self, config: Dict) -> bool:
+        """Vérifie que l'index existant a été construit avec la même configuration"""
+        return bool(self.config) and self.config == config
+
+    def diff(self, filepaths: Dict[str, str]) -> Dict:
+        """
+        Compare les fichiers présents avec ceux du manifeste
+
+        Args:
+            filepaths: Dictionnaire {nom de fichier: chemin}
+
+        Returns:
+            Dict avec les listes 'added', 'changed', 'deleted', 'unchanged'
+            et les empreintes courantes 'hashes'
+        """
+        result = {'added': [], 'changed': [], 'deleted': [], 'unchanged': [], 'hashes': {}}
+
+        for filename, filepath in sorted(filepaths.items()):
+            file_stat = os.stat(filepath)
+            entry = self.files.get(filename)
+
+            # Éviter de relire le fichier si taille et date sont inchangées
+            if entry and entry.get('size') == file_stat.st_size and entry.get('mtime') == file_stat.st_mtime:
+                file_hash = entry['hash']
+            else:
+                file_hash = self.file_hash(filepath)
+            result['hashes'][filename] = file_hash
+
+            if entry is None:
+                result['added'].append(filename)
+            elif entry['hash'] != file_hash or not entry.get('complete', True):
+                # Un fichier indexé en partie (extraction interrompue) est retraité
+                result['changed'].append(filename)
+            else:
+                result['unchanged'].append(filename)
+
+        result['deleted'] = sorted(name for name in self.files if name not in filepaths)
+        return result
+
+    def set_file(self, filename: str, filepath: str, file_hash: str, vector_ids: List[int],
+                 complete: bool = True):
+        """
+        Enregistre un fichier indexé avec les ids de ses vecteurs
+        
+        Args:
+            complete: False si l'extraction s'est arrêtée en cours de fichier : ses vecteurs
+                restent suivis (pour être retirés) et le fichier est retraité à la prochaine indexation
+        """
+        file_stat = os.stat(filepath)
+        self.files[filename] = {
+            'hash': file_hash,
+            'size': file_stat.st_size,
+            'mtime': file_stat.st_mtime,
+            'chunk_count': len(vector_ids),
+            'vector_ids': [int(vector_id) for vector_id in vector_ids],
+            'complete': complete
+        }
+
+    def remove_file(self, filename: str) -> List[int]:
+        """Retire un fichier du manifeste et retourne les ids de ses vecteurs"""
+        entry = self.files.pop(filename, None)
+        return entry['vector_ids'] if entry else []
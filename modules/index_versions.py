@@ -0,0 +1,154 @@
+"""
+Module de versions de l'index
+Chaque indexation écrit une nouvelle version dans son propre dossier, publiée
+d'un bloc par un fichier pointeur : une recherche voit toujours un index FAISS
+et des métadonnées issus de la même indexation
+"""
+
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, List, Optional
+
+
+class IndexVersions:
+    """Classe pour créer, publier et nettoyer les versions de l'index"""
+
+    POINTER_FILE = 'CURRENT'
+    # Présent dans le dossier d'une version une fois celle-ci publiée
+    PUBLISHED_FILE = 'PUBLISHED'
+
+    INDEX_FILE = 'faiss_index.bin'
+    METADATA_DIR = 'chunk_store'
+    MANIFEST_FILE = 'index_manifest.json'
+
+    def __init__(self, root: str, keep: int = 2):
+        """
+        Initialize le gestionnaire de versions
+
+        Args:
+            root: Dossier contenant un sous-dossier par version
+            keep: Nombre de versions publiées conservées, version courante comprise
+                  (les précédentes restent lisibles par les recherches déjà lancées)
+        """
+        self.root = root
+        self.keep = max(1, keep)
+        os.makedirs(root, exist_ok=True)
+
+    def paths(self, version: str) -> Dict[str, str]:
+        """Chemins des fichiers d'une version (index FAISS, store des chunks, manifeste)"""
+        directory = os.path.join(self.root, version)
+        return {
+            'dir': directory,
+            'index': os.path.join(directory, self.INDEX_FILE),
+            'metadata': os.path.join(directory, self.METADATA_DIR),
+            'manifest': os.path.join(directory, self.MANIFEST_FILE)
+        }
+
+    def current(self) -> Optional[str]:
+        """Version publiée courante (None si aucun index n'est publié)"""
+        try:
+            with open(os.path.join(self.root, self.POINTER_FILE), 'r', encoding='utf-8') as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if version and os.path.isdir(os.path.join(self.root, version)) else None
+
+    def current_paths(self) -> Optional[Dict[str, str]]:
+        """Chemins des fichiers de la version courante (None si aucun index n'est publié)"""
+        version = self.current()
+        return self.paths(version) if version else None
+
+    def create(self) -> str:
+        """
+        Crée le dossier d'une nouvelle version, invisible des recherches jusqu'à publish()
+
+        Returns:
+            Nom de la version (triable par date de création)
+        """
+        now = time.time()
+        version = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}{int(now % 1 * 1000):03d}-{uuid.uuid4().hex[:6]}"
+        os.makedirs(self.paths(version)['dir'])
+        return version
+
+    def publish(self, version: str):
+        """Fait de la version complète la version courante (remplacement atomique du pointeur)"""
+        with open(os.path.join(self.paths(version)['dir'], self.PUBLISHED_FILE), 'w', encoding='utf-8') as f:
+            f.write(str(time.time()))
+
+        tmp_path = os.path.join(self.root, f'{self.POINTER_FILE}.{version}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, self.POINTER_FILE))
+
+    def adopt(self, index_path: str, metadata_path: str, manifest_path: str = None) -> str:
+        """
+        Déplace un index existant (ancienne organisation, fichiers hors version) dans une version publiée
+
+        Returns:
+            Nom de la version créée
+        """
+        version = self.create()
+        paths = self.paths(version)
+        os.replace(index_path, paths['index'])
+        os.replace(metadata_path, paths['metadata'])
+        if manifest_path and os.path.exists(manifest_path):
+            os.replace(manifest_path, paths['manifest'])
+        self.publish(version)
+        return version
+
+    def _versions(self) -> List[str]:
+        """Noms des dossiers de versions, du plus ancien au plus récent"""
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def _published_at(self, version: str) -> Optional[float]:
+        """Date de publication d'une version (None si elle n'a pas été publiée)"""
+        try:
+            with open(os.path.join(self.paths(version)['dir'], self.PUBLISHED_FILE), 'r', encoding='utf-8') as f:
+                return float(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _remove(self, version: str) -> bool:
+        """Supprime le dossier d'une version (False si des fichiers sont encore ouverts sous Windows)"""
+        shutil.rmtree(self.paths(version)['dir'], ignore_errors=True)
+        return not os.path.exists(self.paths(version)['dir'])
+
+    def gc(self) -> List[str]:
+        """
+        Supprime les versions anciennes et celles dont l'écriture n'a pas abouti
+
+        À appeler uniquement quand aucune indexation n'écrit de version (verrou d'indexation pris).
+        Sous Linux/macOS, une recherche qui utilise encore une version supprimée
+        continue de lire ses fichiers memory-mappés.
+
+        Returns:
+            Versions supprimées
+        """
+        current = self.current()
+        published = {version: self._published_at(version) for version in self._versions()}
+        published = sorted((version for version, published_at in published.items() if published_at is not None),
+                           key=published.get)
+        kept = set(published[-self.keep:])
+        if current:
+            kept.add(current)
+
+        removed = []
+        for version in self._versions():
+            if version not in kept and self._remove(version):
+                removed.append(version)
+        return removed
+
+    def clear(self) -> List[str]:
+        """
+        Dépublie l'index puis supprime toutes les versions
+
+        Returns:
+            Versions supprimées
+        """
+        pointer_path = os.path.join(self.root, self.POINTER_FILE)
+        if os.path.exists(pointer_path):
+            os.remove(pointer_path)
+        return [version for version in self._versions() if self._remove(version)]
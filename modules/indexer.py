@@ -5,18 +5,278 @@ Génère les embeddings et crée un index vectoriel
 
 import os
 import json
-import pickle
-from typing import List, Dict, Tuple
+import time
+import uuid
+import threading
+from typing import List, Dict, Optional, Tuple
 import numpy as np
 import faiss
 from openai import OpenAI
+from .embedding_scheduler import EmbeddingScheduler
+from .chunk_store import ChunkStore
+from .sparse_index import BM25Index
+
+
+# Types d'index FAISS disponibles
+INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'hnsw')
+
+# Compression des vecteurs stockés : aucune (float32), demi-précision, 8 bits par
+# composante (quantification scalaire) ou quantification par produit
+QUANTIZATIONS = ('none', 'fp16', 'sq8', 'pq')
+SCALAR_QUANTIZERS = {'fp16': faiss.ScalarQuantizer.QT_fp16, 'sq8': faiss.ScalarQuantizer.QT_8bit}
+
+# Dimension native des modèles d'embedding OpenAI (les modèles text-embedding-3
+# acceptent une dimension réduite avec le paramètre 'dimensions')
+OPENAI_EMBEDDING_DIMENSIONS = {
+    'text-embedding-3-small': 1536,
+    'text-embedding-3-large': 3072,
+    'text-embedding-ada-002': 1536
+}
+
+# Vecteurs échantillonnés pendant l'indexation pour mesurer le rappel perdu par la compression
+# (pas de mesure en dessous de 2 * COMPRESSION_MIN_SAMPLE vecteurs)
+COMPRESSION_SAMPLE = 2000
+COMPRESSION_MIN_SAMPLE = 100
+
+# Métriques : distance L2 ou produit scalaire sur vecteurs normalisés (similarité cosinus)
+METRICS = ('l2', 'ip')
+
+# Modes de recherche : vectorielle, lexicale (BM25) ou fusion des deux classements
+SEARCH_MODES = ('dense', 'sparse', 'hybrid')
+
+# Constante de la fusion par rang réciproque (valeur usuelle de la littérature)
+RRF_K = 60
+
+# Candidats de chaque classement fusionnés en mode hybride (au moins top_k)
+HYBRID_CANDIDATES = 50
+
+# Dossier de l'index BM25 dans le store des chunks
+SPARSE_DIR = 'bm25'
+
+# Paramètres par défaut des index approximatifs
+DEFAULT_INDEX_PARAMS = {
+    'nlist': None,          # Nombre de listes IVF (None = 4 * racine du nombre de vecteurs d'entraînement)
+    'pq_m': None,           # Nombre de sous-quantificateurs PQ (None = dimension / 8)
+    'pq_nbits': 8,          # Bits par sous-quantificateur PQ
+    'quantization': 'none', # Compression des vecteurs (voir QUANTIZATIONS)
+    'hnsw_m': 32,           # Nombre de voisins par nœud HNSW
+    'ef_construction': 40,  # Largeur de recherche HNSW à la construction
+    'train_size': 50000,    # Nombre maximal de vecteurs d'entraînement (IVF)
+    'nprobe': 8,            # Listes IVF parcourues par requête (défaut)
+    'ef_search': 64         # Largeur de recherche HNSW par requête (défaut)
+}
+
+
+def requires_training(index_type: str, params: Dict = None) -> bool:
+    """Indique si l'index doit être entraîné sur des vecteurs avant les premiers ajouts"""
+    params = {**DEFAULT_INDEX_PARAMS, **(params or {})}
+    return index_type in ('ivf_flat', 'ivf_pq') or params['quantization'] in ('sq8', 'pq')
+
+
+def pq_settings(dimension: int, params: Dict, n_train: int) -> Tuple[int, int]:
+    """Nombre de sous-quantificateurs PQ et bits par sous-quantificateur"""
+    pq_m = int(params['pq_m'] or max(m for m in range(1, max(1, dimension // 8) + 1) if dimension % m == 0))
+    if dimension % pq_m != 0:
+        raise ValueError(f"pq_m ({pq_m}) doit diviser la dimension ({dimension})")
+    # Chaque sous-quantificateur a 2^nbits centroïdes : pas plus que de vecteurs
+    nbits = max(1, min(int(params['pq_nbits']), int(np.log2(max(n_train, 2)))))
+    return pq_m, nbits
+
+
+def build_vector_codec(dimension: int, quantization: str, params: Dict = None,
+                       n_train: int = 0, metric: str = 'l2'):
+    """
+    Crée un index exhaustif (non entraîné) qui stocke les vecteurs sous la forme demandée
+    
+    Args:
+        dimension: Dimension des vecteurs
+        quantization: 'none', 'fp16', 'sq8' ou 'pq'
+        params: Paramètres de l'index (pq_m, pq_nbits)
+        n_train: Nombre de vecteurs d'entraînement (limite les bits PQ)
+        metric: 'l2' ou 'ip'
+        
+    Returns:
+        IndexFlat, IndexScalarQuantizer ou IndexPQ
+    """
+    params = {**DEFAULT_INDEX_PARAMS, **(params or {})}
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == 'ip' else faiss.METRIC_L2
+    if quantization in SCALAR_QUANTIZERS:
+        return faiss.IndexScalarQuantizer(dimension, SCALAR_QUANTIZERS[quantization], faiss_metric)
+    if quantization == 'pq':
+        pq_m, nbits = pq_settings(dimension, params, n_train)
+        return faiss.IndexPQ(dimension, pq_m, nbits, faiss_metric)
+    return faiss.IndexFlat(dimension, faiss_metric)
+
+
+def vector_code_size(index) -> int:
+    """Octets stockés par vecteur dans un index (hors graphe HNSW, listes IVF et ids)"""
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    return int(index.code_size)
+
+
+def build_faiss_index(index_type: str, dimension: int, params: Dict = None,
+                      training_vectors: np.ndarray = None, metric: str = 'l2'):
+    """
+    Crée un index FAISS vide du type demandé (entraîné si nécessaire)
+    
+    Args:
+        index_type: 'flat', 'ivf_flat', 'ivf_pq' ou 'hnsw'
+        dimension: Dimension des vecteurs
+        params: Paramètres de l'index (voir DEFAULT_INDEX_PARAMS), dont la compression
+                des vecteurs stockés ('quantization')
+        training_vectors: Vecteurs d'entraînement (requis pour les index IVF et les
+                          compressions 'sq8' et 'pq')
+        metric: 'l2' ou 'ip' (les vecteurs doivent alors être normalisés)
+        
+    Returns:
+        Index FAISS acceptant add_with_ids
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Métrique inconnue: {metric}")
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Type d'index inconnu: {index_type}")
+    params = {**DEFAULT_INDEX_PARAMS, **(params or {})}
+    quantization = params['quantization']
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Compression inconnue: {quantization}")
+    if index_type == 'ivf_pq' and quantization in SCALAR_QUANTIZERS:
+        raise ValueError("Un index ivf_pq est déjà compressé par quantification par produit")
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == 'ip' else faiss.METRIC_L2
+    
+    n_train = 0
+    if requires_training(index_type, params):
+        if training_vectors is None or len(training_vectors) == 0:
+            raise ValueError("Vecteurs d'entraînement requis pour un index IVF ou compressé ('sq8', 'pq')")
+        # Échantillon d'entraînement aléatoire (reproductible)
+        if len(training_vectors) > params['train_size']:
+            rng = np.random.default_rng(0)
+            sample = rng.choice(len(training_vectors), int(params['train_size']), replace=False)
+            training_vectors = training_vectors[np.sort(sample)]
+        training_vectors = np.ascontiguousarray(training_vectors, dtype='float32')
+        n_train = len(training_vectors)
+    
+    if index_type == 'flat':
+        index = build_vector_codec(dimension, quantization, params, n_train, metric)
+    elif index_type == 'hnsw':
+        if quantization in SCALAR_QUANTIZERS:
+            index = faiss.IndexHNSWSQ(dimension, SCALAR_QUANTIZERS[quantization], int(params['hnsw_m']),
+                                      faiss_metric)
+        elif quantization == 'pq':
+            pq_m, nbits = pq_settings(dimension, params, n_train)
+            index = faiss.IndexHNSWPQ(dimension, pq_m, int(params['hnsw_m']), nbits, faiss_metric)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, int(params['hnsw_m']), faiss_metric)
+        index.hnsw.efConstruction = int(params['ef_construction'])
+        index.hnsw.efSearch = int(params['ef_search'])
+    else:
+        # FAISS recommande au moins 39 vecteurs d'entraînement par liste
+        nlist = params['nlist'] or int(4 * np.sqrt(n_train))
+        nlist = max(1, min(int(nlist), n_train // 39))
+        
+        quantizer = faiss.IndexFlat(dimension, faiss_metric)
+        if index_type == 'ivf_flat' and quantization in SCALAR_QUANTIZERS:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, SCALAR_QUANTIZERS[quantization],
+                                                  faiss_metric)
+        elif index_type == 'ivf_flat' and quantization == 'none':
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss_metric)
+        else:  # index_type == 'ivf_pq' ou ivf_flat compressé par 'pq'
+            pq_m, nbits = pq_settings(dimension, params, n_train)
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, nbits, faiss_metric)
+        index.nprobe = min(int(params['nprobe']), nlist)
+    
+    if not index.is_trained:
+        index.train(training_vectors)
+    # Les index IVF gèrent eux-mêmes les ids ; les autres passent par une table d'ids
+    return index if isinstance(index, faiss.IndexIVF) else faiss.IndexIDMap(index)
+
+
+def compression_report(vectors: np.ndarray, quantization: str, params: Dict = None, metric: str = 'l2',
+                       model_dimension: int = None, k: int = 10, n_queries: int = 100) -> Dict:
+    """
+    Mesure la mémoire gagnée et le rappel perdu par la compression des vecteurs
+    
+    Une partie de l'échantillon sert de requêtes, recherchées parmi les autres vecteurs
+    en float32 (référence exacte) puis sous leur forme compressée. Le rappel mesure donc
+    la seule perte due à la compression, indépendamment du type d'index (IVF, HNSW).
+    
+    Args:
+        vectors: Échantillon des vecteurs indexés (normalisés pour la métrique 'ip')
+        quantization: 'none', 'fp16', 'sq8' ou 'pq'
+        params: Paramètres de l'index (pq_m, pq_nbits)
+        metric: 'l2' ou 'ip'
+        model_dimension: Dimension native du modèle d'embedding (avant réduction par 'dimensions')
+        k: Nombre de voisins comparés
+        n_queries: Nombre de requêtes prélevées dans l'échantillon
+        
+    Returns:
+        Octets par vecteur (compressé et float32 à la dimension du modèle), taux de
+        compression et rappel@k par rapport aux vecteurs float32
+    """
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    dimension = vectors.shape[1]
+    model_dimension = model_dimension or dimension
+    
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(vectors))
+    n_queries = min(n_queries, len(vectors) // 2)
+    queries, database = vectors[order[:n_queries]], vectors[order[n_queries:]]
+    k = min(k, len(database))
+    
+    exact = build_vector_codec(dimension, 'none', params, metric=metric)
+    exact.add(database)
+    codec = build_vector_codec(dimension, quantization, params, len(database), metric)
+    if not codec.is_trained:
+        codec.train(database)
+    codec.add(database)
+    
+    _, expected = exact.search(queries, k)
+    _, found = codec.search(queries, k)
+    recall = np.mean([len(set(row_found) & set(row_expected)) / k
+                      for row_found, row_expected in zip(found, expected)])
+    float32_bytes = model_dimension * 4
+    return {
+        'quantization': quantization,
+        'dimension': dimension,
+        'model_dimension': model_dimension,
+        'bytes_per_vector': int(codec.code_size),
+        'float32_bytes_per_vector': float32_bytes,
+        'compression_ratio': round(float32_bytes / codec.code_size, 1),
+        'recall_at_k': round(float(recall), 4),
+        'k': k,
+        'sample_size': len(vectors)
+    }
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """
+    Fusionne des classements par rang réciproque : score = somme des 1 / (k + rang)
+    
+    Args:
+        rankings: Classements d'ids, du plus au moins pertinent
+        k: Constante d'atténuation des premiers rangs
+        
+    Returns:
+        Liste (id, score) par score décroissant
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)
 
 
 class FAISSIndexer:
     """Classe pour créer et gérer un index FAISS avec embeddings OpenAI ou locaux"""
     
     def __init__(self, api_key: str = None, model: str = "text-embedding-3-small", 
-                 mode: str = "openai", local_embedder=None):
+                 mode: str = "openai", local_embedder=None, embedding_cache=None,
+                 local_batch_size: int = 32, max_concurrency: int = 4,
+                 max_batch_tokens: int = 50000, base_url: str = None,
+                 index_type: str = "flat", index_params: Dict = None, metric: str = "l2",
+                 query_cache=None, embedding_dimensions: int = None):
         """
         Initialize l'indexer
         
@@ -25,27 +285,78 @@ class FAISSIndexer:
             model: Modèle d'embedding OpenAI
             mode: 'openai' ou 'local'
             local_embedder: Instance de LocalEmbedder si mode='local'
+            embedding_cache: Instance d'EmbeddingCache (optionnel)
+            local_batch_size: Taille des batchs d'encodage en mode local
+            max_concurrency: Nombre de requêtes OpenAI simultanées
+            max_batch_tokens: Budget de tokens par requête OpenAI
+            base_url: URL de l'API OpenAI (serveur compatible ou bouchon de test)
+            index_type: 'flat' (recherche exacte), 'ivf_flat', 'ivf_pq' ou 'hnsw'
+            index_params: Paramètres de l'index approximatif (voir DEFAULT_INDEX_PARAMS)
+            metric: 'l2' (distance, plus petit = plus proche) ou 'ip' (similarité
+                    cosinus entre vecteurs normalisés, plus grand = plus proche)
+            query_cache: Instance de QueryEmbeddingCache pour les questions (optionnel)
+            embedding_dimensions: Dimension réduite des embeddings OpenAI (paramètre
+                                  'dimensions' des modèles text-embedding-3, None = native)
         """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Type d'index inconnu: {index_type}")
+        if metric not in METRICS:
+            raise ValueError(f"Métrique inconnue: {metric}")
+        
         self.mode = mode
+        self.embedding_cache = embedding_cache
+        self.query_cache = query_cache
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        self.local_batch_size = local_batch_size
+        self.embedding_stats = {'vectors': 0, 'seconds': 0.0}
+        self.max_concurrency = max_concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self._scheduler = None
         
         if mode == "openai":
             if not api_key:
                 raise ValueError("API key requise pour le mode OpenAI")
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, base_url=base_url)
             self.model = model
-            self.dimension = 1536  # Dimension pour text-embedding-3-small
-            if model == "text-embedding-3-large":
-                self.dimension = 3072
+            self.dimension = OPENAI_EMBEDDING_DIMENSIONS.get(model, 1536)
+            if embedding_dimensions:
+                if not model.startswith("text-embedding-3"):
+                    raise ValueError(f"Le modèle {model} ne permet pas de réduire la dimension des embeddings")
+                if not 0 < int(embedding_dimensions) <= self.dimension:
+                    raise ValueError(f"Dimension réduite invalide: {embedding_dimensions} (maximum {self.dimension})")
+                self.dimension = int(embedding_dimensions)
         else:  # mode == "local"
             if not local_embedder:
                 raise ValueError("LocalEmbedder requis pour le mode local")
+            if embedding_dimensions:
+                raise ValueError("La réduction de dimension n'est disponible qu'avec les embeddings OpenAI text-embedding-3")
             self.embedder = local_embedder
             self.dimension = local_embedder.dimension
             self.model = "local"
         
+        self.embedding_dimensions = int(embedding_dimensions) if embedding_dimensions else None
+        self.index_type = index_type
+        self.metric = metric
+        self.index_params = {**DEFAULT_INDEX_PARAMS, **(index_params or {})}
+        if self.index_params['quantization'] not in QUANTIZATIONS:
+            raise ValueError(f"Compression inconnue: {self.index_params['quantization']}")
         self.index = None
-        self.chunks = []
-        self.metadata = []
+        self.store = ChunkStore()
+        # Index lexical BM25 des mêmes chunks (None : construit à la première utilisation)
+        self.sparse = BM25Index()
+        self._sparse_lock = threading.Lock()
+        self.next_id = 0
+        # Index memory-mappé (load_index avec mmap=True) : toute modification est interdite
+        self.read_only = False
+        self.load_stats = {}
+        # Identifiant du contenu de l'index, renouvelé à chaque sauvegarde
+        self.index_version = None
+        # Vecteurs en attente de l'entraînement d'un index IVF (None si l'index est prêt)
+        self._pending = None
+        # Mémoire gagnée et rappel perdu par la compression (mesurés à la construction)
+        self.compression = None
+        self._sample = None
+        self._sample_seen = 0
     
     def generate_embedding(self, text: str) -> List[float]:
         """
@@ -60,44 +371,153 @@ class FAISSIndexer:
         if self.mode == "openai":
             response = self.client.embeddings.create(
                 model=self.model,
-                input=text
+                input=text,
+                **self.embedding_options
             )
             return response.data[0].embedding
         else:  # mode == "local"
             return self.embedder.generate_embedding(text)
     
-    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
+    def generate_query_embedding(self, query: str) -> np.ndarray:
+        """
+        Génère l'embedding d'une question (en réutilisant le cache des questions s'il est configuré)
+        
+        Args:
+            query: Texte de la question
+            
+        Returns:
+            Vecteur float32
+        """
+        if self.query_cache is not None:
+            vector = self.query_cache.get(self.cache_model, query)
+            if vector is not None:
+                return vector
+        
+        vector = np.asarray(self.generate_embedding(query), dtype='float32')
+        if self.query_cache is not None:
+            self.query_cache.put(self.cache_model, query, vector)
+        return vector
+    
+    def generate_query_embeddings(self, queries: List[str]) -> np.ndarray:
+        """
+        Génère les embeddings de plusieurs questions en un seul appel au modèle
+        (questions déjà présentes dans le cache des questions et doublons exclus)
+        
+        Args:
+            queries: Textes des questions
+            
+        Returns:
+            Tableau (len(queries), dimension) en float32 (copie modifiable)
+        """
+        if len(queries) == 1:
+            return np.array([self.generate_query_embedding(queries[0])], dtype='float32')
+        
+        vectors = np.empty((len(queries), self.dimension), dtype='float32')
+        missing = {}
+        for i, query in enumerate(queries):
+            vector = self.query_cache.get(self.cache_model, query) if self.query_cache is not None else None
+            if vector is not None:
+                vectors[i] = vector
+            else:
+                missing.setdefault(query, []).append(i)
+        
+        if missing:
+            computed = self._compute_embeddings(list(missing))
+            for vector, (query, positions) in zip(computed, missing.items()):
+                vectors[positions] = vector
+                if self.query_cache is not None:
+                    self.query_cache.put(self.cache_model, query, vector.copy())
+        return vectors
+    
+    @property
+    def embedding_options(self) -> Dict:
+        """Paramètres supplémentaires des requêtes d'embeddings OpenAI (dimension réduite)"""
+        return {'dimensions': self.embedding_dimensions} if self.embedding_dimensions else {}
+    
+    @property
+    def cache_model(self) -> str:
+        """Identifiant du modèle utilisé comme clé du cache d'embeddings"""
+        if self.mode == "local":
+            return f"local:{getattr(self.embedder, 'model_name', 'unknown')}"
+        if self.embedding_dimensions:
+            return f"{self.model}:{self.embedding_dimensions}"
+        return self.model
+    
+    @property
+    def scheduler(self) -> EmbeddingScheduler:
+        """Planificateur des requêtes d'embeddings OpenAI (créé à la première utilisation)"""
+        if self._scheduler is None:
+            from .chunker import TextChunker
+            self._scheduler = EmbeddingScheduler(
+                self.client, self.model, TextChunker().count_tokens,
+                max_concurrency=self.max_concurrency,
+                max_batch_tokens=self.max_batch_tokens,
+                options=self.embedding_options
+            )
+        return self._scheduler
+    
+    def generate_embeddings_batch(self, texts: List[str], batch_size: int = None) -> np.ndarray:
         """
         Génère des embeddings par batch pour efficacité
+        (en réutilisant le cache d'embeddings s'il est configuré)
         
         Args:
             texts: Liste de textes
-            batch_size: Taille des batchs
+            batch_size: Nombre maximal de textes par requête OpenAI
+                        (les batchs sont constitués selon un budget de tokens)
             
         Returns:
-            Liste d'embeddings
+            Tableau numpy (len(texts), dimension) en float32
         """
-        embeddings = []
+        if self.embedding_cache is None:
+            return self._compute_embeddings(texts, batch_size)
+        
+        embeddings, missing = self.embedding_cache.get_many(self.cache_model, self.dimension, texts)
+        self.cache_stats['hits'] += len(texts) - len(missing)
+        self.cache_stats['misses'] += len(missing)
+        
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self._compute_embeddings(missing_texts, batch_size)
+            self.embedding_cache.put_many(self.cache_model, self.dimension, missing_texts, computed)
+            embeddings[missing] = computed
+        
+        return embeddings
+    
+    def _compute_embeddings(self, texts: List[str], batch_size: int = None) -> np.ndarray:
+        """Calcule les embeddings (OpenAI ou local) sans passer par le cache"""
+        start_time = time.time()
         
         if self.mode == "openai":
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                
-                response = self.client.embeddings.create(
-                    model=self.model,
-                    input=batch
-                )
-                
-                batch_embeddings = [item.embedding for item in response.data]
-                embeddings.extend(batch_embeddings)
+            # Requêtes concurrentes, résultats replacés dans l'ordre des textes
+            embeddings = np.empty((len(texts), self.dimension), dtype='float32')
+            self.scheduler.embed(texts, embeddings, max_inputs=batch_size)
         else:  # mode == "local"
-            # Le local embedder génère un embedding à la fois
-            for text in texts:
-                embedding = self.embedder.generate_embedding(text)
-                embeddings.append(embedding)
+            # Encodage par batchs triés par longueur, sans passer par des listes Python
+            embeddings = self.embedder.generate_embeddings_array(texts, batch_size=self.local_batch_size)
         
+        self.embedding_stats['vectors'] += len(texts)
+        self.embedding_stats['seconds'] += time.time() - start_time
         return embeddings
     
+    def get_embedding_stats(self) -> Dict:
+        """Retourne le débit de génération des embeddings calculés (hors cache)"""
+        seconds = self.embedding_stats['seconds']
+        vectors = self.embedding_stats['vectors']
+        stats = {
+            'vectors_computed': vectors,
+            'seconds': round(seconds, 3),
+            'vectors_per_second': round(vectors / seconds, 1) if seconds > 0 else None
+        }
+        if self.mode == "local":
+            stats['batch_size'] = self.local_batch_size
+        else:
+            stats['max_concurrency'] = self.max_concurrency
+            stats['max_batch_tokens'] = self.max_batch_tokens
+            if self._scheduler is not None:
+                stats.update(self._scheduler.stats)
+        return stats
+    
     def create_index(self, chunks: List[Dict]) -> Dict:
         """
         Crée un index FAISS à partir des chunks
@@ -111,70 +531,397 @@ class FAISSIndexer:
         if not chunks:
             return {'success': False, 'error': 'Aucun chunk à indexer'}
         
+        self.reset_index()
+        result = self.add_chunks(chunks)
+        
+        return {
+            'success': True,
+            'total_chunks': result['added'],
+            'dimension': self.dimension,
+            'model': self.model
+        }
+    
+    def reset_index(self):
+        """
+        Crée un index FAISS vide (avec ids explicites pour permettre les suppressions)
+        
+        Les index IVF et compressés ('sq8', 'pq') doivent être entraînés : les premiers
+        vecteurs ajoutés sont conservés jusqu'à atteindre 'train_size' (ou jusqu'à
+        finalize()), puis servent d'échantillon d'entraînement avant d'être ajoutés à l'index.
+        """
+        if requires_training(self.index_type, self.index_params):
+            self.index = None
+            self._pending = []
+        else:
+            self.index = build_faiss_index(self.index_type, self.dimension, self.index_params,
+                                           metric=self.metric)
+            self._pending = None
+        self.store = ChunkStore()
+        self.sparse = BM25Index()
+        self.next_id = 0
+        self.read_only = False
+        # Index compressé : échantillon des vecteurs pour mesurer le rappel perdu
+        self.compression = None
+        compressed = self.index_params['quantization'] != 'none' or self.embedding_dimensions
+        self._sample = [] if compressed else None
+        self._sample_seen = 0
+    
+    def _collect_sample(self, vectors: np.ndarray):
+        """Échantillon uniforme (réservoir) des vecteurs ajoutés depuis reset_index()"""
+        if self._sample is None:
+            return
+        rng = np.random.default_rng(self._sample_seen)
+        for vector in vectors:
+            self._sample_seen += 1
+            if len(self._sample) < COMPRESSION_SAMPLE:
+                self._sample.append(vector.copy())
+            else:
+                slot = int(rng.integers(self._sample_seen))
+                if slot < COMPRESSION_SAMPLE:
+                    self._sample[slot] = vector.copy()
+    
+    def model_dimension(self) -> int:
+        """Dimension native du modèle d'embedding (avant réduction par 'dimensions')"""
+        if self.mode == "openai":
+            return OPENAI_EMBEDDING_DIMENSIONS.get(self.model, self.dimension)
+        return self.dimension
+    
+    def get_sparse_index(self) -> BM25Index:
+        """Index BM25, construit à partir du store pour un index sauvegardé sans lui"""
+        if self.sparse is None:
+            with self._sparse_lock:
+                if self.sparse is None:
+                    print(f"Construction de l'index BM25 sur {len(self.store)} chunks...")
+                    sparse = BM25Index()
+                    sparse.add((self.store.get(position)['text'] for position in range(len(self.store))),
+                               self.store.vector_ids)
+                    # Postings construits avant la publication : les recherches concurrentes
+                    # ne voient jamais un index partiellement reconstruit
+                    sparse._rebuild()
+                    self.sparse = sparse
+        return self.sparse
+    
+    def _check_writable(self):
+        if self.read_only:
+            raise ValueError("Index chargé en lecture seule (memory-mappé) : rechargez-le sans mmap pour le modifier")
+    
+    def add_chunks(self, chunks: List[Dict]) -> Dict:
+        """
+        Ajoute des chunks à un index existant
+        
+        Args:
+            chunks: Liste de chunks avec texte et métadonnées
+            
+        Returns:
+            Nombre de chunks ajoutés et ids des vecteurs attribués
+        """
+        if self.index is None and self._pending is None:
+            raise ValueError("Aucun index chargé")
+        self._check_writable()
+        
+        if not chunks:
+            return {'added': 0, 'vector_ids': []}
+        
         # Extraire les textes
         texts = [chunk['text'] for chunk in chunks]
         
-        # Générer les embeddings
+        # Générer les embeddings (tableau float32)
         print(f"Génération de {len(texts)} embeddings...")
-        embeddings = self.generate_embeddings_batch(texts)
+        embeddings_array = self.generate_embeddings_batch(texts)
+        if self.metric == 'ip':
+            faiss.normalize_L2(embeddings_array)
         
-        # Convertir en numpy array
-        embeddings_array = np.array(embeddings).astype('float32')
-        
-        # Créer l'index FAISS
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.index.add(embeddings_array)
+        # Attribuer des ids aux nouveaux vecteurs
+        vector_ids = np.arange(self.next_id, self.next_id + len(chunks), dtype='int64')
+        self.next_id += len(chunks)
+        self.get_sparse_index().add(texts, vector_ids)
+        self._collect_sample(embeddings_array)
+        if self._pending is not None:
+            self._pending.append((embeddings_array, vector_ids))
+            if sum(len(ids) for _, ids in self._pending) >= self.index_params['train_size']:
+                self.finalize()
+        else:
+            self.index.add_with_ids(embeddings_array, vector_ids)
         
         # Stocker les chunks et métadonnées
-        self.chunks = chunks
-        self.metadata = [
-            {
-                'chunk_id': chunk.get('chunk_id', i),
-                'source': chunk.get('source', 'unknown'),
-                'tokens': chunk.get('tokens', 0)
-            }
-            for i, chunk in enumerate(chunks)
-        ]
+        for chunk, vector_id in zip(chunks, vector_ids):
+            chunk['vector_id'] = int(vector_id)
+            self.store.append(chunk)
         
-        return {
-            'success': True,
-            'total_chunks': len(chunks),
-            'dimension': self.dimension,
-            'model': self.model
-        }
+        return {'added': len(chunks), 'vector_ids': vector_ids.tolist()}
+    
+    def finalize(self):
+        """Entraîne l'index IVF sur les vecteurs en attente et les y ajoute"""
+        if not self._pending:
+            return
+        
+        vectors = np.concatenate([embeddings for embeddings, _ in self._pending])
+        vector_ids = np.concatenate([ids for _, ids in self._pending])
+        print(f"Entraînement de l'index {self.index_type} ({self.index_params['quantization']}) "
+              f"sur {len(vectors)} vecteurs...")
+        self.index = build_faiss_index(self.index_type, self.dimension, self.index_params, vectors,
+                                       metric=self.metric)
+        self.index.add_with_ids(vectors, vector_ids)
+        self._pending = None
+    
+    def remove_vectors(self, vector_ids: List[int]) -> int:
+        """
+        Supprime des vecteurs (et leurs chunks) de l'index
+        
+        Args:
+            vector_ids: Ids des vecteurs à supprimer
+            
+        Returns:
+            Nombre de vecteurs supprimés
+        """
+        self.finalize()
+        if self.index is None or not vector_ids:
+            return 0
+        
+        self._check_writable()
+        if not self.supports_removal():
+            raise ValueError("Cet index ne supporte pas la suppression de vecteurs")
+        
+        removed = self.index.remove_ids(np.array(vector_ids, dtype='int64'))
+        self.get_sparse_index().remove(vector_ids)
+        self.store.remove(vector_ids)
+        
+        return int(removed)
+    
+    def supports_removal(self) -> bool:
+        """Indique si l'index permet une mise à jour incrémentale (ids explicites, hors HNSW)"""
+        if isinstance(self.index, faiss.IndexIDMap):
+            return not isinstance(faiss.downcast_index(self.index.index), faiss.IndexHNSW)
+        return isinstance(self.index, faiss.IndexIVF)
+    
+    def source_filter(self, sources: List[str] = None,
+                      exclude_sources: List[str] = None) -> Optional[Tuple[np.ndarray, bool]]:
+        """
+        Ids des vecteurs retenus par un filtre sur les sources
+        
+        Args:
+            sources: Sources à inclure (None = toutes)
+            exclude_sources: Sources à exclure
+            
+        Returns:
+            None sans filtre, sinon (ids croissants, True si ce sont les ids à exclure)
+        """
+        if sources is None and not exclude_sources:
+            return None
+        excluded = self.store.source_vector_ids(exclude_sources or [])
+        if sources is None:
+            return excluded, True
+        return np.setdiff1d(self.store.source_vector_ids(sources), excluded, assume_unique=True), False
+    
+    def _search_parameters(self, nprobe: int = None, ef_search: int = None, selector=None):
+        """
+        Paramètres de recherche propres à la requête (sans modifier l'index partagé)
+        
+        Args:
+            selector: faiss.IDSelector restreignant les ids des résultats
+        """
+        base = self.index
+        if isinstance(base, faiss.IndexIDMap):
+            base = faiss.downcast_index(base.index)
+        if nprobe is None and ef_search is None and selector is None:
+            return None
+        # Un index IVF ou HNSW n'accepte que ses propres paramètres : valeurs de l'index par défaut
+        if isinstance(base, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF(nprobe=int(nprobe or base.nprobe))
+        elif isinstance(base, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW(efSearch=int(ef_search or base.hnsw.efSearch))
+        elif selector is not None:
+            params = faiss.SearchParameters()
+        else:
+            return None
+        if selector is not None:
+            params.sel = selector
+        return params
+    
+    def _supports_selector(self) -> bool:
+        """Indique si l'index accepte un filtre d'ids pendant la recherche (pas IndexPQ)"""
+        base = self.index
+        if isinstance(base, faiss.IndexIDMap):
+            base = faiss.downcast_index(base.index)
+        return not isinstance(base, faiss.IndexPQ)
+    
+    def _post_filtered_search(self, query_vectors: np.ndarray, k: int, allowed: np.ndarray,
+                              count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recherche filtrée pour un index sans sélecteur : k élargi puis filtrage des ids
+        
+        Le nombre de candidats est estimé d'après la part de vecteurs retenus, puis
+        multiplié tant qu'une requête n'a pas ses k résultats (au plus tout l'index).
+        
+        Returns:
+            (distances, ids) de forme (requêtes, k), complétés par -1 comme FAISS
+        """
+        total = self.index.ntotal
+        wanted = min(total, max(4 * k, 2 * int(np.ceil(k * total / count))))
+        while True:
+            distances, indices = self.index.search(query_vectors, wanted)
+            keep = (indices >= 0) & allowed[np.maximum(indices, 0)]
+            if wanted >= total or (keep.sum(axis=1) >= k).all():
+                break
+            wanted = min(total, wanted * 4)
+        
+        filtered_distances = np.zeros((len(query_vectors), k), dtype='float32')
+        filtered_indices = np.full((len(query_vectors), k), -1, dtype='int64')
+        for row, row_keep in enumerate(keep):
+            columns = np.flatnonzero(row_keep)[:k]
+            filtered_distances[row, :len(columns)] = distances[row, columns]
+            filtered_indices[row, :len(columns)] = indices[row, columns]
+        return filtered_distances, filtered_indices
+    
+    def _dense_search(self, query_vectors: np.ndarray, k: int, nprobe: int = None, ef_search: int = None,
+                      min_score: float = None,
+                      id_filter: Tuple[np.ndarray, bool] = None) -> List[List[Tuple[int, float]]]:
+        """Classement vectoriel de chaque requête (une seule recherche FAISS) : listes (id du vecteur, score FAISS)"""
+        if self.metric == 'ip':
+            faiss.normalize_L2(query_vectors)
+        
+        # Filtre appliqué pendant le parcours de l'index (pas de post-filtrage des top_k) :
+        # bitmap des ids retenus, construit en une passe vectorisée
+        selector, count = None, len(self.store)
+        if id_filter is not None:
+            vector_ids, exclude = id_filter
+            allowed = np.zeros(self.next_id, dtype=bool)
+            allowed[vector_ids] = True
+            if exclude:
+                allowed = ~allowed
+                count -= len(vector_ids)
+            else:
+                count = len(vector_ids)
+            if count <= 0:
+                return [[] for _ in range(len(query_vectors))]
+            selector = faiss.IDSelectorBitmap(np.packbits(allowed, bitorder='little'))
+        
+        # Rechercher dans l'index
+        if selector is not None and not self._supports_selector():
+            distances, indices = self._post_filtered_search(query_vectors, min(k, count), allowed, count)
+        else:
+            params = self._search_parameters(nprobe, ef_search, selector)
+            if params is not None:
+                distances, indices = self.index.search(query_vectors, min(k, count), params=params)
+            else:
+                distances, indices = self.index.search(query_vectors, min(k, count))
+        
+        rankings = []
+        for row_ids, row_scores in zip(indices, distances):
+            hits = []
+            for vector_id, score in zip(row_ids, row_scores):
+                # Les index approximatifs peuvent renvoyer -1 (moins de résultats que k)
+                if vector_id < 0:
+                    continue
+                # Résultats triés par similarité décroissante : les suivants sont plus faibles
+                if self.metric == 'ip' and min_score is not None and score < min_score:
+                    break
+                hits.append((int(vector_id), float(score)))
+            rankings.append(hits)
+        return rankings
+    
+    def _sparse_search(self, query: str, k: int,
+                       id_filter: Tuple[np.ndarray, bool] = None) -> List[Tuple[int, float]]:
+        """Classement lexical : liste (id du vecteur, score BM25)"""
+        vector_ids, scores = self.get_sparse_index().search(query, k, id_filter)
+        return list(zip(vector_ids.tolist(), scores.tolist()))
     
-    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+    def search(self, query: str, top_k: int = 5, nprobe: int = None, ef_search: int = None,
+               min_score: float = None, mode: str = 'dense', sources: List[str] = None,
+               exclude_sources: List[str] = None) -> List[Dict]:
         """
         Recherche les chunks les plus similaires à une requête
         
         Args:
             query: Texte de recherche
             top_k: Nombre de résultats à retourner
+            nprobe: Listes parcourues (index IVF, sinon valeur de l'index)
+            ef_search: Largeur de recherche (index HNSW, sinon valeur de l'index)
+            min_score: Similarité minimale des résultats vectoriels (métrique 'ip' uniquement ;
+                       en mode hybride, les résultats trouvés par BM25 seul ne sont pas filtrés)
+            mode: 'dense' (embeddings), 'sparse' (BM25 sur les termes exacts) ou 'hybrid'
+                  (fusion des deux classements par rang réciproque)
+            sources: Restreint la recherche aux chunks de ces sources (None = toutes)
+            exclude_sources: Exclut les chunks de ces sources
             
         Returns:
             Liste des chunks les plus pertinents avec scores
         """
-        if self.index is None or len(self.chunks) == 0:
-            return []
+        return self.search_batch([query], top_k, nprobe, ef_search, min_score, mode,
+                                 sources, exclude_sources)[0]
+    
+    def search_batch(self, queries: List[str], top_k: int = 5, nprobe: int = None, ef_search: int = None,
+                     min_score: float = None, mode: str = 'dense', sources: List[str] = None,
+                     exclude_sources: List[str] = None) -> List[List[Dict]]:
+        """
+        Recherche les chunks les plus similaires à plusieurs requêtes (mêmes paramètres)
         
-        # Générer l'embedding de la requête
-        query_embedding = self.generate_embedding(query)
-        query_vector = np.array([query_embedding]).astype('float32')
+        Les embeddings des requêtes sont générés en un seul appel au modèle et
+        l'index FAISS est interrogé une seule fois avec la matrice des requêtes.
         
-        # Rechercher dans l'index
-        distances, indices = self.index.search(query_vector, min(top_k, len(self.chunks)))
+        Args:
+            queries: Textes de recherche
+            (autres paramètres : voir search)
+            
+        Returns:
+            Résultats de chaque requête, dans l'ordre des requêtes
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Mode de recherche inconnu: {mode}")
+        if self.index is None or len(self.store) == 0 or not queries:
+            return [[] for _ in queries]
         
-        # Préparer les résultats
+        id_filter = self.source_filter(sources, exclude_sources)
+        if id_filter is not None and not id_filter[1] and len(id_filter[0]) == 0:
+            return [[] for _ in queries]
+        
+        if mode == 'dense':
+            query_vectors = self.generate_query_embeddings(queries)
+            hits = self._dense_search(query_vectors, top_k, nprobe, ef_search, min_score, id_filter)
+            return [self._build_results(query_hits, self.metric) for query_hits in hits]
+        if mode == 'sparse':
+            return [self._build_results(self._sparse_search(query, top_k, id_filter), 'bm25')
+                    for query in queries]
+        
+        # mode == 'hybrid'
+        candidates = max(top_k, HYBRID_CANDIDATES)
+        query_vectors = self.generate_query_embeddings(queries)
+        dense_hits = self._dense_search(query_vectors, candidates, nprobe, ef_search, min_score, id_filter)
         results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.chunks):
-                results.append({
-                    'text': self.chunks[idx]['text'],
-                    'source': self.chunks[idx].get('source', 'unknown'),
-                    'chunk_id': self.chunks[idx].get('chunk_id', idx),
-                    'score': float(distances[0][i]),
-                    'rank': i + 1
-                })
+        for query, query_dense_hits in zip(queries, dense_hits):
+            rankings = {
+                'dense_rank': [vector_id for vector_id, _ in query_dense_hits],
+                'sparse_rank': [vector_id for vector_id, _ in self._sparse_search(query, candidates, id_filter)]
+            }
+            ranks = {name: {vector_id: rank for rank, vector_id in enumerate(ranking, start=1)}
+                     for name, ranking in rankings.items()}
+            hits = reciprocal_rank_fusion(list(rankings.values()))[:top_k]
+            results.append(self._build_results(hits, 'rrf', ranks))
+        return results
+    
+    def _build_results(self, hits: List[Tuple[int, float]], metric: str, ranks: Dict = None) -> List[Dict]:
+        """Prépare les résultats (texte et métadonnées des chunks) d'un classement"""
+        results = []
+        for vector_id, score in hits:
+            position = self.store.position(vector_id)
+            if position is None:
+                continue
+            chunk = self.store.get(position)
+            result = {
+                'text': chunk['text'],
+                'source': chunk.get('source', 'unknown'),
+                'chunk_id': chunk.get('chunk_id', position),
+                'score': score,
+                'metric': metric,
+                'rank': len(results) + 1
+            }
+            if 'page_start' in chunk:
+                result['page_start'] = chunk['page_start']
+                result['page_end'] = chunk['page_end']
+            # Rang dans chaque classement fusionné (None si absent)
+            for name, ranking in (ranks or {}).items():
+                result[name] = ranking.get(vector_id)
+            results.append(result)
         
         return results
     
@@ -184,44 +931,128 @@ class FAISSIndexer:
         
         Args:
             index_path: Chemin pour sauvegarder l'index FAISS
-            metadata_path: Chemin pour sauvegarder les métadonnées
+            metadata_path: Dossier du store des chunks et métadonnées
         """
+        self.finalize()
         if self.index is None:
             raise ValueError("Aucun index à sauvegarder")
+        self._check_writable()
         
-        # Sauvegarder l'index FAISS
-        faiss.write_index(self.index, index_path)
+        # Mesurer l'effet de la compression sur l'échantillon de la construction
+        if self._sample is not None and len(self._sample) >= 2 * COMPRESSION_MIN_SAMPLE:
+            self.compression = compression_report(np.array(self._sample), self.index_params['quantization'],
+                                                  self.index_params, self.metric, self.model_dimension())
+            self._sample = None
+            print(f"Compression {self.compression['quantization']} : {self.compression['bytes_per_vector']} "
+                  f"octets/vecteur (x{self.compression['compression_ratio']}), "
+                  f"rappel@{self.compression['k']} {self.compression['recall_at_k']:.3f}")
         
-        # Sauvegarder les chunks et métadonnées
-        with open(metadata_path, 'wb') as f:
-            pickle.dump({
-                'chunks': self.chunks,
-                'metadata': self.metadata,
-                'dimension': self.dimension,
-                'model': self.model
-            }, f)
+        # Sauvegarder l'index FAISS (fichier temporaire puis renommage : un processus
+        # qui a memory-mappé l'ancien fichier continue de le lire sans erreur)
+        faiss.write_index(self.index, index_path + '.tmp')
+        os.replace(index_path + '.tmp', index_path)
+        
+        # Sauvegarder l'index BM25 avant l'en-tête du store, écrit en dernier
+        self.get_sparse_index().save(os.path.join(metadata_path, SPARSE_DIR))
+        
+        # Sauvegarder les chunks et métadonnées (puis les relire en memory-map)
+        self.index_version = uuid.uuid4().hex
+        self.store.save(metadata_path, info={
+            'dimension': self.dimension,
+            'model': self.model,
+            'next_id': self.next_id,
+            'index_type': self.index_type,
+            'index_params': self.index_params,
+            'metric': self.metric,
+            'index_version': self.index_version,
+            'embedding_dimensions': self.embedding_dimensions,
+            'compression': self.compression
+        })
     
-    def load_index(self, index_path: str, metadata_path: str):
+    def load_index(self, index_path: str, metadata_path: str, mmap: bool = False):
         """
         Charge un index et ses métadonnées
         
         Args:
             index_path: Chemin de l'index FAISS
-            metadata_path: Chemin des métadonnées
+            metadata_path: Dossier du store des chunks (ou ancien fichier index_metadata.pkl)
+            mmap: Memory-mapper l'index FAISS au lieu de le lire en mémoire
+                  (chargement quasi immédiat, mais index en lecture seule)
         """
         if not os.path.exists(index_path) or not os.path.exists(metadata_path):
             raise FileNotFoundError("Fichiers d'index introuvables")
         
+        start_time = time.time()
+        
+        # Charger les métadonnées : les textes ne sont lus qu'à la demande
+        if os.path.isfile(metadata_path):
+            self.store = ChunkStore.from_pickle(metadata_path)
+        else:
+            self.store = ChunkStore(metadata_path)
+            self.store.load()
+        
+        # Index BM25 memory-mappé (index antérieur sans BM25 : construit à la première recherche lexicale)
+        sparse_path = os.path.join(metadata_path, SPARSE_DIR)
+        if BM25Index.exists(sparse_path):
+            self.sparse = BM25Index(sparse_path)
+            self.sparse.load()
+        else:
+            self.sparse = None
+        
+        info = self.store.info
+        self.dimension = info['dimension']
+        self.model = info['model']
+        self.index_type = info.get('index_type', 'flat')
+        self.metric = info.get('metric', 'l2')
+        self.index_params = {**DEFAULT_INDEX_PARAMS, **info.get('index_params', {})}
+        self.next_id = info.get('next_id', len(self.store))
+        self.embedding_dimensions = info.get('embedding_dimensions')
+        self.compression = info.get('compression')
+        self._sample = None
+        # Anciens index sans version : la date de l'index FAISS en tient lieu
+        self.index_version = info.get('index_version') or str(os.path.getmtime(index_path))
+        self._pending = None
+        
         # Charger l'index FAISS
-        self.index = faiss.read_index(index_path)
+        self.index = None
+        if mmap:
+            self.index = self._read_index_mmap(index_path)
+        self.read_only = self.index is not None
+        if self.index is None:
+            self.index = faiss.read_index(index_path)
+        
+        self.load_stats = {
+            'seconds': round(time.time() - start_time, 4),
+            'mmap': self.read_only,
+            'index_file_mb': round(os.path.getsize(index_path) / (1024 * 1024), 1)
+        }
+    
+    def _read_index_mmap(self, index_path: str):
+        """Lit l'index en memory-map (None si cette version de FAISS ou ce type d'index ne le permet pas)"""
+        # Listes inversées sur disque pour les index IVF, codes memory-mappés pour flat et HNSW
+        flag_name = 'IO_FLAG_MMAP' if self.index_type in ('ivf_flat', 'ivf_pq') else 'IO_FLAG_MMAP_IFC'
+        if not hasattr(faiss, flag_name):
+            return None
+        try:
+            return faiss.read_index(index_path, getattr(faiss, flag_name))
+        except RuntimeError as e:
+            print(f"Memory-map de l'index impossible, lecture complète: {e}")
+            return None
+    
+    def warm_up(self) -> float:
+        """
+        Exécute une recherche factice pour charger les pages de l'index
+        (évite que la première requête paie les lectures disque)
         
-        # Charger les métadonnées
-        with open(metadata_path, 'rb') as f:
-            data = pickle.load(f)
-            self.chunks = data['chunks']
-            self.metadata = data['metadata']
-            self.dimension = data['dimension']
-            self.model = data['model']
+        Returns:
+            Durée du préchauffage en secondes
+        """
+        start_time = time.time()
+        if self.index is not None and self.index.ntotal > 0:
+            self.index.search(np.zeros((1, self.dimension), dtype='float32'), 1)
+            # Parcourir la colonne des ids utilisée pour retrouver les chunks
+            self.store.vector_ids.max()
+        return time.time() - start_time
     
     def get_stats(self) -> Dict:
         """Retourne des statistiques sur l'index"""
@@ -233,6 +1064,29 @@ class FAISSIndexer:
             'total_vectors': self.index.ntotal,
             'dimension': self.dimension,
             'model': self.model,
-            'total_chunks': len(self.chunks),
-            'sources': list(set(chunk.get('source', 'unknown') for chunk in self.chunks))
+            'index_type': self.index_type,
+            'metric': self.metric,
+            'storage': self.get_storage_stats(),
+            'total_chunks': len(self.store),
+            'sources': self.store.source_names(),
+            'sparse': self.sparse.get_stats() if self.sparse is not None else None,
+            'index_version': self.index_version,
+            'load': self.load_stats
+        }
+    
+    def get_storage_stats(self) -> Dict:
+        """
+        Décrit le format des vecteurs stockés et la mémoire gagnée par rapport à
+        des vecteurs float32 à la dimension native du modèle
+        """
+        bytes_per_vector = vector_code_size(self.index)
+        float32_bytes = self.model_dimension() * 4
+        return {
+            'quantization': self.index_params['quantization'],
+            'embedding_dimensions': self.embedding_dimensions,
+            'bytes_per_vector': bytes_per_vector,
+            'float32_bytes_per_vector': float32_bytes,
+            'memory_saved_mb': round(self.index.ntotal * (float32_bytes - bytes_per_vector) / (1024 * 1024), 1),
+            # Mesure faite à la construction de l'index (None si non compressé)
+            'compression': self.compression
         }
@@ -0,0 +1,207 @@
+"""
+Module de suivi des indexations en arrière-plan
+Avancement par étape, débit, temps restant estimé et annulation, enregistrés
+dans un fichier d'état lisible par tous les workers du serveur
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from typing import Dict, List, Optional
+
+
+class IndexingJob:
+    """Classe pour suivre une indexation lancée dans un thread"""
+
+    # Intervalle minimal entre deux écritures du fichier d'état pendant l'indexation
+    SAVE_INTERVAL = 0.5
+
+    COUNTERS = ('files_extracted', 'files_failed', 'chunks_produced', 'vectors_embedded', 'vectors_removed')
+
+    def __init__(self, jobs_dir: str):
+        """
+        Initialize la tâche et enregistre son état initial
+
+        Args:
+            jobs_dir: Dossier des fichiers d'état des tâches
+        """
+        self.id = uuid.uuid4().hex[:16]
+        self.jobs_dir = jobs_dir
+        # 'running', 'succeeded', 'failed' ou 'cancelled'
+        self.status = 'running'
+        # 'preparing' (chargement, retrait des fichiers supprimés), 'indexing'
+        # (extraction, chunking et embeddings en flux), 'saving' puis 'done'
+        self.stage = 'preparing'
+        self.files_total = 0
+        self.counters = {name: 0 for name in self.COUNTERS}
+        self.started_at = time.time()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._saved_at = 0
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.save()
+
+    @staticmethod
+    def _path(jobs_dir: str, job_id: str, suffix: str = '.json') -> Optional[str]:
+        """Chemin d'un fichier de la tâche (None si l'id n'est pas valide)"""
+        if not re.fullmatch(r'[0-9a-f]{16}', job_id or ''):
+            return None
+        return os.path.join(jobs_dir, job_id + suffix)
+
+    def update(self, stage: str = None, files_total: int = None, **counters):
+        """
+        Met à jour l'avancement
+
+        Args:
+            stage: Nouvelle étape
+            files_total: Nombre de fichiers à traiter
+            **counters: Valeurs des compteurs (voir COUNTERS)
+        """
+        with self._lock:
+            if stage is not None:
+                self.stage = stage
+            if files_total is not None:
+                self.files_total = files_total
+            self.counters.update(counters)
+        # Les changements d'étape sont enregistrés immédiatement
+        self.save(throttle=stage is None)
+
+    def cancel(self):
+        """Demande l'annulation (prise en compte au prochain document ou à la prochaine fenêtre)"""
+        self._cancel_event.set()
+
+    def cancel_requested(self) -> bool:
+        """Indique si l'annulation a été demandée, par ce processus ou par un autre worker"""
+        if not self._cancel_event.is_set() and os.path.exists(self._path(self.jobs_dir, self.id, '.cancel')):
+            self._cancel_event.set()
+        return self._cancel_event.is_set()
+
+    def finish(self, status: str, result: Dict = None, error: str = None):
+        """
+        Termine la tâche
+
+        Args:
+            status: 'succeeded', 'failed' ou 'cancelled'
+            result: Résultat de l'indexation
+            error: Message d'erreur
+        """
+        with self._lock:
+            self.status = status
+            self.stage = 'done'
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+        self.save()
+        cancel_path = self._path(self.jobs_dir, self.id, '.cancel')
+        if os.path.exists(cancel_path):
+            os.remove(cancel_path)
+
+    def snapshot(self) -> Dict:
+        """Retourne l'état de la tâche avec le débit et le temps restant estimé"""
+        with self._lock:
+            counters = dict(self.counters)
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at
+            vectors = counters['vectors_embedded']
+            files_done = counters['files_extracted'] + counters['files_failed']
+
+            # Nombre total de chunks extrapolé à partir des fichiers déjà extraits
+            estimated_chunks = None
+            if self.files_total and files_done:
+                estimated_chunks = max(vectors, round(counters['chunks_produced'] * self.files_total / files_done))
+
+            throughput = vectors / elapsed if elapsed > 0 and vectors else 0
+            eta = None
+            if self.status == 'running' and estimated_chunks and throughput:
+                eta = round((estimated_chunks - vectors) / throughput, 1)
+
+            if self.stage == 'done':
+                progress = 100.0
+            elif self.stage == 'saving':
+                progress = 95.0
+            elif self.stage == 'indexing' and estimated_chunks:
+                progress = round(95 * vectors / estimated_chunks, 1)
+            else:
+                progress = 0.0
+
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'stage': self.stage,
+                'progress': progress,
+                'files_total': self.files_total,
+                **counters,
+                'estimated_chunks': estimated_chunks,
+                'vectors_per_second': round(throughput, 1),
+                'eta_seconds': eta,
+                'elapsed_seconds': round(elapsed, 1),
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'result': self.result,
+                'error': self.error
+            }
+
+    def save(self, throttle: bool = False):
+        """Écrit le fichier d'état (au plus toutes les SAVE_INTERVAL secondes si throttle)"""
+        now = time.time()
+        if throttle and now - self._saved_at < self.SAVE_INTERVAL:
+            return
+        self._saved_at = now
+
+        path = self._path(self.jobs_dir, self.id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read(cls, jobs_dir: str, job_id: str) -> Optional[Dict]:
+        """Lit l'état enregistré d'une tâche (None si inconnue)"""
+        path = cls._path(jobs_dir, job_id)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def request_cancel(cls, jobs_dir: str, job_id: str) -> bool:
+        """
+        Demande l'annulation d'une tâche exécutée par un autre worker
+
+        Returns:
+            True si la tâche existe et est en cours
+        """
+        state = cls.read(jobs_dir, job_id)
+        if state is None or state['status'] != 'running':
+            return False
+        with open(cls._path(jobs_dir, job_id, '.cancel'), 'w'):
+            pass
+        return True
+
+    @classmethod
+    def list_jobs(cls, jobs_dir: str, limit: int = 10) -> List[Dict]:
+        """États des tâches les plus récentes, de la plus récente à la plus ancienne"""
+        if not os.path.isdir(jobs_dir):
+            return []
+        states = []
+        for filename in os.listdir(jobs_dir):
+            if filename.endswith('.json'):
+                state = cls.read(jobs_dir, filename[:-len('.json')])
+                if state is not None:
+                    states.append(state)
+        states.sort(key=lambda state: state['started_at'], reverse=True)
+        return states[:limit]
+
+    @classmethod
+    def prune(cls, jobs_dir: str, keep: int = 20):
+        """Supprime les fichiers d'état des tâches terminées les plus anciennes"""
+        finished = [state for state in cls.list_jobs(jobs_dir, limit=None) if state['status'] != 'running']
+        for state in finished[keep:]:
+            os.remove(cls._path(jobs_dir, state['job_id']))
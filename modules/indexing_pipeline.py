@@ -0,0 +1,121 @@
+"""
+Module de pipeline d'indexation en flux
+Enchaîne extraction, chunking, embeddings et ajout FAISS par fenêtres bornées
+"""
+
+from typing import List, Dict, Iterator, Callable
+from .document_processor import DocumentProcessor
+
+
+class IndexingCancelled(Exception):
+    """Levée quand l'annulation de l'indexation a été demandée"""
+
+
+class IndexingPipeline:
+    """Classe pour indexer des fichiers sans charger tout le corpus en mémoire"""
+
+    def __init__(self, indexer, chunker, processor: DocumentProcessor = None, window_size: int = 256,
+                 extraction_workers: int = 1, extraction_timeout: float = None,
+                 progress_callback: Callable = None, should_cancel: Callable[[], bool] = None):
+        """
+        Initialize le pipeline
+
+        Args:
+            indexer: Instance de FAISSIndexer (index vide ou chargé)
+            chunker: Instance de TextChunker
+            processor: Instance de DocumentProcessor
+            window_size: Nombre de chunks embeddés et ajoutés à l'index par fenêtre
+            extraction_workers: Nombre de processus d'extraction
+            extraction_timeout: Durée maximale d'extraction par fichier en secondes
+            progress_callback: Appelée avec le pipeline après chaque document extrait et chaque fenêtre indexée
+            should_cancel: Retourne True pour interrompre l'indexation (IndexingCancelled est levée)
+        """
+        self.indexer = indexer
+        self.chunker = chunker
+        self.processor = processor or DocumentProcessor()
+        self.window_size = max(1, window_size)
+        self.extraction_workers = extraction_workers
+        self.extraction_timeout = extraction_timeout
+        self.progress_callback = progress_callback
+        self.should_cancel = should_cancel
+
+        self.documents_processed = 0
+        self.chunks_produced = 0
+        self.chunks_indexed = 0
+        self.failed_files = []
+        self.vector_ids_by_file = {}
+
+    def iter_documents(self, filepaths: List[str]) -> Iterator[Dict]:
+        """
+        Extrait les fichiers et produit les documents valides dès qu'ils sont prêts
+        
+        Avec un découpage séquentiel, les PDF sont produits page par page
+        (DocumentProcessor.process_file avec stream_pages) : le texte complet
+        d'un document n'est jamais assemblé en mémoire.
+        """
+        stream_pages = self.chunker.workers == 1
+        for _, doc in self.processor.iter_process_files(filepaths, self.extraction_workers,
+                                                         self.extraction_timeout, stream_pages):
+            if doc.get('success'):
+                self.documents_processed += 1
+                self.vector_ids_by_file.setdefault(doc['filename'], [])
+            else:
+                self.failed_files.append({'filename': doc.get('filename'), 'error': doc.get('error')})
+            self._check_progress()
+            if doc.get('success'):
+                if doc.get('pages') is not None:
+                    doc['pages'] = self._iter_pages(doc['filename'], doc['pages'])
+                yield doc
+    
+    def _iter_pages(self, filename: str, pages: Iterator) -> Iterator:
+        """Pages d'un document extrait à la demande : une page illisible arrête le document"""
+        page_number = 0
+        try:
+            for page_number, page_text in pages:
+                yield page_number, page_text
+        except Exception as e:
+            # Les pages précédentes sont déjà découpées (et peut-être indexées)
+            self.failed_files.append({
+                'filename': filename,
+                'error': f'Extraction interrompue après la page {page_number}: {str(e)}'
+            })
+
+    def run(self, filepaths: List[str]) -> Dict[str, List[int]]:
+        """
+        Indexe les fichiers par fenêtres de chunks
+
+        Args:
+            filepaths: Chemins des fichiers à indexer
+
+        Returns:
+            Dict {nom de fichier: ids des vecteurs ajoutés} pour chaque document valide
+        """
+        window = []
+        for chunk in self.chunker.iter_chunks(self.iter_documents(filepaths)):
+            self.chunks_produced += 1
+            window.append(chunk)
+            if len(window) >= self.window_size:
+                self._flush(window)
+                window = []
+
+        if window:
+            self._flush(window)
+
+        # Entraîner l'index s'il attend encore son échantillon (IVF)
+        self.indexer.finalize()
+        return self.vector_ids_by_file
+
+    def _flush(self, window: List[Dict]):
+        """Embedde une fenêtre de chunks et l'ajoute à l'index"""
+        result = self.indexer.add_chunks(window)
+        for chunk, vector_id in zip(window, result['vector_ids']):
+            self.vector_ids_by_file[chunk['source']].append(vector_id)
+        self.chunks_indexed += result['added']
+        self._check_progress()
+
+    def _check_progress(self):
+        """Signale l'avancement et interrompt l'indexation si l'annulation a été demandée"""
+        if self.progress_callback:
+            self.progress_callback(self)
+        if self.should_cancel and self.should_cancel():
+            raise IndexingCancelled()
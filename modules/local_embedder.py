@@ -4,6 +4,7 @@ Alternative locale à OpenAI Embeddings
 """
 
 from typing import List
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 
@@ -22,6 +23,7 @@ class LocalEmbedder:
                        - "all-mpnet-base-v2" (768 dim, meilleur mais plus lourd)
         """
         print(f"Chargement du modèle local: {model_name}...")
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
         self.dimension = self.model.get_sentence_embedding_dimension()
         print(f"Modèle chargé. Dimension: {self.dimension}")
@@ -51,3 +53,31 @@ class LocalEmbedder:
         """
         embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
         return embeddings.tolist()
+    
+    def generate_embeddings_array(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Génère les embeddings par batchs directement dans un tableau float32
+        
+        Les textes sont triés par longueur pour limiter le padding dans
+        chaque batch, puis les vecteurs sont replacés dans l'ordre d'origine.
+        
+        Args:
+            texts: Liste de textes à embedder
+            batch_size: Nombre de textes encodés par passe du modèle
+            
+        Returns:
+            Tableau numpy (len(texts), dimension) en float32
+        """
+        embeddings = np.empty((len(texts), self.dimension), dtype='float32')
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        
+        for start in range(0, len(order), batch_size):
+            batch_indices = order[start:start + batch_size]
+            embeddings[batch_indices] = self.model.encode(
+                [texts[i] for i in batch_indices],
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        
+        return embeddings
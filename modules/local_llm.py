@@ -3,7 +3,7 @@ Module LLM local avec Ollama
 Alternative locale à OpenAI GPT
 """
 
-from typing import List, Dict
+from typing import List, Dict, Iterator
 import ollama
 
 
@@ -85,3 +85,45 @@ class LocalLLM:
         """
         messages = [{"role": "user", "content": prompt}]
         return self.generate_response(messages, temperature)
+    
+    def stream_response(self, messages: List[Dict[str, str]], temperature: float = 0.7) -> Iterator[str]:
+        """
+        Génère une réponse token par token à partir de messages
+        
+        Contrairement à generate_response, les erreurs d'Ollama sont propagées :
+        une partie de la réponse a déjà pu être transmise à l'appelant.
+        
+        Args:
+            messages: Liste de messages au format [{"role": "user", "content": "..."}]
+            temperature: Température de génération (0-1)
+            
+        Returns:
+            Itérateur sur les fragments de texte générés
+        """
+        stream = ollama.chat(
+            model=self.model,
+            messages=messages,
+            options={
+                "temperature": temperature,
+                "num_predict": 1000  # Limite de tokens
+            },
+            stream=True
+        )
+        for part in stream:
+            content = part['message']['content']
+            if content:
+                yield content
+    
+    def stream_simple(self, prompt: str, temperature: float = 0.7) -> Iterator[str]:
+        """
+        Génère une réponse token par token à partir d'un prompt
+        
+        Args:
+            prompt: Prompt de génération
+            temperature: Température de génération
+            
+        Returns:
+            Itérateur sur les fragments de texte générés
+        """
+        messages = [{"role": "user", "content": prompt}]
+        return self.stream_response(messages, temperature)
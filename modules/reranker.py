@@ -0,0 +1,119 @@
+"""
+Module de re-ranking local avec un cross-encoder (Sentence Transformers)
+Reclasse les chunks candidats de la recherche en évaluant chaque paire (question, chunk)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Tuple
+import numpy as np
+from sentence_transformers import CrossEncoder
+
+
+class CrossEncoderReranker:
+    """Classe pour reclasser des résultats de recherche avec un cross-encoder sur CPU"""
+
+    def __init__(self, model_name: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1",
+                 max_length: int = 512, budget_ms: float = 1000):
+        """
+        Initialize le reranker
+
+        Args:
+            model_name: Nom du modèle cross-encoder
+                       Options :
+                       - "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1" (multilingue)
+                       - "cross-encoder/ms-marco-MiniLM-L-6-v2" (anglais, plus rapide)
+            max_length: Nombre maximal de tokens par paire (question + chunk tronqué)
+            budget_ms: Durée maximale du re-ranking, au-delà l'ordre de la recherche est conservé
+        """
+        print(f"Chargement du cross-encoder: {model_name}...")
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, max_length=max_length, device='cpu')
+        self.budget_ms = budget_ms
+        # Un seul re-ranking à la fois : le modèle utilise déjà tous les cœurs
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rerank')
+        # Dernier re-ranking abandonné après dépassement du budget (il occupe encore le modèle)
+        self._abandoned = None
+        self.stats = {'reranked': 0, 'fallbacks': 0}
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        """
+        Évalue la pertinence de chaque texte pour la question, en un seul batch
+
+        Returns:
+            Scores (plus grand = plus pertinent)
+        """
+        return np.asarray(self.model.predict(
+            [(query, text) for text in texts],
+            batch_size=max(1, len(texts)),
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ), dtype='float32')
+
+    def warm_up(self) -> float:
+        """
+        Évalue une paire factice pour que la première requête ne paie pas l'initialisation du modèle
+
+        Returns:
+            Durée du préchauffage en secondes
+        """
+        start_time = time.time()
+        self.score("question", ["texte"])
+        return time.time() - start_time
+
+    def rerank(self, query: str, results: List[Dict], top_n: int,
+               budget_ms: float = None) -> Tuple[List[Dict], Dict]:
+        """
+        Reclasse les résultats et garde les top_n meilleurs
+
+        Si le budget est dépassé (ou en cas d'erreur), les top_n premiers résultats
+        sont retournés dans l'ordre de la recherche. Tant qu'un re-ranking abandonné
+        occupe encore le modèle, les suivants sont ignorés sans attendre ('busy').
+
+        Args:
+            query: Question
+            results: Résultats de la recherche (candidats), du plus au moins pertinent
+            top_n: Nombre de résultats conservés
+            budget_ms: Durée maximale (défaut: budget du reranker)
+
+        Returns:
+            (résultats, informations : appliqué ou non, raison du repli, durée, nombre de candidats)
+        """
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        info = {'model': self.model_name, 'candidates': len(results), 'applied': False, 'fallback': None}
+        start_time = time.time()
+
+        abandoned = self._abandoned
+        if abandoned is not None and not abandoned.done():
+            # Le worker unique est pris jusqu'à la fin du calcul abandonné : il dépasserait le budget
+            info['fallback'] = 'busy'
+        else:
+            future = self._executor.submit(self.score, query, [result['text'] for result in results])
+            try:
+                scores = future.result(timeout=budget_ms / 1000)
+            except FutureTimeoutError:
+                # Un re-ranking pas encore commencé (file d'attente) est annulé ; commencé,
+                # il ne peut pas être interrompu et les requêtes suivantes ne l'attendront pas
+                if not future.cancel():
+                    self._abandoned = future
+                info['fallback'] = 'budget'
+            except Exception as e:
+                print(f"Erreur lors du re-ranking: {e}")
+                info['fallback'] = 'error'
+        info['ms'] = round((time.time() - start_time) * 1000, 1)
+
+        if info['fallback']:
+            self.stats['fallbacks'] += 1
+            return results[:top_n], info
+
+        self.stats['reranked'] += 1
+        info['applied'] = True
+        reranked = []
+        for position in np.argsort(-scores, kind='stable')[:top_n]:
+            result = dict(results[position])
+            result['rerank_score'] = float(scores[position])
+            # Rang dans l'ordre de la recherche
+            result['retrieval_rank'] = int(position) + 1
+            result['rank'] = len(reranked) + 1
+            reranked.append(result)
+        return reranked, info
@@ -0,0 +1,317 @@
+"""
+Module d'index lexical BM25
+Index inversé des chunks (listes de postings en colonnes numpy, memory-mappées)
+pour retrouver les termes exacts : identifiants d'exigences, acronymes, vocabulaire ISTQB
+"""
+
+import os
+import re
+import json
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+
+# Mots, avec les identifiants composés (REQ-042, ISO/IEC, 4.2.1) conservés en un seul terme
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+SEPARATOR_PATTERN = re.compile(r"[-./]")
+COMBINING_PATTERN = re.compile(r"[\u0300-\u036f]")
+
+STOP_WORDS = frozenset("""
+au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui ma mais me meme mes moi mon
+ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous
+est sont ete etre avoir ont cette cet dont ni si plus
+a an and are as at be by for from has have in is it its of on or that the this to was were which will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Découpe un texte en termes (minuscules, sans accents ni mots vides)
+
+    Un identifiant composé produit le terme complet et chacune de ses parties :
+    "REQ-042" donne "req-042", "req" et "042".
+    """
+    text = COMBINING_PATTERN.sub('', unicodedata.normalize('NFKD', text.lower()))
+    terms = []
+    for token in TOKEN_PATTERN.findall(text):
+        parts = SEPARATOR_PATTERN.split(token)
+        if len(parts) > 1:
+            terms.append(token)
+        terms.extend(part for part in parts
+                     if part not in STOP_WORDS and (len(part) > 1 or part.isdigit()))
+    return terms
+
+
+class BM25Index:
+    """Classe pour indexer les chunks par termes et les classer avec BM25"""
+
+    FORMAT_VERSION = 1
+
+    HEADER_FILE = 'bm25.json'
+    ARRAYS = ('term_ptr', 'postings', 'tfs', 'doc_lengths', 'vector_ids')
+
+    def __init__(self, path: str = None, k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize l'index (vide tant que load() n'est pas appelé)
+
+        Args:
+            path: Dossier de l'index (peut n'être fourni qu'à save())
+            k1: Saturation de la fréquence d'un terme dans un chunk
+            b: Normalisation par la longueur du chunk (0 = aucune, 1 = complète)
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        # Vocabulaire (terme -> id) et termes par id
+        self._vocab = {}
+        self._terms = []
+        # Postings triés par terme : ceux du terme t sont postings[term_ptr[t]:term_ptr[t + 1]]
+        self._term_ptr = np.zeros(1, dtype='int64')
+        self._postings = np.zeros(0, dtype='int32')
+        self._tfs = np.zeros(0, dtype='float32')
+        # Une entrée par chunk (position dans les postings)
+        self._doc_lengths = np.zeros(0, dtype='int32')
+        self._vector_ids = np.zeros(0, dtype='int64')
+        self._norms = np.zeros(0, dtype='float32')
+        # Modifications en attente de reconstruction des postings
+        self._new = []
+        self._removed = []
+        self._rebuild_lock = threading.Lock()
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Vérifie qu'un index complet est présent dans le dossier"""
+        return os.path.exists(os.path.join(path, cls.HEADER_FILE))
+
+    def __len__(self) -> int:
+        self._rebuild()
+        return len(self._vector_ids)
+
+    def load(self):
+        """Ouvre l'index en memory-map"""
+        with open(os.path.join(self.path, self.HEADER_FILE), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get('format') != self.FORMAT_VERSION:
+            raise ValueError(f"Format d'index BM25 non supporté: {header.get('format')}")
+
+        self.k1 = header['k1']
+        self.b = header['b']
+        self._terms = header['terms']
+        self._vocab = {term: term_id for term_id, term in enumerate(self._terms)}
+        arrays = {name: np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r') for name in self.ARRAYS}
+        self._set_arrays(**arrays)
+        self._new = []
+        self._removed = []
+
+    def _set_arrays(self, term_ptr, postings, tfs, doc_lengths, vector_ids):
+        self._term_ptr = term_ptr
+        self._postings = postings
+        self._tfs = tfs
+        self._doc_lengths = doc_lengths
+        self._vector_ids = vector_ids
+        # Dénominateur BM25 propre à chaque chunk, calculé une fois pour toutes les requêtes
+        average_length = float(doc_lengths.mean()) if len(doc_lengths) else 1.0
+        self._norms = (self.k1 * (1 - self.b + self.b * doc_lengths / max(average_length, 1e-9))).astype('float32')
+
+    def add(self, texts: Iterable[str], vector_ids):
+        """
+        Ajoute des chunks (pris en compte à la prochaine recherche ou sauvegarde)
+
+        Args:
+            texts: Textes des chunks
+            vector_ids: Ids des vecteurs FAISS des chunks, dans le même ordre
+        """
+        term_ids, tfs, distinct_terms, lengths = [], [], [], []
+        for text in texts:
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                term_id = self._vocab.get(term)
+                if term_id is None:
+                    term_id = self._vocab[term] = len(self._terms)
+                    self._terms.append(term)
+                term_ids.append(term_id)
+                tfs.append(tf)
+            distinct_terms.append(len(counts))
+            lengths.append(sum(counts.values()))
+        if lengths:
+            self._new.append((
+                np.array(term_ids, dtype='int32'),
+                np.array(tfs, dtype='float32'),
+                np.array(distinct_terms, dtype='int64'),
+                np.array(lengths, dtype='int32'),
+                np.asarray(vector_ids, dtype='int64')
+            ))
+
+    def remove(self, vector_ids):
+        """Retire les chunks associés à des ids de vecteurs"""
+        self._removed.append(np.asarray(list(vector_ids), dtype='int64'))
+
+    def _rebuild(self):
+        """Reconstruit les postings après des ajouts ou des suppressions"""
+        if not self._new and not self._removed:
+            return
+        # Deux premières recherches simultanées ne doivent pas consommer deux fois les ajouts
+        with self._rebuild_lock:
+            if self._new or self._removed:
+                self._rebuild_postings()
+
+    def _rebuild_postings(self):
+        # Postings existants sous forme (terme, chunk, fréquence)
+        counts = np.diff(self._term_ptr)
+        term_ids = [np.repeat(np.arange(len(counts), dtype='int32'), counts)]
+        docs = [np.asarray(self._postings, dtype='int64')]
+        tfs = [np.asarray(self._tfs)]
+        doc_lengths = [np.asarray(self._doc_lengths)]
+        vector_ids = [np.asarray(self._vector_ids)]
+
+        # Nouveaux chunks à la suite des chunks existants
+        doc_count = len(self._vector_ids)
+        for new_terms, new_tfs, distinct_terms, new_lengths, new_ids in self._new:
+            term_ids.append(new_terms)
+            docs.append(np.repeat(np.arange(doc_count, doc_count + len(new_lengths)), distinct_terms))
+            tfs.append(new_tfs)
+            doc_lengths.append(new_lengths)
+            vector_ids.append(new_ids)
+            doc_count += len(new_lengths)
+
+        term_ids = np.concatenate(term_ids)
+        docs = np.concatenate(docs)
+        tfs = np.concatenate(tfs)
+        doc_lengths = np.concatenate(doc_lengths)
+        vector_ids = np.concatenate(vector_ids)
+
+        # Chunks retirés : les autres sont renumérotés
+        if self._removed:
+            keep = ~np.isin(vector_ids, np.concatenate(self._removed))
+            new_positions = np.cumsum(keep) - 1
+            kept_postings = keep[docs]
+            term_ids, docs, tfs = term_ids[kept_postings], new_positions[docs[kept_postings]], tfs[kept_postings]
+            doc_lengths, vector_ids = doc_lengths[keep], vector_ids[keep]
+
+        # Vocabulaire compacté : les termes qui n'apparaissent plus disparaissent
+        used, term_ids = np.unique(term_ids, return_inverse=True)
+        self._terms = [self._terms[term_id] for term_id in used]
+        self._vocab = {term: term_id for term_id, term in enumerate(self._terms)}
+
+        order = np.lexsort((docs, term_ids))
+        term_ptr = np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=len(self._terms)))])
+        self._set_arrays(
+            term_ptr=term_ptr.astype('int64'),
+            postings=docs[order].astype('int32'),
+            tfs=tfs[order].astype('float32'),
+            doc_lengths=doc_lengths.astype('int32'),
+            vector_ids=vector_ids.astype('int64')
+        )
+        self._new = []
+        self._removed = []
+
+    def search(self, query: str, top_k: int = 5,
+               id_filter: Tuple[np.ndarray, bool] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Classe les chunks contenant les termes de la requête
+
+        Les scores sont cumulés sur les seuls postings des termes de la requête :
+        le coût dépend de leur fréquence dans le corpus, pas de sa taille.
+
+        Args:
+            query: Texte de la requête
+            top_k: Nombre de résultats
+            id_filter: (ids croissants, True pour les exclure) : restreint les chunks classés
+
+        Returns:
+            (ids des vecteurs, scores BM25), par score décroissant
+        """
+        self._rebuild()
+        doc_count = len(self._vector_ids)
+        term_ids = {self._vocab[term] for term in tokenize(query) if term in self._vocab}
+        if not term_ids or not doc_count or top_k <= 0:
+            return np.zeros(0, dtype='int64'), np.zeros(0, dtype='float32')
+
+        docs, weights = [], []
+        for term_id in term_ids:
+            start, end = int(self._term_ptr[term_id]), int(self._term_ptr[term_id + 1])
+            term_docs = self._postings[start:end]
+            tfs = self._tfs[start:end]
+            idf = np.log(1 + (doc_count - (end - start) + 0.5) / (end - start + 0.5))
+            docs.append(term_docs)
+            weights.append(idf * tfs * (self.k1 + 1) / (tfs + self._norms[term_docs]))
+
+        docs, weights = np.concatenate(docs), np.concatenate(weights)
+        if id_filter is not None:
+            allowed = self._filter_mask(*id_filter)
+            docs, weights = docs[allowed[docs]], weights[allowed[docs]]
+        if len(docs) * 16 > doc_count:
+            # Termes fréquents : accumulateur sur tous les chunks, sans tri des postings
+            scores = np.bincount(docs, weights=weights, minlength=doc_count)
+            candidates = np.flatnonzero(scores)
+            scores = scores[candidates].astype('float32')
+        else:
+            candidates, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=weights).astype('float32')
+
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return np.asarray(self._vector_ids[candidates[best]]), scores[best]
+
+    def _filter_mask(self, vector_ids: np.ndarray, exclude: bool) -> np.ndarray:
+        """Chunks retenus par un filtre sur les ids (masque indexé par position)"""
+        positions = np.searchsorted(self._vector_ids, vector_ids)
+        found = positions < len(self._vector_ids)
+        positions = positions[found]
+        positions = positions[self._vector_ids[positions] == vector_ids[found]]
+        mask = np.full(len(self._vector_ids), exclude)
+        mask[positions] = not exclude
+        return mask
+
+    def save(self, path: str = None):
+        """
+        Écrit l'index sur disque puis le recharge en memory-map
+
+        Args:
+            path: Dossier de destination (défaut: dossier de l'index)
+        """
+        if path is not None:
+            self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self._rebuild()
+
+        arrays = {
+            'term_ptr': self._term_ptr,
+            'postings': self._postings,
+            'tfs': self._tfs,
+            'doc_lengths': self._doc_lengths,
+            'vector_ids': self._vector_ids
+        }
+        for name, array in arrays.items():
+            tmp_path = os.path.join(self.path, f'{name}.npy.tmp')
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.asarray(array))
+            os.replace(tmp_path, os.path.join(self.path, f'{name}.npy'))
+
+        # L'en-tête est écrit en dernier : il désigne un index complet
+        header_tmp = os.path.join(self.path, self.HEADER_FILE + '.tmp')
+        with open(header_tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': self.FORMAT_VERSION,
+                'k1': self.k1,
+                'b': self.b,
+                'terms': self._terms
+            }, f, ensure_ascii=False)
+        os.replace(header_tmp, os.path.join(self.path, self.HEADER_FILE))
+
+        self.load()
+
+    def get_stats(self) -> Dict:
+        """Retourne la taille de l'index"""
+        self._rebuild()
+        return {
+            'chunks': len(self._vector_ids),
+            'terms': len(self._terms),
+            'postings': len(self._postings)
+        }
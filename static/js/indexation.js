@@ -1,6 +1,7 @@
 // Gestion de l'indexation
 
 let indexationInProgress = false;
+let currentJobId = null; // Tâche d'indexation suivie
 
 // Fonction pour supprimer l'index
 async function deleteIndex() {
@@ -62,17 +63,8 @@ function updateProgress(percent) {
     progressText.textContent = Math.round(percent) + '%';
 }
 
-async function startIndexation() {
-    if (indexationInProgress) {
-        alert('Une indexation est déjà en cours !');
-        return;
-    }
-    
-    // Récupérer la configuration
-    const chunkSize = parseInt(document.getElementById('chunkSize').value);
-    const chunkOverlap = parseInt(document.getElementById('chunkOverlap').value);
-    const embeddingModel = document.getElementById('embeddingModel').value;
-    
+// Préparer l'affichage de la progression
+function resetProgress() {
     // Masquer les résultats précédents
     document.getElementById('resultsSection').style.display = 'none';
     
@@ -89,15 +81,111 @@ async function startIndexation() {
     }
     
     document.getElementById('logContent').innerHTML = '';
+    document.getElementById('progressDetails').textContent = '';
     updateProgress(0);
+}
+
+// Afficher l'état d'une tâche d'indexation (étapes, compteurs, débit, temps restant)
+function renderJob(job) {
+    const setStatus = (stepNumber, status, text) => {
+        updateStep(stepNumber, status);
+        if (text) document.getElementById(`status${stepNumber}`).textContent = text;
+    };
+    
+    if (job.stage === 'preparing') {
+        setStatus(1, 'active', 'Préparation...');
+    } else if (job.stage === 'indexing') {
+        // Extraction, chunking et embeddings avancent en flux
+        const filesDone = job.files_extracted + job.files_failed;
+        setStatus(1, filesDone >= job.files_total ? 'completed' : 'active',
+                  `${filesDone} / ${job.files_total} fichiers`);
+        setStatus(2, 'active', `${job.chunks_produced} chunks`);
+        setStatus(3, 'active', `${job.vectors_embedded} vecteurs`);
+    } else if (job.stage === 'saving') {
+        [1, 2, 3].forEach(i => updateStep(i, 'completed'));
+        setStatus(4, 'active', 'En cours...');
+    } else if (job.status === 'succeeded') {
+        [1, 2, 3, 4].forEach(i => updateStep(i, 'completed'));
+    }
     
+    updateProgress(job.progress);
+    
+    const details = [];
+    if (job.vectors_per_second) details.push(`${job.vectors_per_second} vect/s`);
+    if (job.eta_seconds !== null) details.push(`reste ~${Math.ceil(job.eta_seconds)} s`);
+    details.push(`${job.elapsed_seconds} s écoulées`);
+    document.getElementById('progressDetails').textContent = details.join(' · ');
+}
+
+// Suivre une tâche d'indexation jusqu'à sa fin
+async function followJob(jobId) {
+    const stageMessages = {
+        'preparing': '🔍 Analyse des fichiers à indexer...',
+        'indexing': '⚙️ Extraction, découpage et calcul des embeddings...',
+        'saving': '💾 Sauvegarde de l\'index...'
+    };
+    
+    currentJobId = jobId;
     indexationInProgress = true;
     document.getElementById('indexButton').disabled = true;
+    document.getElementById('cancelButton').disabled = false;
+    
+    let lastStage = null;
+    try {
+        while (true) {
+            const response = await fetch(`/api/index/jobs/${jobId}`);
+            const job = await response.json();
+            if (!response.ok) {
+                throw new Error(job.error || 'Tâche d\'indexation introuvable');
+            }
+            
+            if (job.stage !== lastStage && stageMessages[job.stage]) {
+                addLog(stageMessages[job.stage], 'info');
+            }
+            lastStage = job.stage;
+            renderJob(job);
+            
+            if (job.status !== 'running') {
+                return job;
+            }
+            await new Promise(resolve => setTimeout(resolve, 500));
+        }
+    } finally {
+        currentJobId = null;
+        indexationInProgress = false;
+        document.getElementById('indexButton').disabled = false;
+        document.getElementById('cancelButton').disabled = true;
+    }
+}
+
+// Afficher l'issue d'une tâche terminée
+function showJobOutcome(job) {
+    if (job.status === 'succeeded') {
+        addLog('✅ Indexation terminée', 'success');
+        showResults(job.result);
+    } else if (job.status === 'cancelled') {
+        addLog('⏹️ Indexation annulée : l\'index précédent est conservé', 'warning');
+    } else {
+        throw new Error(job.error || 'Erreur inconnue');
+    }
+}
+
+async function startIndexation() {
+    if (indexationInProgress) {
+        alert('Une indexation est déjà en cours !');
+        return;
+    }
+    
+    // Récupérer la configuration
+    const chunkSize = parseInt(document.getElementById('chunkSize').value);
+    const chunkOverlap = parseInt(document.getElementById('chunkOverlap').value);
+    const embeddingModel = document.getElementById('embeddingModel').value;
     
+    resetProgress();
     addLog('🚀 Démarrage de l\'indexation...', 'info');
     
     try {
-        // Lancer l'indexation
+        // Lancer l'indexation en arrière-plan
         const response = await fetch('/api/index', {
             method: 'POST',
             headers: {
@@ -110,25 +198,51 @@ async function startIndexation() {
             })
         });
         
-        if (!response.ok) {
-            throw new Error('Erreur lors de l\'indexation');
+        const data = await response.json();
+        if (!response.ok || !data.success) {
+            throw new Error(data.error || 'Erreur lors de l\'indexation');
         }
         
-        const result = await response.json();
+        showJobOutcome(await followJob(data.job_id));
         
-        if (result.success) {
-            // Afficher les résultats
-            showResults(result);
+    } catch (error) {
+        addLog('❌ Erreur: ' + error.message, 'error');
+        alert('Erreur lors de l\'indexation: ' + error.message);
+    }
+}
+
+// Annuler l'indexation en cours
+async function cancelIndexation() {
+    if (!currentJobId) return;
+    
+    document.getElementById('cancelButton').disabled = true;
+    try {
+        const response = await fetch(`/api/index/jobs/${currentJobId}/cancel`, { method: 'POST' });
+        const data = await response.json();
+        if (data.success) {
+            addLog('⏳ Annulation demandée...', 'warning');
         } else {
-            throw new Error(result.error || 'Erreur inconnue');
+            addLog('❌ ' + (data.error || 'Annulation impossible'), 'error');
+        }
+    } catch (error) {
+        console.error('Erreur:', error);
+        addLog('❌ Erreur lors de l\'annulation', 'error');
+    }
+}
+
+// Reprendre le suivi d'une indexation lancée avant le chargement de la page
+async function resumeRunningJob() {
+    try {
+        const response = await fetch('/api/index/jobs');
+        const data = await response.json();
+        const running = (data.jobs || []).find(job => job.status === 'running');
+        if (running && !indexationInProgress) {
+            resetProgress();
+            addLog(`🔄 Indexation en cours (tâche ${running.job_id})`, 'info');
+            showJobOutcome(await followJob(running.job_id));
         }
-        
     } catch (error) {
         addLog('❌ Erreur: ' + error.message, 'error');
-        alert('Erreur lors de l\'indexation: ' + error.message);
-    } finally {
-        indexationInProgress = false;
-        document.getElementById('indexButton').disabled = false;
     }
 }
 
@@ -159,6 +273,24 @@ function showResults(result) {
         </div>
     `;
     
+    if (result.embedding_cache) {
+        resultsGrid.innerHTML += `
+        <div class="result-card">
+            <div class="result-label">Cache d'embeddings</div>
+            <div class="result-value">${result.embedding_cache.hits} / ${result.embedding_cache.hits + result.embedding_cache.misses}</div>
+        </div>
+        `;
+    }
+    
+    if (result.embedding && result.embedding.vectors_per_second) {
+        resultsGrid.innerHTML += `
+        <div class="result-card">
+            <div class="result-label">Débit (batch ${result.embedding.batch_size})</div>
+            <div class="result-value">${result.embedding.vectors_per_second} vect/s</div>
+        </div>
+        `;
+    }
+    
     resultsSection.style.display = 'block';
     
     // Mettre à jour le statut de la page
@@ -212,4 +344,5 @@ async function updateIndexStats() {
 // Charger les stats au chargement de la page
 document.addEventListener('DOMContentLoaded', () => {
     updateIndexStats();
+    resumeRunningJob();
 });
@@ -23,7 +23,7 @@ async function loadIndexStats() {
     }
 }
 
-// Ajouter un message dans le chat
+// Ajouter un message dans le chat (retourne le paragraphe du texte, complété pendant le streaming)
 function addMessage(type, content, sources = null) {
     const messagesContainer = document.getElementById('chatMessages');
     
@@ -56,23 +56,47 @@ function addMessage(type, content, sources = null) {
         
         const sourcesHeader = document.createElement('div');
         sourcesHeader.className = 'sources-header';
-        sourcesHeader.textContent = `📚 Sources utilisées (${sources.length})`;
+        // Chunks écartés du contexte (doublons, budget de tokens) : affichés en retrait
+        const usedCount = sources.filter(source => source.in_context !== false).length;
+        sourcesHeader.textContent = usedCount === sources.length
+            ? `📚 Sources utilisées (${sources.length})`
+            : `📚 Sources utilisées (${usedCount} sur ${sources.length} retrouvées)`;
         sourcesDiv.appendChild(sourcesHeader);
         
         sources.forEach((source, index) => {
             const sourceItem = document.createElement('div');
-            sourceItem.className = 'source-item';
+            sourceItem.className = source.in_context === false ? 'source-item source-excluded' : 'source-item';
             
             const sourceHeader = document.createElement('div');
             sourceHeader.className = 'source-header';
             
             const sourceName = document.createElement('span');
             sourceName.className = 'source-name';
-            sourceName.textContent = `${index + 1}. ${source.source}`;
+            let pages = '';
+            if (source.page_start !== undefined) {
+                pages = source.page_start === source.page_end
+                    ? ` (p. ${source.page_start})`
+                    : ` (p. ${source.page_start}-${source.page_end})`;
+            }
+            sourceName.textContent = `${index + 1}. ${source.source}${pages}`;
+            if (source.in_context === false) {
+                sourceName.textContent += ' (non transmis au LLM)';
+            }
             
             const sourceScore = document.createElement('span');
             sourceScore.className = 'source-score';
-            sourceScore.textContent = `Score: ${source.score.toFixed(2)}`;
+            if (source.metric === 'rrf') {
+                sourceScore.textContent = `Score hybride: ${source.score.toFixed(4)}`;
+            } else if (source.metric === 'bm25') {
+                sourceScore.textContent = `Score BM25: ${source.score.toFixed(2)}`;
+            } else {
+                sourceScore.textContent = source.metric === 'ip'
+                    ? `Similarité: ${source.score.toFixed(2)}`
+                    : `Distance: ${source.score.toFixed(2)}`;
+            }
+            if (source.rerank_score !== undefined) {
+                sourceScore.textContent += ` | Re-ranking: ${source.rerank_score.toFixed(2)}`;
+            }
             
             sourceHeader.appendChild(sourceName);
             sourceHeader.appendChild(sourceScore);
@@ -94,6 +118,36 @@ function addMessage(type, content, sources = null) {
     
     messagesContainer.appendChild(messageDiv);
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    
+    return textP;
+}
+
+// Lire une réponse Server-Sent Events et appeler onEvent(nom, données) pour chaque événement
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Les événements sont séparés par une ligne vide
+        let separator;
+        while ((separator = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, separator);
+            buffer = buffer.slice(separator + 2);
+            
+            let eventName = 'message';
+            let eventData = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) eventName = line.slice(7);
+                else if (line.startsWith('data: ')) eventData += line.slice(6);
+            });
+            onEvent(eventName, eventData ? JSON.parse(eventData) : null);
+        }
+    }
 }
 
 // Afficher un indicateur de chargement
@@ -152,6 +206,10 @@ async function sendQuestion() {
     const topK = parseInt(document.getElementById('topK').value);
     const temperature = parseFloat(document.getElementById('temperature').value);
     const maxTokens = parseInt(document.getElementById('maxTokens').value);
+    const retrievalMode = document.getElementById('retrievalMode').value;
+    const rerankCheckbox = document.getElementById('rerank');
+    const sourceFilter = document.getElementById('sourceFilter');
+    const sources = sourceFilter ? Array.from(sourceFilter.selectedOptions, option => option.value) : [];
     const systemPrompt = document.getElementById('systemPrompt').value.trim();
     
     // Afficher la question de l'utilisateur
@@ -174,7 +232,7 @@ async function sendQuestion() {
     showLoading();
     
     try {
-        const response = await fetch('/api/search', {
+        const response = await fetch('/api/search/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -185,34 +243,58 @@ async function sendQuestion() {
                 top_k: topK,
                 temperature: temperature,
                 max_tokens: maxTokens,
+                retrieval_mode: retrievalMode,
+                ...(rerankCheckbox ? { rerank: rerankCheckbox.checked } : {}),
+                ...(sources.length ? { sources: sources } : {}),
                 system_prompt: systemPrompt
             })
         });
         
-        const data = await response.json();
+        // Les erreurs détectées avant la génération sont renvoyées en JSON
+        if (!response.headers.get('Content-Type')?.startsWith('text/event-stream')) {
+            const data = await response.json();
+            hideLoading();
+            showError(data.error || 'Erreur lors de la recherche');
+            return;
+        }
         
-        hideLoading();
+        let answerElement = null;
+        let answer = '';
         
-        if (data.success) {
-            addMessage('assistant', data.answer, data.sources);
-            
-            // Ajouter la réponse à l'historique
-            conversationHistory.push({
-                role: 'assistant',
-                content: data.answer
-            });
-            
-            // Mettre à jour les compteurs
-            updateHistoryCount();
-            
-            // Mettre à jour le compteur de tokens
-            if (data.tokens) {
-                totalTokensUsed += data.tokens.total_tokens;
-                updateTokenCount(data.tokens);
+        await readEventStream(response, (eventName, data) => {
+            if (eventName === 'sources') {
+                // Sources affichées dès la fin de la recherche, la réponse suit
+                hideLoading();
+                answerElement = addMessage('assistant', '', data.sources);
+            } else if (eventName === 'token') {
+                answer += data.text;
+                answerElement.innerHTML = answer.replace(/\n/g, '<br>');
+                const messagesContainer = document.getElementById('chatMessages');
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            } else if (eventName === 'done') {
+                if (data.cached) {
+                    answerElement.innerHTML += `<br><br><em>⚡ Réponse en cache (question similaire : « ${data.cached.question} »)</em>`;
+                }
+                
+                // Ajouter la réponse à l'historique
+                conversationHistory.push({
+                    role: 'assistant',
+                    content: answer
+                });
+                
+                // Mettre à jour les compteurs
+                updateHistoryCount();
+                
+                // Mettre à jour le compteur de tokens
+                if (data.tokens) {
+                    totalTokensUsed += data.tokens.total_tokens;
+                    updateTokenCount(data.tokens, data.timings);
+                }
+            } else if (eventName === 'error') {
+                hideLoading();
+                showError(data.error || 'Erreur lors de la génération');
             }
-        } else {
-            showError(data.error || 'Erreur lors de la recherche');
-        }
+        });
     } catch (error) {
         hideLoading();
         console.error('Erreur:', error);
@@ -252,11 +334,17 @@ function updateHistoryCount() {
 }
 
 // Fonction pour mettre à jour le compteur de tokens
-function updateTokenCount(tokens) {
+function updateTokenCount(tokens, timings = null) {
     const tokenCount = document.getElementById('tokenCount');
     if (tokenCount && tokens) {
+        const firstToken = timings && timings.first_token_ms !== null
+            ? ` | 1er token: ${Math.round(timings.first_token_ms).toLocaleString()} ms`
+            : '';
+        const rerank = timings && timings.rerank_ms !== undefined
+            ? ` | Re-ranking: ${Math.round(timings.rerank_ms).toLocaleString()} ms`
+            : '';
         tokenCount.innerHTML = `🎯 Tokens: <strong>${totalTokensUsed.toLocaleString()}</strong> total<br>
-        <span style="font-size: 0.85em; opacity: 0.8;">(Dernier: ${tokens.total_tokens.toLocaleString()} | Prompt: ${tokens.prompt_tokens.toLocaleString()} | Réponse: ${tokens.completion_tokens.toLocaleString()})</span>`;
+        <span style="font-size: 0.85em; opacity: 0.8;">(Dernier: ${tokens.total_tokens.toLocaleString()} | Prompt: ${tokens.prompt_tokens.toLocaleString()} | Réponse: ${tokens.completion_tokens.toLocaleString()}${firstToken}${rerank})</span>`;
     }
 }
 